@@ -1,18 +1,19 @@
 """
 Make these appear root-level
 """
-from curator_api.actions.alias import Alias
+from curator_api.actions.alias import Alias, AliasBatch
 # from curator_api.actions.allocation import Allocation
 # from curator_api.actions.close import Close
 # from curator_api.actions.clusterrouting import ClusterRouting
-# from curator_api.actions.create import CreateIndex
-# from curator_api.actions.delete import IndexDelete, SnapshotDelete
+from curator_api.actions.create import BulkCreateIndex, CreateIndex
+from curator_api.actions.delete import IndexDelete
+# from curator_api.actions.delete import SnapshotDelete
 # from curator_api.actions.forcemerge import ForceMerge
 # from curator_api.actions.indexsettings import IndexSettings
 # from curator_api.actions.open import Open
 # from curator_api.actions.reindex import Reindex
 # from curator_api.actions.replicas import Replicas
 # from curator_api.actions.restore import Restore
-# from curator_api.actions.rollover import Rollover
+from curator_api.actions.rollover import Rollover, RolloverGroup
 # from curator_api.actions.shrink import Shrink
 # from curator_api.actions.snapshot import Snapshot
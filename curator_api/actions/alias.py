@@ -1,10 +1,50 @@
 """Alias Module"""
 import logging
+from elasticsearch.exceptions import NotFoundError
 from curator_api.actions.parentclasses import ActionClass
-from curator_api.exceptions import ActionError, MissingArgument, NoIndices
+from curator_api.exceptions import (
+    ActionError, ConfigurationError, FailedExecution, MissingArgument, NoIndices
+)
+from curator_api.helpers.alias import ALIAS_COLUMNS, invalidate_alias_map
+from curator_api.helpers.client import is_async_client
 from curator_api.helpers.datemath import parse_date_pattern, parse_datemath
+from curator_api.helpers.index import chunk_index_list
 from curator_api.helpers.utils import empty_list_check
 
+# The alias properties which _cat/aliases shows in full
+_ROUTING = ('index_routing', 'search_routing')
+
+def _dry_run_line(item):
+    """Return the dry run log line for one `update_aliases` action"""
+    job = list(item.keys())[0]
+    # We want our log to look clever, so if job is "remove", strip the 'e' so
+    # "remove" can become "removing".  "adding" works already.
+    return 'DRY-RUN: alias: {0}ing index "{1}" {2} alias "{3}"'.format(
+        job.rstrip('e'),
+        item[job]['index'],
+        'to' if job == 'add' else 'from',
+        item[job]['alias']
+    )
+
+def _routing(value):
+    """Return a routing value as a string, or `None` if it is not set"""
+    if value is None or value == '-':
+        return None
+    return str(value)
+
+def _cat_definition(row):
+    """
+    Return the alias definition shown by a ``_cat/aliases`` row, in the form
+    ``indices.get_alias`` returns it.  A filter shows only as ``*``.
+    """
+    definition = {
+        'index_routing': _routing(row.get('routing.index')),
+        'search_routing': _routing(row.get('routing.search')),
+    }
+    if row.get('filter', '-') != '-':
+        definition['filter'] = row['filter']
+    return definition
+
 class Alias(ActionClass):
     """Alias Class"""
     def __init__(self, client, name, extra_settings={}, **kwargs):
@@ -35,12 +75,127 @@ class Alias(ActionClass):
         #: Instance variable.
         #: Preset default value to `False`.
         self.warn_if_no_indices = False
+        #: Instance variable.
+        #: The number of `add` and `remove` actions left out because the alias
+        #: was already in that state
+        self.skipped = 0
+        # The _cat/aliases rows of this alias, read by _rows
+        self._alias_rows = None
+        # The indices to remove, which do_action_async checks for the alias
+        # when `client` is an AsyncElasticsearch client
+        self._pending_removes = []
+
+    def _rows(self):
+        """
+        Return a dictionary of each index which has the alias to its
+        ``_cat/aliases`` row.  Only this alias is read, and only once per
+        action, so adds and removes are diffed against the cluster as it is
+        now, not against an older shared
+        :class:`curator_api.helpers.alias.AliasMap`.
+        """
+        if self._alias_rows is None:
+            try:
+                rows = self.client.cat.aliases(**self._rows_request())
+            except NotFoundError:
+                rows = []
+            except Exception as err:
+                raise self._rows_failure(err)
+            self._rows_result(rows)
+        return self._alias_rows
+
+    def _rows_request(self):
+        """Return the ``cat.aliases`` arguments for :py:meth:`_rows`"""
+        return {'name': self.name, 'format': 'json', 'h': ','.join(ALIAS_COLUMNS)}
+
+    def _rows_result(self, rows):
+        """Keep and return the rows of this alias from `rows`"""
+        self._alias_rows = dict(
+            (row['index'], row) for row in rows if row['alias'] == self.name)
+        return self._alias_rows
+
+    def _rows_failure(self, err):
+        """Return the exception to raise when the rows can not be read"""
+        return FailedExecution(
+            'Failed to read alias {0}. Error: {1}'.format(self.name, err))
+
+    def _wanted(self):
+        """
+        Return the alias definition `extra_settings` asks for, in the form
+        ``indices.get_alias`` returns it
+        """
+        wanted = dict(self.extra_settings)
+        routing = wanted.pop('routing', None)
+        for key in _ROUTING:
+            wanted[key] = _routing(wanted.get(key, routing))
+        return wanted
+
+    def _definitions(self, indices):
+        """
+        Return a dictionary of each of `indices` to its full definition of
+        the alias, read with ``indices.get_alias``.  Indices which can not be
+        read are left out, so they are not skipped.
+        """
+        definitions = {}
+        for chunk in chunk_index_list(indices):
+            try:
+                response = self.client.indices.get_alias(
+                    index=','.join(chunk), name=self.name)
+            except Exception as err:
+                self.loggit.warning(
+                    'Unable to read alias {0}, not skipping any adds for {1} '
+                    'indices. Error: {2}'.format(self.name, len(chunk), err))
+                continue
+            for index, data in response.items():
+                if self.name in data.get('aliases', {}):
+                    definitions[index] = data['aliases'][self.name]
+        return definitions
+
+    def _current(self, index_list, wanted):
+        """
+        Return a dictionary of each index in `index_list` which already has
+        the alias to its definition of it.  The rows from :py:meth:`_rows`
+        tell which indices have the alias, and its routing.  The full
+        definition is only read from the cluster when a filter has to be
+        compared, or `extra_settings` has more than filter and routing.
+        """
+        if is_async_client(self.client):
+            return {}
+        rows = self._rows()
+        have = [index for index in index_list if index in rows]
+        current = dict((index, _cat_definition(rows[index])) for index in have)
+        extras = set(wanted) - set(_ROUTING) - set(['filter'])
+        detail = [
+            index for index in have
+            if extras or ('filter' in wanted and 'filter' in current[index])
+        ]
+        if detail:
+            current.update(self._definitions(detail))
+        return current
+
+    def _same(self, current, wanted):
+        """
+        Return `True` if the `current` definition of the alias is the one
+        `wanted`.
+        """
+        for key in set(wanted) | set(_ROUTING) | set(['filter']):
+            have, want = current.get(key), wanted.get(key)
+            if key in _ROUTING:
+                have = _routing(have)
+            elif key != 'filter' and key not in wanted:
+                continue
+            if have != want:
+                return False
+        return True
 
     def add(self, index_list, warn_if_no_indices=False):
         """
         Create `add` statements for each index in `index_list` for `alias`, then
         append them to `actions`.  Add any `extras` that may be there.
 
+        Indices which already have the alias, with the same filter, routing
+        and other `extra_settings`, are skipped, and counted in
+        :attr:`skipped`.
+
         :arg index_list: A list of indices to add to the alias
         :arg warn_if_no_indices: (bool) If true, only warn the user if there are no indices
         """
@@ -56,7 +211,15 @@ class Alias(ActionClass):
             else:
                 # Re-raise the NoIndices so it will behave as before
                 raise NoIndices
+        wanted = self._wanted()
+        current = self._current(index_list, wanted)
         for index in index_list:
+            if index in current and self._same(current[index], wanted):
+                self.loggit.debug(
+                    'Index {0} already in alias {1} with the same settings'.format(
+                        index, self.name))
+                self.skipped += 1
+                continue
             self.loggit.debug(
                 'Adding index {0} to alias {1} with extra settings {2}'.format(
                     index, self.name, self.extra_settings))
@@ -84,18 +247,28 @@ class Alias(ActionClass):
             else:
                 # Re-raise the NoIndices so it will behave as before
                 raise NoIndices
-        aliases = self.client.indices.get_alias()
+        if is_async_client(self.client):
+            # cat.aliases only returns a coroutine here, so the membership
+            # of these indices is checked once do_action_async awaits it
+            self._pending_removes.extend(index_list)
+            return
+        self._remove_members(index_list, self._rows())
+
+    def _remove_members(self, index_list, rows):
+        """
+        Append a `remove` action for each index in `index_list` which has the
+        alias in `rows`, and count the others as skipped.
+        """
         for index in index_list:
-            if index in aliases:
-                self.loggit.debug('Index {0} in get_aliases output'.format(index))
-                # Only remove if the index is associated with the alias
-                if self.name in aliases[index]['aliases']:
-                    self.loggit.debug('Removing index {0} from alias {1}'.format(index, self.name))
-                    self.actions.append({'remove': {'index': index, 'alias': self.name}})
-                else:
-                    self.loggit.debug(
-                        'Can not remove: Index {0} is not associated with alias {1}'.format(
-                            index, self.name))
+            # Only remove if the index is associated with the alias
+            if index in rows:
+                self.loggit.debug('Removing index {0} from alias {1}'.format(index, self.name))
+                self.actions.append({'remove': {'index': index, 'alias': self.name}})
+                continue
+            self.loggit.debug(
+                'Can not remove: Index {0} is not associated with alias {1}'.format(
+                    index, self.name))
+            self.skipped += 1
 
     def body(self):
         """
@@ -103,6 +276,10 @@ class Alias(ActionClass):
         call.
         """
         if not self.actions:
+            if self.skipped:
+                raise NoIndices(
+                    'All {0} "adds" and "removes" already done.  Taking no '
+                    'action'.format(self.skipped))
             if not self.warn_if_no_indices:
                 raise ActionError('No "add" or "remove" operations')
             else:
@@ -115,20 +292,12 @@ class Alias(ActionClass):
         Log what the output would be, but take no action.
         """
         self.loggit.info('DRY-RUN MODE.  No changes will be made.')
-        for item in self.body()['actions']:
-            job = list(item.keys())[0]
-            index = item[job]['index']
-            alias = item[job]['alias']
-            # We want our log to look clever, so if job is "remove", strip the
-            # 'e' so "remove" can become "removing".  "adding" works already.
-            self.loggit.info(
-                'DRY-RUN: alias: {0}ing index "{1}" {2} alias "{3}"'.format(
-                    job.rstrip('e'),
-                    index,
-                    'to' if job is 'add' else 'from',
-                    alias
-                )
-            )
+        for index in self._pending_removes:
+            self.loggit.info('DRY-RUN: alias: removing index "{0}" from alias '
+                '"{1}", if it has it'.format(index, self.name))
+        if self.actions or not self._pending_removes:
+            for item in self.body()['actions']:
+                self.loggit.info(_dry_run_line(item))
 
     def do_action(self):
         """
@@ -136,7 +305,195 @@ class Alias(ActionClass):
         """
         self.loggit.info('Updating aliases...')
         self.loggit.info('Alias actions: {0}'.format(self.body()))
+        if self.skipped:
+            self.loggit.info(
+                'Skipped {0} actions already done'.format(self.skipped))
         try:
             self.client.indices.update_aliases(body=self.body())
         except Exception as err:
             self.report_failure(err)
+        finally:
+            # Even a failed update may have changed some aliases
+            self._alias_rows = None
+            invalidate_alias_map(self.client)
+
+    def do_action_async(self):
+        """
+        Async version of :py:meth:`do_action`, for when `client` is an
+        ``AsyncElasticsearch`` client.  Checks the indices deferred by
+        :py:meth:`remove` before the update.  Returns an awaitable.
+        """
+        from curator_api.helpers.aio import async_update_aliases
+        return async_update_aliases(self)
+
+class AliasBatch(ActionClass):
+    """
+    Commit the actions of many :class:`Alias` objects with as few
+    `update_aliases` calls as possible, instead of one call, and one cluster
+    state update, per alias.
+
+    The actions of each alias are kept together in one body, so each alias is
+    still changed atomically, and bodies are filled up to `max_actions`.  An
+    alias with more actions than that is split over several bodies.
+    """
+    def __init__(self, client, max_actions=1000):
+        """
+        :arg client: An :class:`elasticsearch.Elasticsearch` client object
+        :arg max_actions: The most `add` and `remove` actions in one body
+        """
+        super(AliasBatch, self).__init__()
+        if max_actions < 1:
+            raise ConfigurationError('"max_actions" must be at least 1')
+        #: Instance variable.
+        #: The Elasticsearch Client object
+        self.client = client
+        #: Instance variable.
+        #: The most `add` and `remove` actions in one body
+        self.max_actions = max_actions
+        #: Instance variable.
+        #: The :class:`Alias` objects in the batch, in the order given
+        self.aliases = []
+        #: Instance variable.
+        #: A dictionary of alias name to a dictionary of the number of
+        #: ``added`` and ``removed`` indices, the number of actions
+        #: ``skipped`` as already done (see :attr:`Alias.skipped`), and the
+        #: ``error`` if its update failed.  Only the actions of calls which
+        #: succeeded are counted.  Filled by :py:meth:`do_action`.
+        self.report = {}
+        #: Instance variable.
+        #: The bodies from :py:meth:`bodies` whose `update_aliases` call
+        #: failed, each with the ``error`` it raised, so they can be retried.
+        #: Filled by :py:meth:`do_action`.
+        self.failed_bodies = []
+        self.loggit = logging.getLogger('curator.actions.alias')
+
+    def append(self, alias):
+        """
+        Add the actions of `alias` to the batch.
+
+        :arg alias: An :class:`Alias` object
+        """
+        self.aliases.append(alias)
+
+    def add(self, name, index_list, extra_settings=None):
+        """
+        Add `index_list` to the alias `name`, as with :py:meth:`Alias.add`.
+        Return the new :class:`Alias`.
+
+        :arg name: The alias name
+        :arg index_list: A list of indices to add to the alias
+        :arg extra_settings: Extra settings, including filters and routing
+        :rtype: :class:`Alias`
+        """
+        alias = Alias(self.client, name, extra_settings=extra_settings or {})
+        alias.add(index_list)
+        self.append(alias)
+        return alias
+
+    def remove(self, name, index_list):
+        """
+        Remove `index_list` from the alias `name`, as with
+        :py:meth:`Alias.remove`.  Return the new :class:`Alias`.
+
+        :arg name: The alias name
+        :arg index_list: A list of indices to remove from the alias
+        :rtype: :class:`Alias`
+        """
+        alias = Alias(self.client, name)
+        alias.remove(index_list)
+        self.append(alias)
+        return alias
+
+    def _groups(self):
+        """Return a list of (alias name, actions) with no empty ones"""
+        return [
+            (alias.name, alias.actions) for alias in self.aliases
+            if alias.actions
+        ]
+
+    def bodies(self):
+        """
+        Return the list of `update_aliases` bodies for the batch, each a
+        dictionary of the actions and the names of the aliases it changes.
+
+        :rtype: list
+        """
+        groups = self._groups()
+        if not groups:
+            raise NoIndices('No "adds" or "removes" found.  Taking no action')
+        bodies = []
+        actions, names = [], []
+        for name, group in groups:
+            for start in range(0, len(group), self.max_actions):
+                part = group[start:start + self.max_actions]
+                if actions and len(actions) + len(part) > self.max_actions:
+                    bodies.append({'actions': actions, 'aliases': names})
+                    actions, names = [], []
+                actions.extend(part)
+                if name not in names:
+                    names.append(name)
+        bodies.append({'actions': actions, 'aliases': names})
+        return bodies
+
+    def _count(self, name, actions):
+        """Count the actions for the alias `name` into :attr:`report`"""
+        entry = self.report[name]
+        for item in actions:
+            job = list(item.keys())[0]
+            if item[job]['alias'] == name:
+                entry['added' if job == 'add' else 'removed'] += 1
+
+    def do_dry_run(self):
+        """
+        Log the calls which would be made, but take no action.
+        """
+        self.loggit.info('DRY-RUN MODE.  No changes will be made.')
+        bodies = self.bodies()
+        for number, body in enumerate(bodies, 1):
+            self.loggit.info(
+                'DRY-RUN: update_aliases call {0} of {1}: {2} actions for '
+                'aliases {3}'.format(
+                    number, len(bodies), len(body['actions']), body['aliases'])
+            )
+            for item in body['actions']:
+                self.loggit.info(_dry_run_line(item))
+
+    def do_action(self):
+        """
+        Send one `update_aliases` call per body from :py:meth:`bodies`, and
+        record the outcome of each alias in :attr:`report`.  Raise a
+        `FailedExecution` naming the failed aliases if any call failed, after
+        trying every body.
+        """
+        bodies = self.bodies()
+        self.loggit.info('Updating {0} aliases with {1} calls'.format(
+            len(self._groups()), len(bodies)))
+        self.report = {}
+        for alias in self.aliases:
+            entry = self.report.setdefault(alias.name, {
+                'added': 0, 'removed': 0, 'skipped': 0, 'error': None})
+            entry['skipped'] += alias.skipped
+        self.failed_bodies = []
+        failed = []
+        try:
+            for body in bodies:
+                try:
+                    self.client.indices.update_aliases(
+                        body={'actions': body['actions']})
+                except Exception as err:
+                    self.loggit.error(
+                        'Failed to update aliases {0}: {1}'.format(
+                            body['aliases'], err))
+                    self.failed_bodies.append(dict(body, error=err))
+                    for name in body['aliases']:
+                        self.report[name]['error'] = err
+                        if name not in failed:
+                            failed.append(name)
+                else:
+                    for name in body['aliases']:
+                        self._count(name, body['actions'])
+        finally:
+            invalidate_alias_map(self.client)
+        if failed:
+            self.report_failure(FailedExecution(
+                'Failed to update aliases: {0}'.format(failed)))
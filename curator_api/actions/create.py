@@ -1,54 +1,234 @@
-# import logging
-# from curator.actions.parentclasses import ActionClass
-# from curator.exceptions import ConfigurationError
-# from curator.helpers.datemath import parse_date_pattern
-# from curator.helpers.client import verify_client_object
-
-# class CreateIndex(ActionClass):
-#     def __init__(self, client, name, extra_settings={}):
-#         """
-#         :arg client: An :class:`elasticsearch.Elasticsearch` client object
-#         :arg name: A name, which can contain :py:func:`time.strftime`
-#             strings
-#         :arg extra_settings: The `settings` and `mappings` for the index. For
-#             more information see
-#             https://www.elastic.co/guide/en/elasticsearch/reference/current/indices-create-index.html
-#         :type extra_settings: dict, representing the settings and mappings.
-#         """
-#         verify_client_object(client)
-#         if not name:
-#             raise ConfigurationError('Value for "name" not provided.')
-#         #: Instance variable.
-#         #: The parsed version of `name`
-#         self.name       = parse_date_pattern(name)
-#         #: Instance variable.
-#         #: Extracted from the config yaml, it should be a dictionary of
-#         #: mappings and settings suitable for index creation.
-#         self.body       = extra_settings
-#         #: Instance variable.
-#         #: An :class:`elasticsearch.Elasticsearch` client object
-#         self.client     = client
-#         self.loggit     = logging.getLogger('curator.actions.createindex')
-
-#     def do_dry_run(self):
-#         """
-#         Log what the output would be, but take no action.
-#         """
-#         self.loggit.info('DRY-RUN MODE.  No changes will be made.')
-#         self.loggit.info(
-#             'DRY-RUN: create_index "{0}" with arguments: '
-#             '{1}'.format(self.name, self.body)
-#         )
-
-#     def do_action(self):
-#         """
-#         Create index identified by `name` with settings in `body`
-#         """
-#         self.loggit.info(
-#             'Creating index "{0}" with settings: '
-#             '{1}'.format(self.name, self.body)
-#         )
-#         try:
-#             self.client.indices.create(index=self.name, body=self.body)
-#         except Exception as e:
-#             self.report_failure(e)
+"""Create Index Module"""
+import logging
+from elasticsearch.exceptions import TransportError
+from curator_api.actions.parentclasses import ActionClass
+from curator_api.exceptions import (
+    ActionTimeout, ConfigurationError, FailedExecution
+)
+from curator_api.helpers.alias import invalidate_alias_map
+from curator_api.helpers.client import api_params
+from curator_api.helpers.datemath import date_pattern_range, parse_date_pattern
+from curator_api.helpers.dispatch import BulkDispatcher
+from curator_api.helpers.index import (
+    chunk_index_list, forget_names, resolve_names
+)
+
+class CreateIndex(ActionClass):
+    """Create Index Class"""
+    def __init__(self, client, name, extra_settings={}):
+        """
+        :arg client: An :class:`elasticsearch.Elasticsearch` client object
+        :arg name: A name, which can contain :py:func:`time.strftime`
+            strings
+        :arg extra_settings: The `settings` and `mappings` for the index. For
+            more information see
+            https://www.elastic.co/guide/en/elasticsearch/reference/current/indices-create-index.html
+        :type extra_settings: dict, representing the settings and mappings.
+        """
+        if not name:
+            raise ConfigurationError('Value for "name" not provided.')
+        #: Instance variable.
+        #: The parsed version of `name`
+        self.name       = parse_date_pattern(name)
+        #: Instance variable.
+        #: Extracted from the config yaml, it should be a dictionary of
+        #: mappings and settings suitable for index creation.
+        self.body       = extra_settings
+        #: Instance variable.
+        #: An :class:`elasticsearch.Elasticsearch` client object
+        self.client     = client
+        self.loggit     = logging.getLogger('curator.actions.createindex')
+
+    def do_dry_run(self):
+        """
+        Log what the output would be, but take no action.
+        """
+        self.loggit.info('DRY-RUN MODE.  No changes will be made.')
+        self.loggit.info(
+            'DRY-RUN: create_index "{0}" with arguments: '
+            '{1}'.format(self.name, self.body)
+        )
+
+    def do_action(self):
+        """
+        Create index identified by `name` with settings in `body`
+        """
+        self.loggit.info(
+            'Creating index "{0}" with settings: '
+            '{1}'.format(self.name, self.body)
+        )
+        try:
+            self.client.indices.create(index=self.name, body=self.body)
+        except Exception as e:
+            self.report_failure(e)
+        finally:
+            forget_names(self.client, [self.name])
+            # The settings may give the index aliases
+            invalidate_alias_map(self.client)
+
+class BulkCreateIndex(ActionClass):
+    """
+    Create the indices named by rendering a :py:func:`time.strftime` name
+    over a time range, e.g. to create the next week of daily indices before
+    traffic arrives.
+
+    The names which already exist are found with one batched
+    :py:func:`curator_api.helpers.index.resolve_names`, the rest are created
+    concurrently, at most `max_workers` at a time, without waiting for
+    shards, and then one cluster health call per chunk of indices waits for
+    `wait_for_active_shards` across all of them.
+    """
+    def __init__(
+            self, client, name, count, unit='days', start=None,
+            extra_settings={}, max_workers=4, wait_for_active_shards=1,
+            timeout='30s'
+        ):
+        """
+        :arg client: An :class:`elasticsearch.Elasticsearch` client object
+        :arg name: A name, which can contain :py:func:`time.strftime`
+            strings
+        :arg count: The number of `unit` s to render `name` over
+        :arg unit: One of ``minutes``, ``hours``, ``days`` or ``weeks``
+        :arg start: The UTC :py:class:`datetime.datetime` to start at, or
+            `None` for now
+        :arg extra_settings: The `settings` and `mappings` for every index
+        :arg max_workers: The most create calls in flight at once
+        :arg wait_for_active_shards: The number of copies of each shard which
+            must be active, or ``all``, or `None` or 0 not to wait
+        :arg timeout: How long the health call waits, e.g. ``30s``
+        """
+        super(BulkCreateIndex, self).__init__()
+        if not name:
+            raise ConfigurationError('Value for "name" not provided.')
+        #: Instance variable.
+        #: The Elasticsearch Client object
+        self.client = client
+        #: Instance variable.
+        #: The rendered names, in order
+        self.names = date_pattern_range(name, count, unit=unit, start=start)
+        #: Instance variable.
+        #: The `settings` and `mappings` for every index
+        self.body = extra_settings
+        #: Instance variable.
+        #: The number of active copies of each shard to wait for
+        self.wait_for_active_shards = wait_for_active_shards
+        #: Instance variable.
+        #: How long the health call waits
+        self.timeout = timeout
+        #: Instance variable.
+        #: The names which already exist, found by :py:meth:`missing`
+        self.existing = []
+        #: Instance variable.
+        #: The indices created by :py:meth:`do_action`
+        self.created = []
+        #: Instance variable.
+        #: A dictionary of index name to the exception its create raised
+        self.failures = {}
+        self.dispatcher = BulkDispatcher(max_workers=max_workers)
+        self.loggit = logging.getLogger('curator.actions.createindex')
+
+    def missing(self):
+        """
+        Return the names which do not exist yet, and record the others in
+        :attr:`existing`.
+
+        :rtype: list
+        """
+        kinds = resolve_names(self.client, self.names)
+        self.existing = [name for name in self.names if kinds[name] != 'missing']
+        for name in self.existing:
+            self.loggit.info(
+                'Skipping "{0}", which already exists as {1}'.format(
+                    name, kinds[name]))
+        return [name for name in self.names if kinds[name] == 'missing']
+
+    def _create(self, chunk):
+        """Create the one index in `chunk`, without waiting for shards"""
+        return self.client.indices.create(
+            index=chunk[0], body=self.body, wait_for_active_shards=0)
+
+    def _health_request(self, indices):
+        """
+        Return the keyword arguments of the health call waiting for
+        `indices`.  ``all`` and 1 wait for green and yellow.  Other counts
+        are multiplied out to a total number of active shards.
+        """
+        request = {'index': ','.join(indices), 'timeout': self.timeout}
+        wanted = self.wait_for_active_shards
+        if str(wanted) == 'all':
+            request['wait_for_status'] = 'green'
+        elif int(wanted) <= 1:
+            request['wait_for_status'] = 'yellow'
+        else:
+            response = self.client.indices.get_settings(
+                index=request['index'], **api_params('create_shard_counts'))
+            request['wait_for_active_shards'] = sum(
+                int(wanted) * int(data['settings']['index']['number_of_shards'])
+                for data in response.values()
+            )
+        return request
+
+    def _wait(self):
+        """Wait for the shards of :attr:`created`"""
+        if str(self.wait_for_active_shards) in ('None', '0') or not self.created:
+            return
+        for chunk in chunk_index_list(self.created):
+            try:
+                response = self.client.cluster.health(
+                    **self._health_request(chunk))
+            except TransportError as err:
+                # The health API answers a timeout with an HTTP 408
+                if err.status_code != 408:
+                    self.report_failure(err)
+                response = {'timed_out': True}
+            except Exception as err:
+                self.report_failure(err)
+            if response.get('timed_out'):
+                raise ActionTimeout(
+                    'Timed out after {0} waiting for {1} active shards of '
+                    '{2} new indices'.format(
+                        self.timeout, self.wait_for_active_shards, len(chunk)))
+
+    def do_dry_run(self):
+        """
+        Log what the output would be, but take no action.
+        """
+        self.loggit.info('DRY-RUN MODE.  No changes will be made.')
+        for name in self.missing():
+            self.loggit.info(
+                'DRY-RUN: create_index "{0}" with arguments: '
+                '{1}'.format(name, self.body)
+            )
+
+    def do_action(self):
+        """
+        Create every index in :attr:`names` which does not exist yet, then
+        wait for their shards.  Raise a `FailedExecution` naming the indices
+        which could not be created, if any, even if the wait fails too.
+        """
+        missing = self.missing()
+        self.loggit.info(
+            'Creating {0} indices with settings: {1}'.format(
+                len(missing), self.body))
+        results = self.dispatcher.run(self._create, [[name] for name in missing])
+        self.created = [outcome.chunk[0] for outcome in results if outcome.ok]
+        self.failures = dict(
+            (outcome.chunk[0], outcome.error)
+            for outcome in results if not outcome.ok
+        )
+        forget_names(self.client, missing)
+        invalidate_alias_map(self.client)
+        failed = 'Failed to create indices: {0}'.format(sorted(self.failures))
+        if self.failures:
+            self.loggit.error(failed)
+        try:
+            self._wait()
+        except Exception as err:
+            # A timeout waiting for the others must not hide the failures
+            if not self.failures:
+                raise
+            self.report_failure(FailedExecution(
+                '{0}, then waiting for the created indices failed: '
+                '{1}'.format(failed, err)))
+        if self.failures:
+            self.report_failure(FailedExecution(failed))
@@ -1,98 +1,170 @@
-# import logging
-# from curator.actions.parentclasses import ActionClass
-# from curator.exceptions import FailedExecution
-# from curator.helpers.index import chunk_index_list, get_indices, verify_index_list
+"""Delete Module"""
+import logging
+import time
+from curator_api.actions.parentclasses import ActionClass
+from curator_api.exceptions import FailedExecution
+from curator_api.helpers.alias import invalidate_alias_map
+from curator_api.helpers.dispatch import (
+    BulkDispatcher, failed_chunks, remaining_work
+)
+from curator_api.helpers.index import (
+    chunk_index_list, existing_indices, forget_names
+)
+from curator_api.helpers.utils import empty_list_check, ensure_list, to_csv
 # from curator.helpers.snapshot import safe_to_snap, verify_snapshot_list
-# from curator.helpers.utils import to_csv
 # from curator.helpers.waiting import wait_for_it
 
-# class IndexDelete(ActionClass):
-#     def __init__(self, ilo, master_timeout=30):
-#         """
-#         :arg ilo: A :class:`curator.indexlist.IndexList` object
-#         :arg master_timeout: Number of seconds to wait for master node response
-#         """
-#         verify_index_list(ilo)
-#         if not isinstance(master_timeout, int):
-#             raise TypeError(
-#                 'Incorrect type for "master_timeout": {0}. '
-#                 'Should be integer value.'.format(type(master_timeout))
-#             )
-#         #: Instance variable.
-#         #: Internal reference to `ilo`
-#         self.index_list     = ilo
-#         #: Instance variable.
-#         #: The Elasticsearch Client object derived from `ilo`
-#         self.client         = ilo.client
-#         #: Instance variable.
-#         #: String value of `master_timeout` + 's', for seconds.
-#         self.master_timeout = str(master_timeout) + 's'
-#         self.loggit         = logging.getLogger('curator.actions.delete_indices')
-#         self.loggit.debug('master_timeout value: {0}'.format(
-#             self.master_timeout))
+class IndexDelete(ActionClass):
+    """Delete Indices Class"""
+    def __init__(
+            self, client, index_list, master_timeout=30, max_workers=4,
+            retry_backoff=1
+        ):
+        """
+        :arg client: An :class:`elasticsearch.Elasticsearch` client object
+        :arg index_list: A list of indices to delete
+        :arg master_timeout: Number of seconds to wait for master node response
+        :arg max_workers: The most chunks of indices to delete at once
+        :arg retry_backoff: Number of seconds to wait before retrying the
+            indices which survived a delete.  It doubles after each try.
+        """
+        super(IndexDelete, self).__init__()
+        if not isinstance(master_timeout, int):
+            raise TypeError(
+                'Incorrect type for "master_timeout": {0}. '
+                'Should be integer value.'.format(type(master_timeout))
+            )
+        #: Instance variable.
+        #: The Elasticsearch Client object
+        self.client         = client
+        #: Instance variable.
+        #: The list of indices to delete
+        self.index_list     = ensure_list(index_list)
+        #: Instance variable.
+        #: String value of `master_timeout` + 's', for seconds.
+        self.master_timeout = str(master_timeout) + 's'
+        #: Instance variable.
+        #: Sends the chunks of indices, up to `max_workers` at once
+        self.dispatcher     = BulkDispatcher(max_workers=max_workers, bisect=True)
+        #: Instance variable.
+        #: Internal reference to `retry_backoff`
+        self.retry_backoff  = retry_backoff
+        #: Instance variable.
+        #: The indices which still existed after the last try, set by
+        #: :py:meth:`do_action`
+        self.survivors      = []
+        #: Instance variable.
+        #: A dictionary of the indices which failed to delete to their
+        #: exception, set by :py:meth:`do_action`
+        self.failures       = {}
+        #: Instance variable.
+        #: The indices which still need deleting after :py:meth:`do_action`
+        self.remaining      = []
+        self.loggit         = logging.getLogger('curator.actions.delete_indices')
+        self.loggit.debug('master_timeout value: {0}'.format(
+            self.master_timeout))
 
-#     def _verify_result(self, result, count):
-#         """
-#         Breakout method to aid readability
-#         :arg result: A list of indices from `_get_result_list`
-#         :arg count: The number of tries that have occurred
-#         :rtype: bool
-#         """
-#         if len(result) > 0:
-#             self.loggit.error(
-#                 'The following indices failed to delete on try '
-#                 '#{0}:'.format(count)
-#             )
-#             for idx in result:
-#                 self.loggit.error("---{0}".format(idx))
-#             return False
-#         else:
-#             self.loggit.debug(
-#                 'Successfully deleted all indices on try #{0}'.format(count)
-#             )
-#             return True
+    def _verify_result(self, result, count):
+        """
+        Breakout method to aid readability
+        :arg result: A list of indices from `_get_result_list`
+        :arg count: The number of tries that have occurred
+        :rtype: bool
+        """
+        if len(result) > 0:
+            self.loggit.error(
+                'The following indices failed to delete on try '
+                '#{0}:'.format(count)
+            )
+            for idx in result:
+                self.loggit.error("---{0}".format(idx))
+            return False
+        else:
+            self.loggit.debug(
+                'Successfully deleted all indices on try #{0}'.format(count)
+            )
+            return True
 
-#     def __chunk_loop(self, chunk_list):
-#         """
-#         Loop through deletes 3 times to ensure they complete
-#         :arg chunk_list: A list of indices pre-chunked so it won't overload the
-#             URL size limit.
-#         """
-#         working_list = chunk_list
-#         for count in range(1, 4): # Try 3 times
-#             for i in working_list:
-#                 self.loggit.info("---deleting index {0}".format(i))
-#             self.client.indices.delete(
-#                 index=to_csv(working_list), master_timeout=self.master_timeout)
-#             result = [ i for i in working_list if i in get_indices(self.client)]
-#             if self._verify_result(result, count):
-#                 return
-#             else:
-#                 working_list = result
-#         self.loggit.error(
-#             'Unable to delete the following indices after 3 attempts: '
-#             '{0}'.format(result)
-#         )
+    def _chunk_loop(self, chunk_list):
+        """
+        Loop through deletes 3 times to ensure they complete.  Only the
+        indices of the chunk are checked for after each try, and the retries
+        back off.
+        :arg chunk_list: A list of indices pre-chunked so it won't overload the
+            URL size limit.
+        :returns: The indices which survived all 3 tries
+        :rtype: list
+        """
+        working_list = chunk_list
+        try:
+            for count in range(1, 4): # Try 3 times
+                if count > 1:
+                    time.sleep(self.retry_backoff * 2 ** (count - 2))
+                for i in working_list:
+                    self.loggit.info("---deleting index {0}".format(i))
+                self.client.indices.delete(
+                    index=to_csv(working_list),
+                    master_timeout=self.master_timeout
+                )
+                result = existing_indices(self.client, working_list)
+                if self._verify_result(result, count):
+                    return []
+                else:
+                    working_list = result
+        finally:
+            # Even a failed delete may have removed some of the chunk
+            forget_names(self.client, chunk_list)
+            invalidate_alias_map(self.client)
+        self.loggit.error(
+            'Unable to delete the following indices after 3 attempts: '
+            '{0}'.format(result)
+        )
+        self.survivors.extend(result)
+        return result
 
-#     def do_dry_run(self):
-#         """
-#         Log what the output would be, but take no action.
-#         """
-#         self.show_dry_run(self.index_list, 'delete_indices')
+    def do_dry_run(self):
+        """
+        Log what the output would be, but take no action.
+        """
+        self.show_dry_run(self.index_list, 'delete_indices')
 
-#     def do_action(self):
-#         """
-#         Delete indices in `index_list.indices`
-#         """
-#         self.index_list.empty_list_check()
-#         self.loggit.info(
-#             'Deleting selected indices: {0}'.format(self.index_list.indices))
-#         try:
-#             index_lists = chunk_index_list(self.index_list.indices)
-#             for l in index_lists:
-#                 self.__chunk_loop(l)
-#         except Exception as e:
-#             self.report_failure(e)
+    def do_action(self):
+        """
+        Delete indices in `index_list`, sending the chunks concurrently.  A
+        chunk which fails is bisected to find the indices which make it fail,
+        and every other index in it is still deleted.  The failures are
+        reported after all chunks are done, and :attr:`remaining` lists the
+        indices a re-run needs to delete.
+        """
+        empty_list_check(self.index_list)
+        self.loggit.info(
+            'Deleting selected indices: {0}'.format(self.index_list))
+        self.survivors = []
+        results = self.dispatcher.run(
+            self._chunk_loop, chunk_index_list(self.index_list))
+        if self.survivors:
+            self.loggit.error(
+                'Indices not deleted: {0}'.format(self.survivors))
+        self.failures = {}
+        for outcome in results:
+            self.failures.update(outcome.failures)
+        self.remaining = remaining_work(results) + self.survivors
+        if failed_chunks(results):
+            for index in sorted(self.failures):
+                self.loggit.error('Failed to delete {0}: {1}'.format(
+                    index, self.failures[index]))
+            # Chunks which were not bisected only have their own error
+            errors = []
+            for outcome in results:
+                if outcome.error is not None and not outcome.failures:
+                    if repr(outcome.error) not in errors:
+                        errors.append(repr(outcome.error))
+            self.report_failure(FailedExecution(
+                'Failed to delete {0} indices: {1}. Indices which failed: '
+                '{2}. Errors: {3}'.format(
+                    len(self.remaining), self.remaining,
+                    sorted(self.failures), errors)
+            ))
 
 # class SnapshotDelete(ActionClass):
 #     def __init__(self, slo, retry_interval=120, retry_count=3):
@@ -1,29 +1,141 @@
+"""Rollover Module"""
 import logging
-from curator.actions.parentclasses import ActionClass
-from curator.exceptions import ConfigurationError
-from curator.helpers.alias import rollable_alias
-from curator.helpers.client import get_version, verify_client_object
-from curator.helpers.datemath import parse_date_pattern
+import time
+from curator_api.actions.parentclasses import ActionClass
+from curator_api.exceptions import ConfigurationError, FailedExecution
+from curator_api.helpers.alias import (
+    get_alias_map, invalidate_alias_map, rollable_alias
+)
+from curator_api.helpers.dispatch import BulkDispatcher
+from curator_api.helpers.client import api_params, get_version, is_async_client
+from curator_api.helpers.datemath import parse_date_pattern
+from curator_api.helpers.index import chunk_index_list
+from curator_api.helpers.utils import parse_byte_size, parse_time
+
+logger = logging.getLogger('curator.actions.rollover')
+
+def _max_size_requested(data):
+    """
+    Return `True` if the ``max_size`` condition is in the flat dictionary of
+    conditions `data`
+    """
+    return 'max_size' in data
+
+def condition_values(conditions):
+    """
+    Return the flat dictionary of condition name to limit from `conditions`,
+    which may also be wrapped in a ``conditions`` key, as in the body of the
+    rollover API.
+
+    :arg conditions: A dictionary of conditions
+    :rtype: dict
+    """
+    if isinstance(conditions.get('conditions'), dict):
+        return conditions['conditions']
+    return conditions
+
+def write_index_stats(client, indices):
+    """
+    Return a dictionary of each of `indices` to its primary ``docs`` count,
+    primary ``size_in_bytes`` and ``creation_date`` in epoch seconds, as
+    used by the rollover conditions.  This takes one ``indices.stats`` and
+    one ``indices.get_settings`` call per chunk of indices.
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg indices: A list of index names
+    :rtype: dict
+    """
+    stats = dict((index, {}) for index in indices)
+    try:
+        for chunk in chunk_index_list(indices):
+            csv = ','.join(chunk)
+            response = client.indices.stats(
+                index=csv, **api_params('rollover_stats'))
+            for index, data in response.get('indices', {}).items():
+                primaries = data['primaries']
+                stats[index]['docs'] = primaries['docs']['count']
+                stats[index]['size_in_bytes'] = primaries['store']['size_in_bytes']
+            response = client.indices.get_settings(
+                index=csv, **api_params('rollover_creation_date'))
+            for index, data in response.items():
+                stats[index]['creation_date'] = (
+                    int(data['settings']['index']['creation_date']) // 1000)
+    except Exception as err:
+        raise FailedExecution(
+            'Failed to read write index stats. Error: {0}'.format(err))
+    return stats
+
+def evaluate_conditions(conditions, stats, margin=0.1, now=None):
+    """
+    Evaluate the rollover `conditions` locally against `stats`, one entry
+    of :py:func:`write_index_stats`.  Return ``met`` if any condition is met,
+    ``near`` if any is within `margin` (a fraction of its limit) of being
+    met, and ``far`` otherwise.  Conditions which can not be evaluated here,
+    whether unknown, unparseable or missing their stat, count as ``near``,
+    so that the rollover API decides them.
+
+    ``max_docs`` and ``max_size`` are compared with the primaries, as the
+    rollover API does.
+
+    :arg conditions: A dictionary of conditions, as for :class:`Rollover`
+    :arg stats: A dictionary of ``docs``, ``size_in_bytes`` and
+        ``creation_date`` (epoch seconds)
+    :arg margin: The fraction of each limit within which a condition is near
+    :arg now: The epoch time to compute the age from, or `None` for now
+    :rtype: str
+    """
+    now = time.time() if now is None else now
+    outcome = 'far'
+    for name, limit in condition_values(conditions).items():
+        try:
+            if name == 'max_age':
+                value, limit = now - stats['creation_date'], parse_time(limit)
+            elif name == 'max_docs':
+                value, limit = stats['docs'], int(limit)
+            elif name == 'max_size':
+                value, limit = stats['size_in_bytes'], parse_byte_size(limit)
+            else:
+                raise ValueError('Unknown rollover condition: {0}'.format(name))
+        except (KeyError, ValueError) as err:
+            logger.debug('Unable to evaluate {0} locally: {1}'.format(name, err))
+            outcome = 'near'
+            continue
+        if value >= limit:
+            return 'met'
+        if value >= limit * (1 - margin):
+            outcome = 'near'
+    return outcome
 
 class Rollover(ActionClass):
+    """Rollover Class"""
     def __init__(
             self, client, name, conditions, new_index=None, extra_settings=None,
-            wait_for_active_shards=1
+            wait_for_active_shards=1, alias_map=None, version=None
         ):
         """
         :arg client: An :class:`elasticsearch.Elasticsearch` client object
         :arg name: The name of the single-index-mapped alias to test for
             rollover conditions.
         :new_index: The new index name
-        :arg conditions: A dictionary of conditions to test
+        :arg conditions: A dictionary of conditions to test, such as
+            ``{'max_age': '7d'}``.  The rollover API's
+            ``{'conditions': {'max_age': '7d'}}`` is also accepted.
         :arg extra_settings: Must be either `None`, or a dictionary of settings
             to apply to the new index on rollover. This is used in place of
             `settings` in the Rollover API, mostly because it's already existent
             in other places here in Curator
         :arg wait_for_active_shards: The number of shards expected to be active
             before returning.
+        :arg alias_map: A :class:`curator_api.helpers.alias.AliasMap`, such as
+            the one from :py:func:`curator_api.helpers.alias.get_alias_map`,
+            to check `name` against instead of asking the cluster about it
+        :arg version: The version tuple from
+            :py:func:`curator_api.helpers.client.get_version`, if already
+            known
+
+        If `client` is an ``AsyncElasticsearch`` client, the alias and version
+        checks are deferred to :py:meth:`do_action_async`.
         """
-        verify_client_object(client)
         self.loggit     = logging.getLogger('curator.actions.rollover')
         if not isinstance(conditions, dict):
             raise ConfigurationError('"conditions" must be a dictionary')
@@ -36,8 +148,8 @@ class Rollover(ActionClass):
         #: The Elasticsearch Client object
         self.client     = client
         #: Instance variable.
-        #: Internal reference to `conditions`
-        self.conditions = self._check_max_size(conditions)
+        #: The flat dictionary of `conditions`
+        self.conditions = condition_values(conditions)
         #: Instance variable.
         #: Internal reference to `extra_settings`
         self.settings   = extra_settings
@@ -48,32 +160,60 @@ class Rollover(ActionClass):
         #: Internal reference to `wait_for_active_shards`
         self.wait_for_active_shards = wait_for_active_shards
 
-        # Verify that `conditions` and `settings` are good?
-        # Verify that `name` is an alias, and is only mapped to one index.
-        if rollable_alias(client, name):
-            self.name = name
-        else:
+        #: Instance variable.
+        #: The alias name
+        self.name = name
+
+        # API calls cannot be awaited here, so `do_action_async` runs these
+        if not is_async_client(client):
+            self._check_max_size(self.conditions, version=version)
+            # Verify that `conditions` and `settings` are good?
+            # Verify that `name` is an alias, and is only mapped to one index.
+            self._verify_rollable(
+                rollable_alias(client, name, alias_map=alias_map))
+
+    def _verify_rollable(self, rollable):
+        """
+        Raise a `ValueError` if the alias `name` is not rollable.
+
+        :arg rollable: The result of
+            :py:func:`curator_api.helpers.alias.rollable_alias`
+        """
+        if not rollable:
             raise ValueError(
                     'Unable to perform index rollover with alias '
-                    '"{0}". See previous logs for more details.'.format(name)
+                    '"{0}". See previous logs for more details.'.format(self.name)
                 )
 
-    def _check_max_size(self, data):
+    def _max_size_requested(self, data):
+        """
+        Return `True` if the ``max_size`` condition is in `data`
+        """
+        return _max_size_requested(data)
+
+    def _verify_max_size(self, version):
+        """
+        Raise a `ConfigurationError` if `version` does not support the
+        ``max_size`` condition.
+
+        :arg version: The version tuple from
+            :py:func:`curator_api.helpers.client.get_version`
+        """
+        if version < (6,1,0):
+            raise ConfigurationError(
+                'Your version of elasticsearch ({0}) does not support '
+                'the max_size rollover condition. It is only supported '
+                'in versions 6.1.0 and up.'.format(version)
+            )
+
+    def _check_max_size(self, data, version=None):
         """
         Ensure that if ``max_size`` is specified, that ``self.client``
-        is running 6.1 or higher.
+        is running 6.1 or higher.  `version` is read from the cluster if it
+        is not given.
         """
-        try:
-            if 'max_size' in data['conditions']:
-                version = get_version(self.client)
-                if version < (6,1,0):
-                    raise ConfigurationError(
-                        'Your version of elasticsearch ({0}) does not support '
-                        'the max_size rollover condition. It is only supported '
-                        'in versions 6.1.0 and up.'.format(version)
-                    )
-        except KeyError:
-            self.loggit.debug('data does not contain dict key "conditions"')
+        if self._max_size_requested(data):
+            self._verify_max_size(version or get_version(self.client))
         return data
 
     def body(self):
@@ -115,18 +255,29 @@ class Rollover(ActionClass):
                     result['old_index'])
             )
 
+    def _rollover_request(self, dry_run=False):
+        """
+        Return the keyword arguments for the ``indices.rollover`` call, shared
+        by :py:meth:`doit` and :py:meth:`do_action_async`
+        """
+        return {
+            'alias': self.name,
+            'new_index': self.new_index,
+            'body': self.body(),
+            'dry_run': dry_run,
+            'wait_for_active_shards': self.wait_for_active_shards,
+        }
+
     def doit(self, dry_run=False):
         """
         This exists solely to prevent having to have duplicate code in both
         `do_dry_run` and `do_action`
         """
-        return self.client.indices.rollover(
-            alias=self.name,
-            new_index=self.new_index,
-            body=self.body(),
-            dry_run=dry_run,
-            wait_for_active_shards=self.wait_for_active_shards,
-        )
+        result = self.client.indices.rollover(**self._rollover_request(dry_run))
+        if not dry_run:
+            # The alias may now point to the new index
+            invalidate_alias_map(self.client)
+        return result
 
     def do_dry_run(self):
         """
@@ -144,3 +295,213 @@ class Rollover(ActionClass):
             self.log_result(self.doit())
         except Exception as e:
             self.report_failure(e)
+
+    def do_action_async(self):
+        """
+        Async version of :py:meth:`do_action`, for when `client` is an
+        ``AsyncElasticsearch`` client.  Runs the checks deferred by the
+        constructor before the rollover.  Returns an awaitable.
+        """
+        from curator_api.helpers.aio import async_rollover
+        self.loggit.info('Performing index rollover')
+        return async_rollover(self)
+
+#: The columns of :py:meth:`RolloverGroup.format_results`
+RESULT_COLUMNS = ('alias', 'old_index', 'new_index', 'rolled_over', 'conditions')
+
+class RolloverGroup(ActionClass):
+    """
+    Roll over many aliases with the same `conditions`.  All aliases are
+    checked against one :class:`curator_api.helpers.alias.AliasMap`, with at
+    most one version lookup, and the rollover calls are then sent
+    concurrently, at most `max_workers` at a time.
+
+    Aliases which can not be rolled over are recorded as failed in
+    :attr:`results`, rather than stopping the others.
+
+    With `precheck_margin`, the conditions are first evaluated locally with
+    :py:func:`evaluate_conditions`, from the stats of every write index
+    fetched at once by :py:func:`write_index_stats`, and the rollover API is
+    only called for aliases which meet a condition, or are within
+    `precheck_margin` of one.  This also saves the dry run calls of
+    :py:meth:`do_dry_run`.
+    """
+    def __init__(
+            self, client, names, conditions, extra_settings=None,
+            wait_for_active_shards=1, max_workers=4, precheck_margin=None
+        ):
+        """
+        :arg client: An :class:`elasticsearch.Elasticsearch` client object
+        :arg names: A list of the names of single-index-mapped aliases
+        :arg conditions: A dictionary of conditions to test
+        :arg extra_settings: Must be either `None`, or a dictionary of settings
+            to apply to the new indices on rollover
+        :arg wait_for_active_shards: The number of shards expected to be active
+            before returning.
+        :arg max_workers: The most rollover calls in flight at once
+        :arg precheck_margin: `None` to call the rollover API for every alias,
+            or the fraction of each condition's limit within which an alias is
+            close enough to meeting it to call the API, e.g. ``0.1``
+        """
+        super(RolloverGroup, self).__init__()
+        self.loggit = logging.getLogger('curator.actions.rollover')
+        #: Instance variable.
+        #: The Elasticsearch Client object
+        self.client = client
+        #: Instance variable.
+        #: The :class:`Rollover` of each alias which passed its checks
+        self.rollovers = []
+        #: Instance variable.
+        #: The :attr:`results` entries of the aliases which failed their checks
+        self.invalid = []
+        #: Instance variable.
+        #: A list with a dictionary per alias of its ``alias``,
+        #: ``old_index``, ``new_index``, whether it ``rolled_over``, the
+        #: ``conditions`` met, the ``error`` if it failed, and whether the
+        #: rollover API call was ``skipped`` by the local pre-check, sorted by
+        #: alias.  Filled by :py:meth:`do_action` and :py:meth:`do_dry_run`.
+        self.results = []
+        #: Instance variable.
+        #: The fraction of each condition's limit within which the rollover
+        #: API is called, or `None` to always call it
+        self.precheck_margin = precheck_margin
+        #: Instance variable.
+        #: The flat dictionary of conditions, for the local pre-check
+        self.conditions = condition_values(conditions)
+        #: Instance variable.
+        #: A dictionary of alias name to its write index
+        self.write_indices = {}
+        self.dispatcher = BulkDispatcher(max_workers=max_workers)
+        alias_map = get_alias_map(client)
+        version = None
+        if _max_size_requested(self.conditions):
+            version = get_version(client)
+        for name in names:
+            try:
+                self.rollovers.append(Rollover(
+                    client, name, self.conditions, extra_settings=extra_settings,
+                    wait_for_active_shards=wait_for_active_shards,
+                    alias_map=alias_map, version=version
+                ))
+            except ValueError as err:
+                self.invalid.append(self._result(name, error=err))
+                continue
+            self.write_indices[name] = alias_map.indices_of(name)[0]
+
+    def _precheck(self):
+        """
+        Split :attr:`rollovers` into those to send, and the
+        :attr:`results` entries of those which are far from every condition
+        """
+        if self.precheck_margin is None or not self.rollovers:
+            return self.rollovers, []
+        stats = write_index_stats(
+            self.client, sorted(set(self.write_indices.values())))
+        now = time.time()
+        send, skipped = [], []
+        for rollover in self.rollovers:
+            index = self.write_indices[rollover.name]
+            if evaluate_conditions(
+                    self.conditions, stats[index], self.precheck_margin,
+                    now) == 'far':
+                self.loggit.debug(
+                    'Index {0} of alias {1} is far from the rollover '
+                    'conditions. Not calling the rollover API.'.format(
+                        index, rollover.name))
+                result = self._result(rollover.name, {'old_index': index})
+                result['skipped'] = True
+                skipped.append(result)
+            else:
+                send.append(rollover)
+        return send, skipped
+
+    def _result(self, name, response=None, error=None):
+        """Return the :attr:`results` entry for the alias `name`"""
+        response = response or {}
+        return {
+            'alias': name,
+            'old_index': response.get('old_index'),
+            'new_index': response.get('new_index'),
+            'rolled_over': response.get('rolled_over', False),
+            'conditions': sorted(
+                k for k, v in response.get('conditions', {}).items() if v),
+            'error': error,
+            'skipped': False,
+        }
+
+    def _run(self, dry_run=False):
+        """
+        Send the rollover call of every alias, and add the outcomes to
+        :attr:`results`.  Return the names of the aliases which failed.
+        """
+        send, skipped = self._precheck()
+        outcomes = self.dispatcher.run(
+            lambda chunk: chunk[0].doit(dry_run=dry_run),
+            [[rollover] for rollover in send]
+        )
+        self.results = self.invalid + skipped
+        failed = [result['alias'] for result in self.invalid]
+        for outcome in outcomes:
+            rollover = outcome.chunk[0]
+            if outcome.ok:
+                rollover.log_result(outcome.result)
+                self.results.append(self._result(rollover.name, outcome.result))
+            else:
+                failed.append(rollover.name)
+                self.results.append(
+                    self._result(rollover.name, error=outcome.error))
+        self.results.sort(key=lambda result: result['alias'])
+        return failed
+
+    def format_results(self):
+        """
+        Return :attr:`results` as lines of a text table, one row per alias.
+
+        :rtype: list
+        """
+        rows = [RESULT_COLUMNS]
+        for result in self.results:
+            row = []
+            for column in RESULT_COLUMNS:
+                value = result[column]
+                if column == 'conditions':
+                    value = ','.join(value) or '-'
+                if column == 'rolled_over':
+                    if result['error'] is not None:
+                        value = 'failed'
+                    elif result['skipped']:
+                        value = 'skipped'
+                row.append('-' if value is None else str(value))
+            rows.append(row)
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return [
+            '  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+            for row in rows
+        ]
+
+    def _log_results(self, prefix=''):
+        """Log :py:meth:`format_results`"""
+        for line in self.format_results():
+            self.loggit.info('{0}{1}'.format(prefix, line))
+
+    def do_dry_run(self):
+        """
+        Log what the output would be, but take no action.
+        """
+        self.loggit.info('DRY-RUN MODE.  No changes will be made.')
+        self._run(dry_run=True)
+        self._log_results('DRY-RUN: ')
+
+    def do_action(self):
+        """
+        Roll over every alias, log the results, and raise a
+        `FailedExecution` naming the aliases which failed, if any.
+        """
+        self.loggit.info(
+            'Performing index rollover of {0} aliases'.format(
+                len(self.rollovers)))
+        failed = self._run()
+        self._log_results()
+        if failed:
+            self.report_failure(FailedExecution(
+                'Failed to roll over aliases: {0}'.format(failed)))
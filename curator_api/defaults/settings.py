@@ -21,6 +21,90 @@ def regex_map():
         'suffix': r'^.*{0}$',
     }
 
+# Minimal response parameters for helper API calls.  Each helper only reads a
+# few fields, so these ask Elasticsearch to leave out the rest.  Values may
+# contain ``str.format`` fields, filled in by the helper making the call.
+def minimal_response_params():
+    return {
+        'get_indices': { 'name': 'index.uuid' },
+        'get_version': { 'filter_path': 'version.number' },
+        'health_check': { 'filter_path': '{keys}' },
+        'index_size': {
+            'metric': 'store',
+            'filter_path': 'indices.*.total.store.size_in_bytes',
+        },
+        'create_shard_counts': { 'name': 'index.number_of_shards' },
+        'existing_indices': { 'name': 'index.uuid' },
+        'find_snapshot_tasks': { 'filter_path': 'nodes.*.tasks.*.action' },
+        'index_inventory_settings': {
+            'name': (
+                'index.number_of_shards,index.number_of_replicas,'
+                'index.creation_date'
+            ),
+        },
+        'load_aliases': { 'filter_path': '*.aliases' },
+        'load_ilm': { 'filter_path': 'indices' },
+        'load_segments': {
+            'filter_path': 'indices.*.shards.*.num_search_segments',
+        },
+        'load_settings': {
+            'filter_path': (
+                '*.settings.index.number_of_shards,'
+                '*.settings.index.number_of_replicas,'
+                '*.settings.index.creation_date,*.settings.index.routing'
+            ),
+        },
+        'load_state': {
+            'metric': 'metadata',
+            'filter_path': 'metadata.indices.*.state',
+        },
+        'load_stats': {
+            'metric': 'store,docs',
+            'filter_path': (
+                'indices.*.total.store.size_in_bytes,'
+                'indices.*.primaries.docs.count'
+            ),
+        },
+        'max_line_length': {
+            'filter_path': (
+                'nodes.*.name,nodes.*.settings.http.max_initial_line_length'
+            ),
+        },
+        'node_roles': { 'filter_path': 'nodes.*.roles' },
+        # Shared by name_to_node_id, node_id_to_name and single_data_path so
+        # that their calls are identical, and can be coalesced.
+        'nodes_stats': {
+            'metric': 'fs',
+            'filter_path': 'nodes.*.name,nodes.*.fs.data',
+        },
+        'relocate_check': {
+            'metric': 'routing_table',
+            'filter_path': 'routing_table.indices.*.shards.*.state',
+        },
+        'restore_check': { 'filter_path': '*.shards.stage' },
+        'rollover_creation_date': { 'name': 'index.creation_date' },
+        'rollover_stats': {
+            'metric': 'docs,store',
+            'filter_path': (
+                'indices.*.primaries.docs.count,'
+                'indices.*.primaries.store.size_in_bytes'
+            ),
+        },
+        'snapshot_check': { 'filter_path': 'snapshots.state' },
+        'stream_snapshot_data': {
+            'filter_path': (
+                'snapshots.snapshot,snapshots.state,snapshots.start_time,'
+                'snapshots.start_time_in_millis'
+            ),
+        },
+        'task_check': {
+            'filter_path': (
+                'completed,task.description,task.running_time_in_nanos,'
+                'task.start_time_in_millis'
+            ),
+        },
+    }
+
 def date_regex():
     return {
         'Y' : '4',
@@ -82,6 +166,51 @@ def index_filtertypes():
         'space',
     ]
 
+# The index metadata each filtertype needs besides the index names, which
+# the filter planner fetches for the surviving indices only.  The age-based
+# filtertypes also need whatever their ``source`` needs.
+def filter_metadata():
+    return {
+        'age': [],
+        'alias': ['aliases'],
+        'allocated': ['settings'],
+        'closed': ['state'],
+        'count': [],
+        'forcemerged': ['segments'],
+        'ilm': ['ilm'],
+        'kibana': [],
+        'none': [],
+        'opened': ['state'],
+        'pattern': [],
+        'period': [],
+        'space': ['stats'],
+    }
+
+def age_source_metadata():
+    return {
+        'name': [],
+        'creation_date': ['settings'],
+        'field_stats': ['field_stats'],
+    }
+
+# Relative cost of fetching each kind of index metadata.  The planner runs
+# cheaper filters first, so the costly fetches cover fewer indices.
+def metadata_costs():
+    return {
+        'aliases': 1,
+        'settings': 2,
+        'state': 2,
+        'ilm': 3,
+        'stats': 4,
+        'segments': 5,
+        'field_stats': 6,
+    }
+
+# Filtertypes whose result depends on which indices are still in the list,
+# so no filter may be moved across them.
+def order_dependent_filtertypes():
+    return ['count', 'space']
+
 def snapshot_filtertypes():
     return ['age', 'count', 'none', 'pattern', 'period', 'state']
 
@@ -0,0 +1,478 @@
+"""Filter planning and demand-driven index metadata"""
+import logging
+import re
+import threading
+from elasticsearch.client.utils import _make_path
+from curator_api.defaults import settings
+from curator_api.exceptions import ConfigurationError, FailedExecution
+from curator_api.helpers.client import api_params
+from curator_api.helpers.datemath import get_date_regex
+from curator_api.helpers.dispatch import BulkDispatcher, failed_chunks
+from curator_api.helpers.index import (
+    chunk_index_list, get_indices, stream_indices
+)
+from curator_api.indextable import IndexTable
+
+logger = logging.getLogger(__name__)
+
+#: Index name prefixes of Kibana and Marvel indices, matched by the ``kibana``
+#: filtertype
+KIBANA_INDICES = ['.kibana', '.marvel-kibana', 'kibana-int', '.marvel-es-data']
+
+def filter_needs(config):
+    """
+    Return the sorted list of kinds of index metadata the filter `config`
+    needs, from :py:func:`curator_api.defaults.settings.filter_metadata`.
+
+    :arg config: A filter definition, e.g. ``{'filtertype': 'pattern', ...}``
+    :rtype: list
+    """
+    filtertype = config['filtertype']
+    try:
+        needs = set(settings.filter_metadata()[filtertype])
+    except KeyError:
+        raise ConfigurationError(
+            'Unknown filtertype: {0}'.format(filtertype))
+    uses_age = filtertype in ['age', 'period'] or (
+        filtertype in ['count', 'space'] and config.get('use_age'))
+    if uses_age:
+        source = config.get('source', 'creation_date')
+        try:
+            needs.update(settings.age_source_metadata()[source])
+        except KeyError:
+            raise ConfigurationError('Unknown age source: {0}'.format(source))
+    return sorted(needs)
+
+def filter_cost(config):
+    """
+    Return the relative cost of the metadata the filter `config` needs.  Name
+    only filters cost 0.
+    """
+    costs = settings.metadata_costs()
+    return max([costs[kind] for kind in filter_needs(config)] or [0])
+
+# Regular expression characters which can not be part of a literal index name
+_REGEX_SPECIAL = set('.^$*+?{}[]\\|()')
+# Quantifiers, which make the character before them optional or repeated
+_QUANTIFIERS = set('*+?{')
+# Alternation and groups, which can make any part of a pattern optional
+_ALTERNATION = set('|(')
+
+def _literal_part(value, kind):
+    """
+    Return the longest part of the regular expression `value` which is a
+    literal string at the anchored end of a ``prefix`` or ``suffix`` pattern,
+    or an empty string if there is none.
+    """
+    if _ALTERNATION.intersection(value):
+        return ''
+    positions = [i for i, char in enumerate(value) if char in _REGEX_SPECIAL]
+    if not positions:
+        return value
+    if kind == 'prefix':
+        end = positions[0]
+        if value[end] in _QUANTIFIERS:
+            # The character before a quantifier need not be there at all
+            end -= 1
+        return value[:max(end, 0)]
+    return value[positions[-1] + 1:]
+
+def _wildcard(literal, kind):
+    """Return the index wildcard matching names with `literal` at `kind`"""
+    return literal + '*' if kind == 'prefix' else '*' + literal
+
+def wildcard_expression(filters):
+    """
+    Return an index expression for the listing calls which selects only what
+    the leading ``prefix`` and ``suffix`` pattern filters in `filters` can
+    match, or ``_all`` if there are none.  The filters still run afterwards,
+    so the expression only needs to be a superset of their result:
+
+    * One included pattern is pushed down, as ``logs-app1-*``.  Only its
+      literal part is used, so ``logs-2017.01`` becomes ``logs-2017*`` and
+      ``logs-a?`` becomes ``logs-*``.  Patterns with ``|`` or groups are not
+      pushed down.
+    * Excluded patterns are pushed down as ``-logs-app1-*``, after ``*`` if no
+      pattern is included, but only if they are literal (a ``.`` is fine, as
+      it matches a literal dot as well).
+    * Filters after a ``count`` or ``space`` filter are not pushed down.
+
+    :arg filters: A list of filter definitions
+    :rtype: str
+    """
+    includes = []
+    excludes = []
+    for config in filters:
+        if config['filtertype'] in settings.order_dependent_filtertypes():
+            break
+        kind = config.get('kind')
+        if config['filtertype'] != 'pattern' or kind not in ['prefix', 'suffix']:
+            continue
+        value = config['value']
+        if config.get('exclude', False):
+            if not _REGEX_SPECIAL.difference('.').intersection(value):
+                excludes.append('-' + _wildcard(value, kind))
+        else:
+            literal = _literal_part(value, kind)
+            if literal:
+                includes.append(_wildcard(literal, kind))
+    if not includes and not excludes:
+        return '_all'
+    # A longer literal part selects fewer indices
+    include = max(includes, key=len) if includes else '*'
+    return ','.join([include] + excludes)
+
+def _pattern(indices, config, loader=None):
+    """The ``pattern`` filtertype"""
+    kind = config['kind']
+    value = config['value']
+    if kind == 'timestring':
+        regex = settings.regex_map()[kind].format(get_date_regex(value))
+    elif kind in settings.regex_map():
+        regex = settings.regex_map()[kind].format(value)
+    else:
+        raise ConfigurationError('Unknown pattern kind: {0}'.format(kind))
+    pattern = re.compile(regex)
+    exclude = config.get('exclude', False)
+    return [i for i in indices if bool(pattern.search(i)) != exclude]
+
+def _kibana(indices, config, loader=None):
+    """The ``kibana`` filtertype"""
+    exclude = config.get('exclude', True)
+    return [
+        i for i in indices
+        if any(i.startswith(k) for k in KIBANA_INDICES) != exclude
+    ]
+
+def _none(indices, config, loader=None):
+    """The ``none`` filtertype"""
+    return list(indices)
+
+#: The filtertypes which only need index names, and are run by the planner
+NAME_FILTERS = {
+    'kibana': _kibana,
+    'none': _none,
+    'pattern': _pattern,
+}
+
+class MetadataLoader(object):
+    """
+    Fetch kinds of index metadata on demand, for only the indices asked for,
+    and never twice for the same index.  Column values go into :attr:`table`,
+    an :class:`curator_api.indextable.IndexTable` of the indices of the first
+    load, and each index's part of every response goes into :attr:`data`.
+
+    The calls for different kinds and chunks are independent, so they are
+    sent concurrently, up to `max_in_flight` at once, and merged as they
+    arrive.
+    """
+    def __init__(self, client, max_in_flight=4):
+        """
+        :arg client: An :class:`elasticsearch.Elasticsearch` client object
+        :arg max_in_flight: The most metadata calls in flight at once.  Keep
+            this small, so as not to overload the master node.
+        """
+        #: Instance variable.
+        #: The Elasticsearch Client object
+        self.client = client
+        #: Instance variable.
+        #: An :class:`curator_api.indextable.IndexTable`, created on first load
+        self.table = None
+        #: Instance variable.
+        #: A dictionary of metadata kind to a dictionary of index name to that
+        #: index's part of the response
+        self.data = {}
+        #: Instance variable.
+        #: A dictionary of metadata kind to the number of API calls made
+        self.calls = {}
+        self.dispatcher = BulkDispatcher(
+            max_workers=max_in_flight, stop_on_error=True)
+        self._lock = threading.Lock()
+
+    def load(self, kinds, indices):
+        """
+        Fetch each kind of metadata in `kinds` for the indices in `indices`
+        which do not have it yet.  Kinds with no loader, such as
+        ``field_stats``, are left to the filter which needs them.
+
+        :arg kinds: A list of metadata kinds
+        :arg indices: A list of index names
+        """
+        if self.table is None:
+            self.table = IndexTable([(index, {}) for index in indices])
+        calls = []
+        for kind in kinds:
+            if getattr(self, '_fetch_{0}'.format(kind), None) is None:
+                logger.debug('No loader for {0} metadata'.format(kind))
+                continue
+            have = self.data.setdefault(kind, {})
+            missing = [i for i in indices if i not in have]
+            if not missing:
+                continue
+            logger.debug(
+                'Loading {0} metadata for {1} indices'.format(kind, len(missing)))
+            calls.extend((kind, chunk) for chunk in chunk_index_list(missing))
+        for outcome in failed_chunks(self.dispatcher.run(self._call, calls)):
+            if outcome.done:
+                raise FailedExecution(
+                    'Failed to load {0} metadata. Error: {1}'.format(
+                        outcome.chunk[0], outcome.error))
+
+    def _call(self, call):
+        """Fetch one kind of metadata for one chunk, and merge it"""
+        kind, chunk = call
+        response = getattr(self, '_fetch_{0}'.format(kind))(','.join(chunk))
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+            have = self.data[kind]
+            getattr(self, '_merge_{0}'.format(kind))(response, have)
+            # Indices left out of the response, e.g. closed indices in
+            # stats, have no such metadata.  Don't ask for them again.
+            for index in chunk:
+                have.setdefault(index, None)
+
+    def _fetch_aliases(self, csv):
+        return self.client.indices.get_alias(
+            index=csv, **api_params('load_aliases'))
+
+    def _merge_aliases(self, response, have):
+        for index, data in response.items():
+            have[index] = list(data.get('aliases', {}))
+
+    def _fetch_ilm(self, csv):
+        return self.client.transport.perform_request(
+            'GET', _make_path(csv, '_ilm', 'explain'),
+            params=api_params('load_ilm')
+        )
+
+    def _merge_ilm(self, response, have):
+        for index, data in response['indices'].items():
+            have[index] = data
+
+    def _fetch_segments(self, csv):
+        return self.client.indices.segments(
+            index=csv, params={'ignore_unavailable': 'true'},
+            **api_params('load_segments')
+        )
+
+    def _merge_segments(self, response, have):
+        counts = {}
+        for index, data in response.get('indices', {}).items():
+            counts[index] = sum(
+                shard['num_search_segments']
+                for copies in data['shards'].values() for shard in copies
+            )
+            have[index] = counts[index]
+        self.table.set('segments', counts)
+
+    def _fetch_settings(self, csv):
+        return self.client.indices.get_settings(
+            index=csv, params={'expand_wildcards': 'open,closed'},
+            **api_params('load_settings')
+        )
+
+    def _merge_settings(self, response, have):
+        columns = {'number_of_shards': {}, 'number_of_replicas': {}, 'creation_date': {}}
+        for index, data in response.items():
+            have[index] = data['settings']['index']
+            for column, values in columns.items():
+                value = have[index].get(column)
+                if value is not None and column == 'creation_date':
+                    value = int(value) // 1000
+                values[index] = value
+        for column, values in columns.items():
+            self.table.set(column, values)
+
+    def _fetch_state(self, csv):
+        return self.client.cluster.state(index=csv, **api_params('load_state'))
+
+    def _merge_state(self, response, have):
+        for index, data in response['metadata']['indices'].items():
+            have[index] = data['state']
+        self.table.set('state', dict(
+            (index, have[index]) for index in response['metadata']['indices']))
+
+    def _fetch_stats(self, csv):
+        return self.client.indices.stats(
+            index=csv, params={'ignore_unavailable': 'true'},
+            **api_params('load_stats')
+        )
+
+    def _merge_stats(self, response, have):
+        sizes, docs = {}, {}
+        for index, data in response.get('indices', {}).items():
+            sizes[index] = data['total']['store']['size_in_bytes']
+            docs[index] = data['primaries']['docs']['count']
+            have[index] = {'size_in_bytes': sizes[index], 'docs': docs[index]}
+        self.table.set('size_in_bytes', sizes)
+        self.table.set('docs', docs)
+
+class FilterPlan(object):
+    """
+    Plan a chain of filter definitions so that name only filters (``pattern``,
+    ``kibana`` and ``none``) run first, followed by the rest in order of the
+    cost of the metadata they need.  Filters are only moved within runs of
+    filters which do not depend on the order of the list: ``count`` and
+    ``space`` stay where they are, with everything before them.
+
+    :py:meth:`run` then fetches each kind of metadata just before the first
+    filter needing it, for only the indices which survived so far.
+    """
+    def __init__(self, filters, max_in_flight=4):
+        """
+        :arg filters: A list of filter definitions
+        :arg max_in_flight: The most metadata calls in flight at once, for
+            each :class:`MetadataLoader`
+        """
+        #: Instance variable.
+        #: The filter definitions, in the order given
+        self.filters = filters
+        #: Instance variable.
+        #: The most metadata calls in flight at once
+        self.max_in_flight = max_in_flight
+        #: Instance variable.
+        #: The filter definitions, in the order they will run
+        self.steps = []
+        barriers = settings.order_dependent_filtertypes()
+        run = []
+        for config in filters:
+            if config['filtertype'] in barriers:
+                self.steps += sorted(run, key=filter_cost)
+                self.steps.append(config)
+                run = []
+            else:
+                run.append(config)
+        self.steps += sorted(run, key=filter_cost)
+
+    @property
+    def expression(self):
+        """
+        The index expression for listing indices, from
+        :py:func:`wildcard_expression`
+        """
+        return wildcard_expression(self.filters)
+
+    @property
+    def needs(self):
+        """The sorted list of all kinds of metadata the filters need"""
+        kinds = set()
+        for config in self.steps:
+            kinds.update(filter_needs(config))
+        return sorted(kinds)
+
+    def run(self, client, indices=None, filter_functions=None):
+        """
+        Run the planned filters on `indices`, and return the survivors.  If
+        `indices` is `None`, only the indices matching :attr:`expression` are
+        listed from the cluster, rather than all of them.
+
+        Filtertypes other than the name only ones are run by the function of
+        the same name in `filter_functions`, called with the list of surviving
+        indices, the filter definition and the :class:`MetadataLoader`, whose
+        metadata has already been loaded for those indices.  It must return
+        the new list of surviving indices.  `filter_functions` may also
+        replace the name only filters, which are called the same way.
+
+        :arg client: An :class:`elasticsearch.Elasticsearch` client object
+        :arg indices: The list of index names to filter, or `None`
+        :arg filter_functions: A dictionary of filtertype to function
+        :rtype: list
+        """
+        if indices is None:
+            indices = get_indices(client, index=self.expression)
+        return self._run_steps(self.steps, client, indices, filter_functions)
+
+    def _run_steps(self, steps, client, indices, filter_functions):
+        """
+        Run the filters in `steps` on `indices`, with a new
+        :class:`MetadataLoader`, and return the survivors.
+        """
+        functions = dict(NAME_FILTERS)
+        functions.update(filter_functions or {})
+        loader = MetadataLoader(client, max_in_flight=self.max_in_flight)
+        survivors = list(indices)
+        for config in steps:
+            if not survivors:
+                break
+            filtertype = config['filtertype']
+            if filtertype not in functions:
+                raise ConfigurationError(
+                    'No function for filtertype: {0}'.format(filtertype))
+            kinds = filter_needs(config)
+            if kinds:
+                loader.load(kinds, survivors)
+            survivors = functions[filtertype](survivors, config, loader)
+            logger.debug('Indices left after {0} filter: {1}'.format(
+                filtertype, len(survivors)))
+        return survivors
+
+    def run_paged(
+            self, client, page_size=1000, indices=None, filter_functions=None
+        ):
+        """
+        Memory bounded version of :py:meth:`run`, for very large clusters.
+        Yield the surviving indices a list at a time.
+
+        The index names are streamed from the cluster (only those matching
+        :attr:`expression`) with
+        :py:func:`curator_api.helpers.index.stream_indices`, and split into
+        pages of `page_size` names.  Each page is filtered on its own, with
+        its own :class:`MetadataLoader`, so no more than a page of metadata is
+        held at once, and its survivors are yielded before the next page is
+        read.  This gives the same result as :py:meth:`run` because every
+        filter but ``count`` and ``space`` decides each index on its own.
+
+        ``count`` and ``space`` need every surviving index at once, so a
+        chain with either is run in two passes:
+
+        1. The filters planned before the first ``count`` or ``space`` run
+           page by page, as above, but only the names of their survivors are
+           kept.
+        2. The rest of the chain runs on those names in one go, as with
+           :py:meth:`run`, fetching metadata only for them, and the result is
+           yielded as one list.
+
+        Memory in the first pass is bounded by the page size, and in the
+        second by the number of indices which survived the first.
+
+        :arg client: An :class:`elasticsearch.Elasticsearch` client object
+        :arg page_size: The number of index names in a page
+        :arg indices: An iterable of the index names to filter, or `None` to
+            stream them from the cluster
+        :arg filter_functions: A dictionary of filtertype to function, as for
+            :py:meth:`run`
+        """
+        if indices is None:
+            indices = stream_indices(client, index=self.expression)
+        barriers = settings.order_dependent_filtertypes()
+        split = len(self.steps)
+        for position, config in enumerate(self.steps):
+            if config['filtertype'] in barriers:
+                split = position
+                break
+        paged, whole = self.steps[:split], self.steps[split:]
+        survivors = []
+        for page in _pages(indices, page_size):
+            selected = self._run_steps(paged, client, page, filter_functions)
+            if whole:
+                survivors.extend(selected)
+            elif selected:
+                yield selected
+        if whole and survivors:
+            logger.debug(
+                'Running filters from {0} on the {1} indices left'.format(
+                    whole[0]['filtertype'], len(survivors)))
+            selected = self._run_steps(whole, client, survivors, filter_functions)
+            if selected:
+                yield selected
+
+def _pages(indices, page_size):
+    """Yield lists of up to `page_size` names from the iterable `indices`"""
+    page = []
+    for index in indices:
+        page.append(index)
+        if len(page) >= page_size:
+            yield page
+            page = []
+    if page:
+        yield page
@@ -0,0 +1,248 @@
+"""
+Asyncio helpers
+
+Coroutine versions of the helpers that make API calls, for use with an
+``AsyncElasticsearch`` client (from the ``elasticsearch-async`` package).  Each
+one builds its request and evaluates its response with the same code as its
+synchronous counterpart, and only differs in awaiting the API call.
+
+This module requires Python 3.5 or newer.  The ``do_action_async`` methods of
+the actions import it on demand, so the rest of the package still imports on
+older versions.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from elasticsearch.exceptions import NotFoundError
+from curator_api.exceptions import FailedExecution
+from curator_api.helpers.alias import _rollable_result, invalidate_alias_map
+from curator_api.helpers.client import _parse_version, api_params
+from curator_api.helpers.index import _get_indices_request, _log_indices
+from curator_api.helpers.waiting import (
+    _health_check_request, _health_check_result, _missing_task,
+    _relocate_check_request, _relocate_check_result, _restore_check_request,
+    _restore_check_result, _restore_failure, _snapshot_check_request,
+    _snapshot_check_result, _snapshot_failure, _task_check_request,
+    _task_check_result, _task_failure, _verify_health_check_args,
+    _verify_wait_args, _verify_wait_result, _wait_action_map, _wait_outcome
+)
+
+logger = logging.getLogger(__name__)
+
+async def async_get_version(client):
+    """
+    Async version of :py:func:`curator_api.helpers.client.get_version`
+
+    :arg client: An ``AsyncElasticsearch`` client object
+    :rtype: tuple
+    """
+    return _parse_version(await client.info(**api_params('get_version')))
+
+async def async_get_indices(client, index='_all'):
+    """
+    Async version of :py:func:`curator_api.helpers.index.get_indices`
+
+    :arg client: An ``AsyncElasticsearch`` client object
+    :arg index: An index expression to list only the indices it matches
+    :rtype: list
+    """
+    try:
+        indices = list(
+            await client.indices.get_settings(**_get_indices_request(index)))
+        _log_indices(indices, await async_get_version(client))
+        return indices
+    except Exception as err:
+        raise FailedExecution('Failed to get indices. Error: {0}'.format(err))
+
+async def async_rollable_alias(client, alias):
+    """
+    Async version of :py:func:`curator_api.helpers.alias.rollable_alias`
+
+    :arg client: An ``AsyncElasticsearch`` client object
+    :arg alias: An Elasticsearch alias
+    """
+    try:
+        response = await client.indices.get_alias(name=alias)
+    except NotFoundError:
+        logger.error('alias "{0}" not found.'.format(alias))
+        return False
+    return _rollable_result(response)
+
+async def async_health_check(client, **kwargs):
+    """
+    Async version of :py:func:`curator_api.helpers.waiting.health_check`
+
+    :arg client: An ``AsyncElasticsearch`` client object
+    """
+    _verify_health_check_args(kwargs)
+    return _health_check_result(
+        await client.cluster.health(**_health_check_request(kwargs)), **kwargs)
+
+async def async_relocate_check(client, index):
+    """
+    Async version of :py:func:`curator_api.helpers.waiting.relocate_check`
+
+    :arg client: An ``AsyncElasticsearch`` client object
+    :arg index: The index to check the index shards state.
+    """
+    return _relocate_check_result(
+        await client.cluster.state(**_relocate_check_request(index)), index)
+
+async def async_snapshot_check(client, snapshot=None, repository=None):
+    """
+    Async version of :py:func:`curator_api.helpers.waiting.snapshot_check`
+
+    :arg client: An ``AsyncElasticsearch`` client object
+    :arg snapshot: The name of the snapshot.
+    :arg repository: The Elasticsearch snapshot repository to use
+    """
+    try:
+        response = await client.snapshot.get(
+            **_snapshot_check_request(snapshot, repository))
+        state = response['snapshots'][0]['state']
+    except Exception as e:
+        raise _snapshot_failure(snapshot, repository, e)
+    return _snapshot_check_result(state, snapshot)
+
+async def async_restore_check(client, index_list):
+    """
+    Async version of :py:func:`curator_api.helpers.waiting.restore_check`
+
+    :arg client: An ``AsyncElasticsearch`` client object
+    :arg index_list: The list of indices to verify having been restored.
+    """
+    try:
+        response = await client.indices.recovery(
+            **_restore_check_request(index_list))
+    except Exception as e:
+        raise _restore_failure(e)
+    return _restore_check_result(response, index_list)
+
+async def async_task_check(client, task_id=None):
+    """
+    Async version of :py:func:`curator_api.helpers.waiting.task_check`
+
+    :arg client: An ``AsyncElasticsearch`` client object
+    :arg task_id: A task_id which ostensibly matches a task searchable in the
+        tasks API.
+    """
+    try:
+        task_data = await client.tasks.get(**_task_check_request(task_id))
+    except Exception as e:
+        raise _task_failure(task_id, e)
+    return _task_check_result(task_data, task_id)
+
+async def async_wait_for_it(
+        client, action, task_id=None, snapshot=None, repository=None,
+        index=None, index_list=None, wait_interval=9, max_wait=-1
+    ):
+    """
+    Async version of :py:func:`curator_api.helpers.waiting.wait_for_it`.
+    Sleeping between checks yields to the event loop rather than blocking it.
+
+    :arg client: An ``AsyncElasticsearch`` client object
+    :arg action: The action name that will identify how to wait
+    :arg task_id: If the action provided a task_id, this is where it must be
+        declared.
+    :arg snapshot: The name of the snapshot.
+    :arg repository: The Elasticsearch snapshot repository to use
+    :arg wait_interval: How frequently the specified "wait" behavior will be
+        polled to check for completion.
+    :arg max_wait: Number of seconds will the "wait" behavior persist
+        before giving up and raising an Exception.  The default is -1, meaning
+        it will try forever.
+    """
+    action_map = _wait_action_map(
+        {
+            'health': async_health_check,
+            'snapshot': async_snapshot_check,
+            'restore': async_restore_check,
+            'task': async_task_check,
+            'relocate': async_relocate_check,
+        },
+        task_id=task_id, snapshot=snapshot, repository=repository,
+        index=index, index_list=index_list
+    )
+    _verify_wait_args(
+        action, list(action_map.keys()), task_id=task_id, snapshot=snapshot,
+        repository=repository, index_list=index_list
+    )
+    if action == 'reindex':
+        try:
+            _ = await client.tasks.get(task_id=task_id)
+        except Exception as e:
+            raise _missing_task(task_id, e)
+
+    start_time = datetime.now()
+    result = None
+    while result is None:
+        elapsed = int((datetime.now() - start_time).total_seconds())
+        logger.debug('Elapsed time: {0} seconds'.format(elapsed))
+        response = await action_map[action]['function'](
+            client, **action_map[action]['args'])
+        result = _wait_outcome(action, response, elapsed, max_wait, wait_interval)
+        if result is None:
+            await asyncio.sleep(wait_interval)
+    _verify_wait_result(action, result, max_wait)
+
+async def async_request(method, on_failure, **kwargs):
+    """
+    Await the API call `method` with `kwargs`, passing any exception to
+    `on_failure`.  This backs the ``do_action_async`` methods of the action
+    classes, which use their own ``report_failure`` as `on_failure`.
+
+    :arg method: A bound ``AsyncElasticsearch`` API method
+    :arg on_failure: A callable that accepts the exception
+    """
+    try:
+        await method(**kwargs)
+    except Exception as err:
+        on_failure(err)
+
+async def async_rollover(rollover, dry_run=False):
+    """
+    Run the checks a :class:`curator_api.actions.rollover.Rollover` defers when
+    built with an ``AsyncElasticsearch`` client, then perform the rollover and
+    log the result.  Backs :py:meth:`Rollover.do_action_async`.
+
+    :arg rollover: A :class:`curator_api.actions.rollover.Rollover` object
+    :arg dry_run: Only test the rollover conditions.
+    """
+    client = rollover.client
+    if rollover._max_size_requested(rollover.conditions):
+        rollover._verify_max_size(await async_get_version(client))
+    rollover._verify_rollable(await async_rollable_alias(client, rollover.name))
+    try:
+        rollover.log_result(
+            await client.indices.rollover(**rollover._rollover_request(dry_run)))
+    except Exception as err:
+        rollover.report_failure(err)
+
+async def async_update_aliases(alias):
+    """
+    Check the indices an :class:`curator_api.actions.alias.Alias` built with
+    an ``AsyncElasticsearch`` client defers removing, then update the aliases.
+    Backs :py:meth:`Alias.do_action_async`.
+
+    :arg alias: A :class:`curator_api.actions.alias.Alias` object
+    """
+    client = alias.client
+    if alias._pending_removes:
+        try:
+            rows = await client.cat.aliases(**alias._rows_request())
+        except NotFoundError:
+            rows = []
+        except Exception as err:
+            raise alias._rows_failure(err)
+        alias._remove_members(alias._pending_removes, alias._rows_result(rows))
+        alias._pending_removes = []
+    alias.loggit.info('Updating aliases...')
+    alias.loggit.info('Alias actions: {0}'.format(alias.body()))
+    try:
+        await client.indices.update_aliases(body=alias.body())
+    except Exception as err:
+        alias.report_failure(err)
+    finally:
+        # Even a failed update may have changed some aliases
+        alias._alias_rows = None
+        invalidate_alias_map(client)
@@ -1,21 +1,129 @@
 from elasticsearch.exceptions import NotFoundError
 import logging
+import time
+import weakref
+from curator_api.exceptions import FailedExecution
 
 logger = logging.getLogger(__name__)
 
-def rollable_alias(client, alias):
+#: The ``_cat/aliases`` columns read by :class:`AliasMap`
+ALIAS_COLUMNS = ('alias', 'index', 'filter', 'routing.index', 'routing.search')
+
+# The shared AliasMap of each client
+_ALIAS_MAPS = weakref.WeakKeyDictionary()
+
+#: The seconds :py:func:`get_alias_map` shares an :class:`AliasMap` for
+ALIAS_MAP_MAX_AGE = 30
+
+class AliasMap(object):
     """
-    Ensure that `alias` is an alias, and points to an index that can use the
-    _rollover API.
+    Every alias in the cluster, read with a single ``_cat/aliases`` call, as
+    a dictionary of alias to indices and one of index to aliases.
+
+    Use :py:func:`get_alias_map` to share one map between everything in a
+    run, rather than creating one each time.
+    """
+    def __init__(self, client):
+        """
+        :arg client: An :class:`elasticsearch.Elasticsearch` client object
+        """
+        #: Instance variable.
+        #: The Elasticsearch Client object
+        self.client = client
+        #: Instance variable.
+        #: A dictionary of alias name to the sorted list of its indices
+        self.aliases = {}
+        #: Instance variable.
+        #: A dictionary of index name to the sorted list of its aliases
+        self.indices = {}
+        #: Instance variable.
+        #: A dictionary of (alias, index) to the ``_cat/aliases`` row for it,
+        #: with ``filter`` (``*`` if the alias has one, else ``-``),
+        #: ``routing.index`` and ``routing.search``
+        self.rows = {}
+        #: Instance variable.
+        #: The epoch time the aliases were last read
+        self.read_at = None
+        self.refresh()
+
+    def __contains__(self, alias):
+        return alias in self.aliases
+
+    def refresh(self):
+        """Read the aliases from the cluster again."""
+        read_at = time.time()
+        try:
+            rows = self.client.cat.aliases(
+                format='json', h=','.join(ALIAS_COLUMNS))
+        except Exception as err:
+            raise FailedExecution(
+                'Failed to read aliases. Error: {0}'.format(err))
+        aliases = {}
+        indices = {}
+        self.rows = {}
+        for row in rows:
+            aliases.setdefault(row['alias'], []).append(row['index'])
+            indices.setdefault(row['index'], []).append(row['alias'])
+            self.rows[(row['alias'], row['index'])] = row
+        self.aliases = dict((k, sorted(v)) for k, v in aliases.items())
+        self.indices = dict((k, sorted(v)) for k, v in indices.items())
+        self.read_at = read_at
+        logger.debug('Read {0} aliases of {1} indices'.format(
+            len(self.aliases), len(self.indices)))
+
+    def indices_of(self, alias):
+        """
+        Return the sorted list of indices `alias` points to, which is empty if
+        there is no such alias.
+
+        :rtype: list
+        """
+        return list(self.aliases.get(alias, []))
+
+    def aliases_of(self, index):
+        """
+        Return the sorted list of aliases of `index`.
+
+        :rtype: list
+        """
+        return list(self.indices.get(index, []))
+
+def get_alias_map(client, max_age=ALIAS_MAP_MAX_AGE):
+    """
+    Return the :class:`AliasMap` shared by everything using `client`,
+    reading it from the cluster again if it was invalidated, or read more
+    than `max_age` seconds ago, so that aliases changed by other clients are
+    seen soon after.
 
     :arg client: An :class:`elasticsearch.Elasticsearch` client object
-    :arg alias: An Elasticsearch alias
+    :arg max_age: The seconds the shared map is reused for.  With 0, it is
+        always read again.
+    :rtype: :class:`AliasMap`
+    """
+    alias_map = _ALIAS_MAPS.get(client)
+    if alias_map is None or time.time() - alias_map.read_at >= max_age:
+        alias_map = _ALIAS_MAPS[client] = AliasMap(client)
+    return alias_map
+
+def invalidate_alias_map(client):
+    """
+    Drop the shared :class:`AliasMap` of `client`, so the next
+    :py:func:`get_alias_map` reads it again.  Call this after changing
+    aliases, e.g. with ``update_aliases`` or ``rollover``, or after creating
+    or deleting indices, which adds or removes their aliases.
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    """
+    _ALIAS_MAPS.pop(client, None)
+
+def _rollable_result(response):
+    """
+    Evaluate a ``client.indices.get_alias`` response for
+    :py:func:`rollable_alias`
+
+    :arg response: The get_alias response for a single alias
+    :rtype: bool
     """
-    try:
-        response = client.indices.get_alias(name=alias)
-    except NotFoundError:
-        logger.error('alias "{0}" not found.'.format(alias))
-        return False
     # Response should be like:
     # {'there_should_be_only_one': {u'aliases': {'value of "alias" here': {}}}}
     # Where 'there_should_be_only_one' is a single index name that ends in a
@@ -39,4 +147,27 @@ def rollable_alias(client, alias):
                 rollable = True
             elif index[-2:][0] == '-':
                 rollable = True
-        return rollable
\ No newline at end of file
+        return rollable
+
+def rollable_alias(client, alias, alias_map=None):
+    """
+    Ensure that `alias` is an alias, and points to an index that can use the
+    _rollover API.
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg alias: An Elasticsearch alias
+    :arg alias_map: An :class:`AliasMap` to check instead of asking the
+        cluster about `alias` alone
+    """
+    if alias_map is not None:
+        indices = alias_map.indices_of(alias)
+        if not indices:
+            logger.error('alias "{0}" not found.'.format(alias))
+            return False
+        return _rollable_result(dict((index, {}) for index in indices))
+    try:
+        response = client.indices.get_alias(name=alias)
+    except NotFoundError:
+        logger.error('alias "{0}" not found.'.format(alias))
+        return False
+    return _rollable_result(response)
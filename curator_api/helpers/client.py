@@ -1,17 +1,99 @@
 """Client helpers"""
+import os
+import elasticsearch
+from curator_api.defaults.settings import minimal_response_params
+from curator_api.helpers.serializer import get_serializer
+from curator_api.helpers.transport import LatencyAwareTransport
 
-def get_version(client):
+# Set CURATOR_API_FULL_RESPONSES in the environment to start with full
+# responses, e.g. when debugging.
+_MINIMAL_RESPONSES = {'enabled': not os.environ.get('CURATOR_API_FULL_RESPONSES')}
+
+def set_minimal_responses(enabled=True):
     """
-    Return the ES version number as a tuple.
-    Omits trailing tags like -dev, or Beta
+    Turn the minimal response parameters from :py:func:`api_params` on or off.
+    Turning them off makes every helper download full responses again, which
+    can be useful when debugging.
+
+    :arg enabled: Whether to request minimal responses
+    :type enabled: bool
+    """
+    _MINIMAL_RESPONSES['enabled'] = enabled
+
+def api_params(name, **kwargs):
+    """
+    Return the minimal response parameters (``filter_path``, ``metric``, etc.)
+    registered for helper call `name` in
+    :py:func:`curator_api.defaults.settings.minimal_response_params`, or an
+    empty dictionary if they are turned off.
+
+    :arg name: The registered name of the helper call
+    :arg kwargs: Values for any ``str.format`` fields in the parameters
+    :rtype: dict
+    """
+    if not _MINIMAL_RESPONSES['enabled']:
+        return {}
+    return dict(
+        (k, v.format(**kwargs)) for k, v in minimal_response_params()[name].items())
+
+def get_client(latency_aware=False, hedged_reads=False, **kwargs):
+    """
+    Return an :class:`elasticsearch.Elasticsearch` client object built with
+    `kwargs`.  Unless a ``serializer`` is provided, the fastest available JSON
+    serializer from :py:func:`curator_api.helpers.serializer.get_serializer`
+    is used to encode requests and decode responses.
+
+    :arg latency_aware: Send requests to the fastest hosts, with a
+        :class:`curator_api.helpers.transport.LatencyAwareTransport`
+    :arg hedged_reads: Also hedge idempotent reads to a second host when the
+        first is slow.  Implies `latency_aware`.
+    :arg kwargs: Any arguments accepted by :class:`elasticsearch.Elasticsearch`
+    :rtype: :class:`elasticsearch.Elasticsearch`
+    """
+    if kwargs.get('serializer') is None:
+        kwargs['serializer'] = get_serializer()
+    if latency_aware or hedged_reads:
+        kwargs['transport_class'] = LatencyAwareTransport
+        kwargs['hedged_reads'] = hedged_reads
+    return elasticsearch.Elasticsearch(**kwargs)
+
+def is_async_client(client):
+    """
+    Return `True` if `client` is an ``AsyncElasticsearch`` client object, whose
+    API calls return awaitables rather than responses.
+
+    Both the ``elasticsearch-async`` package and newer releases of
+    ``elasticsearch-py`` name their asyncio client ``AsyncElasticsearch``, so
+    the class name is checked rather than importing either one.
 
     :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :rtype: bool
+    """
+    return any(
+        cls.__name__ == 'AsyncElasticsearch' for cls in type(client).__mro__)
+
+def _parse_version(info):
+    """
+    Return the ES version number from a ``client.info()`` response as a tuple.
+    Omits trailing tags like -dev, or Beta
+
+    :arg info: The response from ``client.info()``
     :rtype: tuple
     """
-    version = client.info()['version']['number']
+    version = info['version']['number']
     version = version.split('-')[0]
     if len(version.split('.')) > 3:
         version = version.split('.')[:-1]
     else:
        version = version.split('.')
     return tuple(map(int, version))
+
+def get_version(client):
+    """
+    Return the ES version number as a tuple.
+    Omits trailing tags like -dev, or Beta
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :rtype: tuple
+    """
+    return _parse_version(client.info(**api_params('get_version')))
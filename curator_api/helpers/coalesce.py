@@ -0,0 +1,133 @@
+"""Request coalescing for idempotent reads"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class CoalescingTransport(object):
+    """
+    Wrap an :class:`elasticsearch.Transport` so that identical ``GET`` and
+    ``HEAD`` requests share one HTTP request and one decoded response.
+
+    A request is identical if it has the same method, url, headers, params
+    and body.  Requests made while an identical one is in flight wait for its
+    response, and requests made within `window` seconds of it completing
+    reuse that response.  All other requests, and all other attributes, pass
+    straight through to the wrapped transport.  Any other request may change
+    what a read returns, so it drops every shared response, both before it
+    is sent and once it completes.
+
+    Because the decoded response is shared, callers must not modify it.
+    """
+    def __init__(self, transport, window=1.0):
+        """
+        :arg transport: The :class:`elasticsearch.Transport` object to wrap
+        :arg window: Number of seconds a completed response is reused for.
+        """
+        #: Instance variable.
+        #: The wrapped transport
+        self.transport = transport
+        #: Instance variable.
+        #: Number of seconds a completed response is reused for.
+        self.window = window
+        #: Instance variable.
+        #: Counts of ``calls`` received, ``requests`` sent and ``saved`` calls
+        #: which shared another call's response.
+        self.stats = {'calls': 0, 'requests': 0, 'saved': 0}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name == 'transport':
+            raise AttributeError(name)
+        return getattr(self.transport, name)
+
+    def _key(self, method, url, headers, params, body):
+        """Return the key identifying identical requests"""
+        return (
+            method, url, repr(sorted((headers or {}).items())),
+            repr(sorted((params or {}).items())), repr(body)
+        )
+
+    def _prune(self, now=None):
+        """
+        Drop completed responses older than `now`.  Must hold ``self._lock``.
+        """
+        for key in list(self._entries.keys()):
+            entry = self._entries[key]
+            if entry['event'].is_set() and (now is None or entry['expires'] < now):
+                del self._entries[key]
+
+    def _forget(self):
+        """
+        Stop sharing every response, including those still in flight.  Calls
+        already waiting on one still get it.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def clear(self):
+        """
+        Drop all completed responses, so the next call of each is sent again.
+        """
+        with self._lock:
+            self._prune()
+
+    def perform_request(self, method, url, headers=None, params=None, body=None):
+        """
+        Perform the request, or share the response of an identical one.
+        Arguments are the same as :py:meth:`elasticsearch.Transport.perform_request`
+        """
+        if method not in ('GET', 'HEAD'):
+            self._forget()
+            try:
+                return self.transport.perform_request(
+                    method, url, headers=headers, params=params, body=body)
+            finally:
+                # Reads sent while this was in flight may predate it
+                self._forget()
+        key = self._key(method, url, headers, params, body)
+        with self._lock:
+            self.stats['calls'] += 1
+            self._prune(time.time())
+            entry = self._entries.get(key)
+            if entry:
+                self.stats['saved'] += 1
+                owner = False
+            else:
+                entry = {'event': threading.Event(), 'expires': None}
+                self._entries[key] = entry
+                self.stats['requests'] += 1
+                owner = True
+        if owner:
+            try:
+                entry['response'] = self.transport.perform_request(
+                    method, url, headers=headers, params=params, body=body)
+            except Exception as err:
+                entry['error'] = err
+                # Errors are shared with waiting calls, but never reused
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+            entry['expires'] = time.time() + self.window
+            entry['event'].set()
+        else:
+            logger.debug('Coalesced {0} {1}'.format(method, url))
+            entry['event'].wait()
+        if 'error' in entry:
+            raise entry['error']
+        return entry['response']
+
+def coalesce_requests(client, window=1.0):
+    """
+    Install a :class:`CoalescingTransport` in front of `client`'s transport,
+    unless one is already there, and return it so its ``stats`` can be read.
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg window: Number of seconds a completed response is reused for.
+    :rtype: :class:`CoalescingTransport`
+    """
+    if not isinstance(client.transport, CoalescingTransport):
+        client.transport = CoalescingTransport(client.transport, window=window)
+    return client.transport
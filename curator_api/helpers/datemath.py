@@ -378,7 +378,7 @@ def absolute_date_range(
         datetime.utcfromtimestamp(end_epoch).isoformat()))
     return (start_epoch, end_epoch)
 
-def parse_date_pattern(name):
+def parse_date_pattern(name, when=None):
     """
     Scan and parse `name` for :py:func:`time.strftime` strings, replacing them
     with the associated value when found, but otherwise returning lowercase
@@ -401,8 +401,11 @@ def parse_date_pattern(name):
 
     :arg name: A name, which can contain :py:func:`time.strftime`
         strings
+    :arg when: The UTC :py:class:`datetime.datetime` to render `name` at, or
+        `None` for now
     """
     logger = logging.getLogger(__name__)
+    when = datetime.utcnow() if when is None else when
     prev, curr, rendered = '', '', ''
     for curr in name:
         if curr == '<':
@@ -412,7 +415,7 @@ def parse_date_pattern(name):
         if curr == '%':
             pass
         elif curr in date_regex() and prev == '%':
-            rendered += str(datetime.utcnow().strftime('%{0}'.format(curr)))
+            rendered += str(when.strftime('%{0}'.format(curr)))
         else:
             rendered += curr
         logger.debug('Partially rendered name: {0}'.format(rendered))
@@ -420,6 +423,36 @@ def parse_date_pattern(name):
     logger.debug('Fully rendered name: {0}'.format(rendered))
     return rendered
 
+def date_pattern_range(name, count, unit='days', start=None):
+    """
+    Render `name` with :py:func:`parse_date_pattern` at `start` and at each of
+    the following `count` - 1 `unit` s, and return the distinct names, in
+    order.  A name with a coarser pattern than `unit`, such as ``%Y.%m`` over
+    days, gives fewer than `count` names.
+
+    :arg name: A name, which can contain :py:func:`time.strftime` strings
+    :arg count: The number of `unit` s to render `name` over
+    :arg unit: One of ``minutes``, ``hours``, ``days`` or ``weeks``
+    :arg start: The UTC :py:class:`datetime.datetime` to start at, or `None`
+        for now
+    :rtype: list
+    """
+    if unit not in ('minutes', 'hours', 'days', 'weeks'):
+        raise ConfigurationError('Invalid unit: {0}'.format(unit))
+    if name.startswith('<'):
+        raise ConfigurationError(
+            'Elasticsearch date math names can not be rendered over a range: '
+            '{0}'.format(name))
+    start = datetime.utcnow() if start is None else start
+    names, seen = [], set()
+    for step in range(count):
+        rendered = parse_date_pattern(
+            name, start + timedelta(**{unit: step}))
+        if rendered not in seen:
+            seen.add(rendered)
+            names.append(rendered)
+    return names
+
 def get_datemath(client, datemath, random_element=None):
     """
     Return the parsed index name from ``datemath``
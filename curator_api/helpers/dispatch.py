@@ -0,0 +1,253 @@
+"""Concurrent dispatch of chunked bulk operations"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from elasticsearch.exceptions import (
+    ConnectionError, NotFoundError, TransportError
+)
+
+logger = logging.getLogger(__name__)
+
+#: The error types of a ``400`` or ``403`` response which are caused by one
+#: index of the request, such as a closed, blocked or snapshotted index
+INDEX_ERRORS = (
+    'cluster_block_exception', 'illegal_argument_exception',
+    'index_closed_exception', 'index_not_found_exception',
+    'snapshot_in_progress_exception',
+)
+
+def index_error(error):
+    """
+    Return `True` if `error` is a client error caused by an index named in
+    the request, such as a missing, closed or blocked index, which bisecting
+    the request can narrow down.
+
+    :arg error: An exception
+    :rtype: bool
+    """
+    if isinstance(error, NotFoundError):
+        return True
+    if not isinstance(error, TransportError):
+        return False
+    return error.status_code in (400, 403) and error.error in INDEX_ERRORS
+
+def cluster_error(error):
+    """
+    Return `True` if `error` is a failure of the cluster rather than of any
+    index, which every other request would hit too: a connection error, a
+    ``401``, a ``429`` or a server error.
+
+    :arg error: An exception
+    :rtype: bool
+    """
+    if isinstance(error, ConnectionError):
+        return True
+    if not isinstance(error, TransportError):
+        return False
+    status = error.status_code
+    return isinstance(status, int) and (status in (401, 429) or status >= 500)
+
+class ChunkResult(object):
+    """The outcome of one chunk sent by a :class:`BulkDispatcher`"""
+    def __init__(self, chunk):
+        #: Instance variable.
+        #: The chunk of indices
+        self.chunk = chunk
+        #: Instance variable.
+        #: The return value of the operation
+        self.result = None
+        #: Instance variable.
+        #: The exception the operation raised, if any
+        self.error = None
+        #: Instance variable.
+        #: Whether the operation ran.  Chunks are not run after an error if
+        #: the dispatcher was told to stop on errors.
+        self.done = False
+        #: Instance variable.
+        #: A dictionary of index name to the exception it caused, found by
+        #: bisecting a failed chunk.  Empty unless the dispatcher bisects.
+        self.failures = {}
+
+    @property
+    def ok(self):
+        """`True` if the operation ran without raising an exception"""
+        return self.done and self.error is None
+
+    @property
+    def remaining(self):
+        """
+        The indices of the chunk which still need the operation: none if it
+        succeeded, the culprits if the chunk was bisected, otherwise all.
+        """
+        if self.ok:
+            return []
+        if self.failures:
+            return [index for index in self.chunk if index in self.failures]
+        return list(self.chunk)
+
+    def __repr__(self):
+        return '<ChunkResult {0} indices, done={1}, error={2!r}>'.format(
+            len(self.chunk), self.done, self.error)
+
+class BulkDispatcher(object):
+    """
+    Send the chunks of a bulk operation, such as those from
+    :py:func:`curator_api.helpers.index.chunk_index_list`, through a thread
+    pool, and collect the result or error of each one.
+
+    With `ordered`, each chunk is only sent after the one before it has
+    completed, for actions which need that.  Either way, the results are
+    returned in the order of the chunks.
+
+    With `bisect`, a chunk which fails because of an index, see
+    :py:func:`index_error`, is split in halves, and each half sent again,
+    recursively, until the indices which make it fail are found.  The
+    operation is then applied to every other index of the chunk, and if no
+    index fails on its own, the chunk counts as done.  This suits operations
+    which either apply to the whole chunk or fail, such as deleting, closing
+    or updating the settings of indices.  A failure of the cluster, see
+    :py:func:`cluster_error`, would fail the halves and every other chunk
+    too, so it is not bisected, and no more chunks are sent.  Other errors
+    only fail their chunk.
+    """
+    def __init__(
+            self, max_workers=4, ordered=False, stop_on_error=False,
+            bisect=False
+        ):
+        """
+        :arg max_workers: The most chunks in flight at once
+        :arg ordered: Send the chunks one at a time, in order
+        :arg stop_on_error: Send no more chunks after one fails.  Chunks
+            already in flight are still completed.
+        :arg bisect: Find the indices which make a chunk fail by bisecting it,
+            and stop on failures of the cluster
+        """
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1')
+        #: Instance variable.
+        #: The most chunks in flight at once
+        self.max_workers = 1 if ordered else max_workers
+        #: Instance variable.
+        #: Whether chunks are sent one at a time, in order
+        self.ordered = ordered
+        #: Instance variable.
+        #: Whether to send no more chunks after one fails
+        self.stop_on_error = stop_on_error
+        #: Instance variable.
+        #: Whether to bisect failed chunks
+        self.bisect = bisect
+        self._stopped = False
+
+    def _send(self, func, outcome):
+        """Run `func` on one chunk, recording the outcome"""
+        if self._stopped:
+            return outcome
+        try:
+            outcome.result = func(outcome.chunk)
+        except Exception as err:
+            logger.error('Chunk of {0} indices failed: {1}'.format(
+                len(outcome.chunk), err))
+            outcome.error = err
+            if self.bisect and index_error(err):
+                self._bisect(func, outcome)
+            elif self.bisect and cluster_error(err):
+                self._stopped = True
+            if outcome.error is not None and self.stop_on_error:
+                self._stopped = True
+        outcome.done = True
+        return outcome
+
+    def _bisect(self, func, outcome):
+        """Find the indices which make the failed chunk of `outcome` fail"""
+        try:
+            outcome.result, outcome.failures = isolate_failures(
+                func, outcome.chunk, outcome.error)
+        except Exception as err:
+            logger.error('Stopped bisecting after: {0}'.format(err))
+            outcome.error = err
+            if cluster_error(err):
+                self._stopped = True
+            return
+        if outcome.failures:
+            logger.error('Indices which failed: {0}'.format(
+                sorted(outcome.failures)))
+        else:
+            logger.info('No index of the chunk failed on its own')
+            outcome.error = None
+
+    def run(self, func, chunks):
+        """
+        Call `func` with each chunk in `chunks`, and return a
+        :class:`ChunkResult` for each one, in the same order.
+
+        :arg func: A callable which accepts one chunk
+        :arg chunks: A list of chunks
+        :rtype: list
+        """
+        self._stopped = False
+        outcomes = [ChunkResult(chunk) for chunk in chunks]
+        if self.max_workers == 1 or len(outcomes) < 2:
+            for outcome in outcomes:
+                self._send(func, outcome)
+            return outcomes
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(outcomes)))
+        try:
+            futures = [
+                executor.submit(self._send, func, outcome)
+                for outcome in outcomes
+            ]
+            for future in futures:
+                future.result()
+        finally:
+            executor.shutdown(wait=True)
+        return outcomes
+
+def isolate_failures(func, chunk, error):
+    """
+    Split `chunk`, on which `func` failed with `error`, in halves and call
+    `func` on each, recursing into the halves which fail, until each failure
+    is narrowed down to single indices.  Return a list of the results of the
+    successful calls, and a dictionary of each failed index to its exception.
+    This takes about two calls per culprit per halving.  An error which is
+    not an :py:func:`index_error` is raised.
+
+    :arg func: A callable which accepts one chunk
+    :arg chunk: A list of indices
+    :arg error: The exception `func` raised for `chunk`
+    :rtype: tuple
+    """
+    if not index_error(error):
+        raise error
+    if len(chunk) == 1:
+        return [], {chunk[0]: error}
+    results = []
+    failures = {}
+    middle = len(chunk) // 2
+    for half in (chunk[:middle], chunk[middle:]):
+        try:
+            results.append(func(half))
+        except Exception as err:
+            more, culprits = isolate_failures(func, half, err)
+            results.extend(more)
+            failures.update(culprits)
+    return results, failures
+
+def remaining_work(results):
+    """
+    Return the indices in `results` which still need the operation, so a
+    re-run need only touch those.
+
+    :arg results: A list of :class:`ChunkResult` objects
+    :rtype: list
+    """
+    return [index for outcome in results for index in outcome.remaining]
+
+def failed_chunks(results):
+    """
+    Return the :class:`ChunkResult` objects in `results` which failed or were
+    not run.
+
+    :arg results: A list of :class:`ChunkResult` objects
+    :rtype: list
+    """
+    return [outcome for outcome in results if not outcome.ok]
@@ -1,60 +1,419 @@
 """Index helpers"""
+import bisect
 import logging
+import re
+import time
+import weakref
+from six.moves.urllib.parse import quote
+from elasticsearch.client.utils import _make_path
 from curator_api.exceptions import FailedExecution
-from curator_api.helpers.client import get_version
+from curator_api.helpers.client import api_params, get_version
+from curator_api.helpers.stream import iter_json_members, stream_response
+from curator_api.helpers.utils import parse_byte_size
 
+def index_size(client, idx):
+    """
+    Return the sum of all primary and all replica shards `size_in_bytes`
+    """
+    return client.indices.stats(
+        index=idx, **api_params('index_size'))['indices'][idx]['total']['store']['size_in_bytes']
 
+# Index names made only of these characters are not changed by URL encoding
+_URL_PLAIN = re.compile(r'^[A-Za-z0-9_.\-]*$')
 
+#: The line length limit assumed when it is not set on any node
+DEFAULT_MAX_LINE_LENGTH = 4096
 
-def index_size(client, idx):
+# Line length limits already probed, per client
+_MAX_LINE_LENGTHS = weakref.WeakKeyDictionary()
+
+# Names already resolved by resolve_names, per client, with when they were
+_RESOLVED_NAMES = weakref.WeakKeyDictionary()
+
+#: The seconds :py:func:`resolve_names` reuses what it found for a name
+RESOLVE_MAX_AGE = 30
+
+#: The kinds :py:func:`resolve_names` sorts names into
+NAME_KINDS = ('index', 'alias', 'data_stream', 'missing')
+
+def url_length(index):
     """
-    Return the sum of all primary and all replica shards `size_in_bytes`
+    Return the number of bytes `index` takes in a request path, once URL
+    encoded the way :class:`elasticsearch.Elasticsearch` encodes it.  Date
+    math characters such as ``<``, ``{`` and ``/`` take 3 bytes each.
+
+    :arg index: An index name
+    :rtype: int
     """
-    return client.indices.stats(index=idx)['indices'][idx]['total']['store']['size_in_bytes']
+    if _URL_PLAIN.match(index):
+        return len(index)
+    if not isinstance(index, bytes):
+        index = index.encode('utf-8')
+    return len(quote(index, b',*'))
 
-def chunk_index_list(indices):
+def chunk_index_list(indices, max_bytes=3072, max_count=None):
     """
-    This utility chunks very large index lists into 3KB chunks
-    It measures the size as a csv string, then converts back into a list
-    for the return value.
+    Split a list of indices into chunks whose comma separated, URL encoded
+    form fits in `max_bytes`, and which hold at most `max_count` indices.  An
+    index which does not fit in `max_bytes` on its own gets a chunk to itself.
+    This takes time linear in the number of indices.
 
     :arg indices: A list of indices to act on.
+    :arg max_bytes: The budget for each chunk in the request path.  See
+        :py:func:`probe_chunk_bytes` to size it for the cluster.
+    :arg max_count: The maximum number of indices in a chunk, or `None`
     :rtype: list
     """
+    if not indices:
+        # An empty chunk would become an empty index path, which means all
+        return []
+    lengths = [url_length(index) for index in indices]
     chunks = []
-    chunk = ""
-    for index in indices:
-        if len(chunk) < 3072:
-            if not chunk:
-                chunk = index
+    start = 0
+    size = 0
+    for position, length in enumerate(lengths):
+        if position > start:
+            full = size + 1 + length > max_bytes or (
+                max_count is not None and position - start >= max_count)
+            if full:
+                chunks.append(indices[start:position])
+                start = position
+                size = 0
             else:
-                chunk += "," + index
-        else:
-            chunks.append(chunk.split(','))
-            chunk = index
-    chunks.append(chunk.split(','))
+                # The comma
+                size += 1
+        size += length
+    chunks.append(indices[start:])
     return chunks
 
+def _wildcard_cover(names, selected, min_prefix):
+    """
+    Return expressions covering exactly the `selected` positions of the sorted
+    list `names`, by recursing on ranges which share a prefix.
 
-def get_indices(client):
+    :arg names: The sorted list of all index names
+    :arg selected: Running counts of selected names, so that
+        ``selected[hi] - selected[lo]`` counts those in ``names[lo:hi]``
+    :arg min_prefix: The shortest prefix to use in a wildcard
     """
-    Get the current list of indices from the cluster.
+    expressions = []
+    # (lo, hi, depth): names[lo:hi] all share their first `depth` characters
+    stack = [(0, len(names), 0)]
+    while stack:
+        lo, hi, depth = stack.pop()
+        count = selected[hi] - selected[lo]
+        if count == 0:
+            continue
+        if count == hi - lo and (hi - lo == 1 or depth >= min_prefix):
+            if hi - lo == 1:
+                expressions.append(names[lo])
+            else:
+                expressions.append(names[lo][:depth] + '*')
+            continue
+        # A name exactly `depth` long sorts first, and ends here
+        if len(names[lo]) == depth:
+            if selected[lo + 1] - selected[lo]:
+                expressions.append(names[lo])
+            lo += 1
+        start = lo
+        while start < hi:
+            char = names[start][depth]
+            end = start + 1
+            while end < hi and names[end][depth] == char:
+                end += 1
+            stack.append((start, end, depth + 1))
+            start = end
+    return expressions
 
-    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+def _covers(expression, names):
+    """Return the names in the sorted list `names` matched by `expression`"""
+    if not expression.endswith('*'):
+        position = bisect.bisect_left(names, expression)
+        if position < len(names) and names[position] == expression:
+            return names[position:position + 1]
+        return []
+    prefix = expression[:-1]
+    position = bisect.bisect_left(names, prefix)
+    end = position
+    while end < len(names) and names[end].startswith(prefix):
+        end += 1
+    return names[position:end]
+
+def compact_index_list(indices, inventory, min_prefix=1, aliases=(), closed=None):
+    """
+    Return a short list of index expressions, such as ``logs-2023.01.*``,
+    which together match exactly the indices in `indices` and no other index
+    or alias in `inventory` and `aliases`.  Indices which can not be covered
+    safely by a wildcard are listed by name, as are closed indices, which
+    wildcards may not expand to.  The result is checked against `inventory`,
+    and if it would not match exactly `indices`, or some of `indices` are not
+    in `inventory`, the sorted names are returned instead.
+
+    Wildcards match indices created after `inventory` was read, so only use
+    this with a current inventory, and not where the cluster forbids them,
+    e.g. for deletes with ``action.destructive_requires_name``.
+
+    :arg indices: A list of indices to act on.
+    :arg inventory: All index names in the cluster, e.g. a list or an
+        :class:`curator_api.inventory.IndexInventory`
+    :arg min_prefix: The shortest prefix a wildcard may have
+    :arg aliases: All alias names in the cluster, which a wildcard must not
+        match either, as it would expand to their indices
+    :arg closed: The names of closed indices.  If `None`, they are read from
+        the ``state`` of an :class:`curator_api.inventory.IndexInventory`.
     :rtype: list
     """
     logger = logging.getLogger(__name__)
-    try:
-        indices = list(
-            client.indices.get_settings(
-                index='_all', params={'expand_wildcards': 'open,closed'})
-            )
-        version_number = get_version(client)
+    wanted = set(indices)
+    names = set(inventory)
+    if not wanted.issubset(names):
         logger.debug(
-            'Detected Elasticsearch version '
-            '{0}'.format(".".join(map(str, version_number)))
+            'Indices missing from the inventory: {0}'.format(
+                sorted(wanted.difference(names))))
+        return sorted(wanted)
+    if closed is None:
+        closed = [
+            name for name, info in getattr(inventory, 'index_info', {}).items()
+            if info.get('state') == 'close'
+        ]
+    named = wanted.intersection(closed)
+    covered = wanted.difference(named)
+    # Closed indices and aliases stay in the namespace unselected, so that no
+    # wildcard matches them
+    names = sorted(names.union(aliases))
+    selected = [0]
+    for name in names:
+        selected.append(selected[-1] + (name in covered))
+    expressions = _wildcard_cover(names, selected, min_prefix)
+    matched = []
+    for expression in expressions:
+        matched.extend(_covers(expression, names))
+    if len(matched) != len(covered) or set(matched) != covered:
+        logger.warning(
+            'Wildcard cover does not match the selected indices. '
+            'Using index names.'
         )
-        logger.debug("All indices: {0}".format(indices))
+        return sorted(wanted)
+    return sorted(expressions + list(named))
+
+def probe_chunk_bytes(client, reserve=1024):
+    """
+    Return a `max_bytes` budget for :py:func:`chunk_index_list` from the
+    smallest ``http.max_initial_line_length`` of any node, less `reserve`
+    bytes for the method, the rest of the path and the query string.  The
+    limit is only read from the cluster once per client.  With the default
+    limit of 4kb, this is the same 3072 bytes :py:func:`chunk_index_list`
+    uses unless told otherwise.
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg reserve: Bytes of the request line kept for other than index names
+    :rtype: int
+    """
+    if client not in _MAX_LINE_LENGTHS:
+        logger = logging.getLogger(__name__)
+        limit = DEFAULT_MAX_LINE_LENGTH
+        try:
+            nodes = client.nodes.info(
+                **api_params('max_line_length')).get('nodes', {})
+            limits = [
+                parse_byte_size(
+                    node.get('settings', {}).get('http', {}).get(
+                        'max_initial_line_length', DEFAULT_MAX_LINE_LENGTH))
+                for node in nodes.values()
+            ]
+            # Every node may coordinate a request, so the smallest limit wins
+            if limits:
+                limit = min(limits)
+        except Exception as err:
+            logger.debug(
+                'Unable to read http.max_initial_line_length, assuming {0} '
+                'bytes. Error: {1}'.format(limit, err)
+            )
+        _MAX_LINE_LENGTHS[client] = limit
+    return max(_MAX_LINE_LENGTHS[client] - reserve, 1)
+
+def _get_indices_request(index='_all'):
+    """
+    Return the keyword arguments for the ``indices.get_settings`` call made by
+    :py:func:`get_indices`, so the sync and async versions send the same
+    request.
+
+    :arg index: The index expression to list
+    :rtype: dict
+    """
+    request = {'index': index, 'params': {'expand_wildcards': 'open,closed'}}
+    request.update(api_params('get_indices'))
+    return request
+
+def _log_indices(indices, version_number):
+    """
+    Log the detected version and index list gathered by :py:func:`get_indices`
+
+    :arg indices: The list of index names
+    :arg version_number: The version tuple from
+        :py:func:`curator_api.helpers.client.get_version`
+    """
+    logger = logging.getLogger(__name__)
+    logger.debug(
+        'Detected Elasticsearch version '
+        '{0}'.format(".".join(map(str, version_number)))
+    )
+    logger.debug("All indices: {0}".format(indices))
+
+def get_indices(client, index='_all'):
+    """
+    Get the current list of indices from the cluster.
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg index: An index expression, such as ``logs-*,-logs-old-*``, to list
+        only the indices it matches.  See
+        :py:func:`curator_api.filterplan.wildcard_expression`.
+    :rtype: list
+    """
+    try:
+        indices = list(client.indices.get_settings(**_get_indices_request(index)))
+        _log_indices(indices, get_version(client))
         return indices
     except Exception as err:
         raise FailedExecution('Failed to get indices. Error: {0}'.format(err))
+
+def stream_indices(client, index='_all'):
+    """
+    Streaming version of :py:func:`get_indices`.  Yield each index name as the
+    response is read, instead of decoding the whole response first, so memory
+    use does not grow with the number of indices.
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg index: An index expression to list only the indices it matches
+    """
+    request = _get_indices_request(index)
+    params = dict(request.pop('params'))
+    url = _make_path(request.pop('index'), '_settings', request.pop('name', None))
+    params.update(request)
+    try:
+        for index, _ in iter_json_members(
+                stream_response(client, 'GET', url, params=params)):
+            yield index
+    except Exception as err:
+        raise FailedExecution('Failed to get indices. Error: {0}'.format(err))
+
+def existing_indices(client, indices):
+    """
+    Return those of `indices` which exist, checking only their names rather
+    than listing every index in the cluster.  Missing indices are skipped by
+    the server with ``ignore_unavailable``, so one call covers each chunk.
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg indices: A list of index names
+    :rtype: list
+    """
+    found = set()
+    try:
+        for chunk in chunk_index_list(indices):
+            found.update(client.indices.get_settings(
+                index=','.join(chunk),
+                params={
+                    'expand_wildcards': 'open,closed',
+                    'ignore_unavailable': 'true',
+                },
+                **api_params('existing_indices')
+            ))
+    except Exception as err:
+        raise FailedExecution(
+            'Failed to check for indices. Error: {0}'.format(err))
+    return [index for index in indices if index in found]
+
+def _resolve_api(client, names):
+    """
+    Classify `names` with the resolve index API, one call per chunk, and
+    return a dictionary of name to kind for those found.
+    """
+    kinds = {}
+    for chunk in chunk_index_list(names):
+        response = client.transport.perform_request(
+            'GET', _make_path('_resolve', 'index', ','.join(chunk)),
+            params={
+                'expand_wildcards': 'open,closed',
+                'ignore_unavailable': 'true',
+            }
+        )
+        for key, kind in (
+                ('indices', 'index'), ('aliases', 'alias'),
+                ('data_streams', 'data_stream')):
+            for entry in response.get(key, []):
+                kinds[entry['name']] = kind
+    return kinds
+
+def _resolve_cat(client, names):
+    """
+    Classify `names` as indices with :py:func:`existing_indices`, then the
+    rest as aliases with ``_cat/aliases``, and return a dictionary of name to
+    kind for those found.  For versions without the resolve index API.
+    """
+    kinds = dict((index, 'index') for index in existing_indices(client, names))
+    rest = [name for name in names if name not in kinds]
+    for chunk in chunk_index_list(rest):
+        for row in client.cat.aliases(
+                name=','.join(chunk), format='json', h='alias'):
+            kinds[row['alias']] = 'alias'
+    return kinds
+
+def resolve_names(client, names, max_age=RESOLVE_MAX_AGE):
+    """
+    Return a dictionary of each name in `names` to what it is in the cluster:
+    one of ``index``, ``alias``, ``data_stream`` or ``missing``.  This takes
+    one call per chunk of names with the resolve index API (Elasticsearch
+    7.9 and up), or one ``indices.get_settings`` and one ``_cat/aliases``
+    call per chunk before that, instead of an ``indices.exists`` and an
+    ``indices.exists_alias`` call per name.
+
+    What a name resolved to is reused for `max_age` seconds, so that the
+    steps of one run share the calls, but names changed by other clients are
+    seen again soon after.  Call :py:func:`forget_names` after creating or
+    deleting indices or aliases, so they are resolved again at once.
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg names: A list of index, alias or data stream names.  Wildcards are
+        not expanded.
+    :arg max_age: The seconds a name resolved earlier is reused for.  With
+        0, every name is resolved again.
+    :rtype: dict
+    """
+    known = _RESOLVED_NAMES.setdefault(client, {})
+    now = time.time()
+    for name in [name for name, (_, read_at) in known.items()
+                 if now - read_at >= max_age]:
+        del known[name]
+    wanted = [name for name in set(names) if name not in known]
+    if wanted:
+        wanted.sort()
+        try:
+            if get_version(client) >= (7, 9, 0):
+                kinds = _resolve_api(client, wanted)
+            else:
+                kinds = _resolve_cat(client, wanted)
+        except FailedExecution:
+            raise
+        except Exception as err:
+            raise FailedExecution(
+                'Failed to resolve names. Error: {0}'.format(err))
+        for name in wanted:
+            known[name] = (kinds.get(name, 'missing'), now)
+    return dict((name, known[name][0]) for name in names)
+
+def forget_names(client, names=None):
+    """
+    Drop `names`, or every name if `names` is `None`, from what
+    :py:func:`resolve_names` remembers for `client`.
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg names: A list of names, or `None`
+    """
+    known = _RESOLVED_NAMES.get(client)
+    if known is None:
+        return
+    if names is None:
+        known.clear()
+    else:
+        for name in names:
+            known.pop(name, None)
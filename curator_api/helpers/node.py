@@ -1,5 +1,6 @@
 import logging
 from curator_api.exceptions import ConfigurationError, FailedExecution
+from curator_api.helpers.client import api_params
 
 logger = logging.getLogger(__name__)
 
@@ -10,7 +11,7 @@ def node_roles(client, node_id):
     :arg client: An :class:`elasticsearch.Elasticsearch` client object
     :rtype: list
     """
-    return client.nodes.info()['nodes'][node_id]['roles']
+    return client.nodes.info(**api_params('node_roles'))['nodes'][node_id]['roles']
 
 
 def single_data_path(client, node_id):
@@ -22,7 +23,7 @@ def single_data_path(client, node_id):
     :arg client: An :class:`elasticsearch.Elasticsearch` client object
     :rtype: bool
     """
-    return len(client.nodes.stats()['nodes'][node_id]['fs']['data']) == 1 
+    return len(client.nodes.stats(**api_params('nodes_stats'))['nodes'][node_id]['fs']['data']) == 1 
 
 
 def name_to_node_id(client, name):
@@ -32,7 +33,7 @@ def name_to_node_id(client, name):
     :arg client: An :class:`elasticsearch.Elasticsearch` client object
     :rtype: str
     """
-    stats = client.nodes.stats()
+    stats = client.nodes.stats(**api_params('nodes_stats'))
     for node in stats['nodes']:
         if stats['nodes'][node]['name'] == name:
             logger.debug('Found node_id "{0}" for name "{1}".'.format(node, name))
@@ -47,7 +48,7 @@ def node_id_to_name(client, node_id):
     :arg client: An :class:`elasticsearch.Elasticsearch` client object
     :rtype: str
     """
-    stats = client.nodes.stats()
+    stats = client.nodes.stats(**api_params('nodes_stats'))
     name = None
     if node_id in stats['nodes']:
         name = stats['nodes'][node_id]['name']
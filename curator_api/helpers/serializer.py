@@ -0,0 +1,42 @@
+"""JSON serializers"""
+from elasticsearch.exceptions import SerializationError
+from elasticsearch.serializer import JSONSerializer
+from six import string_types
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class OrjsonSerializer(JSONSerializer):
+    """
+    A drop-in replacement for :class:`elasticsearch.serializer.JSONSerializer`
+    which uses ``orjson``.  Decoding large metadata responses, such as
+    ``get_settings(index='_all')``, ``cluster.state`` or ``snapshot.get`` for
+    ``_all`` snapshots, is several times faster than with the ``json`` module.
+    """
+    def loads(self, s):
+        try:
+            return orjson.loads(s)
+        except (ValueError, TypeError) as e:
+            raise SerializationError(s, e)
+
+    def dumps(self, data):
+        # don't serialize strings
+        if isinstance(data, string_types):
+            return data
+        try:
+            return orjson.dumps(
+                data, default=self.default, option=orjson.OPT_NON_STR_KEYS
+            ).decode('utf-8')
+        except (ValueError, TypeError) as e:
+            raise SerializationError(data, e)
+
+def get_serializer():
+    """
+    Return the fastest available JSON serializer: an :class:`OrjsonSerializer`
+    if ``orjson`` can be imported, otherwise the stock
+    :class:`elasticsearch.serializer.JSONSerializer`.
+    """
+    if orjson is None:
+        return JSONSerializer()
+    return OrjsonSerializer()
@@ -1,7 +1,11 @@
 import logging
 from curator_api.exceptions import ActionError, CuratorException, FailedExecution, MissingArgument
+from curator_api.helpers.client import api_params
+from curator_api.helpers.index import compact_index_list
 from curator_api.helpers.notification import report_failure
-from curator_api.helpers.utils import to_csv
+from curator_api.helpers.stream import iter_json_members, stream_response
+from curator_api.helpers.utils import ensure_list, to_csv
+from elasticsearch.client.utils import _make_path
 from elasticsearch.exceptions import NotFoundError, TransportError
 from time import sleep
 
@@ -48,6 +52,34 @@ def get_snapshot_data(client, repository=None):
             'Error: {1}'.format(repository, e)
         )
 
+def stream_snapshot_data(client, repository=None):
+    """
+    Streaming version of :py:func:`get_snapshot_data`.  Yield a dictionary
+    with the ``snapshot``, ``state``, ``start_time`` and
+    ``start_time_in_millis`` of each snapshot as the response is read, instead
+    of decoding every snapshot and its index list first.
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg repository: The Elasticsearch snapshot repository to use
+    """
+    if not repository:
+        raise MissingArgument('No value for "repository" provided')
+    fields = ('snapshot', 'state', 'start_time', 'start_time_in_millis')
+    try:
+        for _, snap in iter_json_members(
+                stream_response(
+                    client, 'GET', _make_path('_snapshot', repository, '_all'),
+                    params=api_params('stream_snapshot_data')
+                ),
+                ('snapshots',)
+            ):
+            yield dict((k, snap[k]) for k in fields if k in snap)
+    except (TransportError, NotFoundError) as e:
+        raise FailedExecution(
+            'Unable to get snapshot information from repository: {0}.  '
+            'Error: {1}'.format(repository, e)
+        )
+
 def snapshot_in_progress(client, repository=None, snapshot=None):
     """
     Determine whether the provided snapshot in `repository` is ``IN_PROGRESS``.
@@ -101,8 +133,9 @@ def find_snapshot_tasks(client):
     :rtype: bool
     """
     retval = False
-    tasklist = client.tasks.get()
-    for node in tasklist['nodes']:
+    tasklist = client.tasks.get(**api_params('find_snapshot_tasks'))
+    # A filtered response omits 'nodes' entirely when no tasks are running
+    for node in tasklist.get('nodes', {}):
         for task in tasklist['nodes'][node]['tasks']:
             activity = tasklist['nodes'][node]['tasks'][task]['action']
             if 'snapshot' in activity:
@@ -162,7 +195,8 @@ def snapshot_running(client):
 
 
 def create_snapshot_body(indices, ignore_unavailable=False,
-                         include_global_state=True, partial=False):
+                         include_global_state=True, partial=False,
+                         inventory=None, aliases=None, closed=None):
     """
     Create the request body for creating a snapshot from the provided
     arguments.
@@ -177,6 +211,14 @@ def create_snapshot_body(indices, ignore_unavailable=False,
     :arg partial: Do not fail if primary shard is unavailable. (default:
         `False`)
     :type partial: bool
+    :arg inventory: All index names in the cluster.  If provided, `indices`
+        are sent as the wildcard expressions from
+        :py:func:`curator_api.helpers.index.compact_index_list`.
+    :arg aliases: All alias names in the cluster, which the wildcard
+        expressions must not match.  Only used with `inventory`.
+    :arg closed: The closed indices, which are always sent by name.  Only
+        used with `inventory`, which they are read from if it is an
+        :class:`curator_api.inventory.IndexInventory`.
     :rtype: dict
     """
     if not indices:
@@ -189,6 +231,13 @@ def create_snapshot_body(indices, ignore_unavailable=False,
     }
     if indices == '_all':
         body["indices"] = indices
+    elif inventory is not None:
+        body["indices"] = to_csv(
+            compact_index_list(
+                ensure_list(indices), inventory, aliases=aliases or (),
+                closed=closed
+            )
+        )
     else:
         body["indices"] = to_csv(indices)
     return body
\ No newline at end of file
@@ -0,0 +1,253 @@
+"""
+Streaming response helpers
+
+These read a response body in chunks, and decode it one record at a time, so
+that peak memory is bounded by the largest record rather than by the whole
+response.
+"""
+import codecs
+import json
+import logging
+import socket
+import time
+from elasticsearch.exceptions import (
+    HTTP_EXCEPTIONS, ConnectionError, ConnectionTimeout, SSLError,
+    TransportError
+)
+from six.moves.urllib.parse import urlencode
+from urllib3.exceptions import HTTPError, ReadTimeoutError
+from urllib3.exceptions import SSLError as UrllibSSLError
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789.eE+-'
+
+class _ChunkReader(object):
+    """
+    Read JSON values from an iterable of text chunks, keeping only the
+    unconsumed part of the text in memory.
+    """
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buf = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def _more(self):
+        """Append the next chunk to the buffer. Return `False` if none remain."""
+        if self.exhausted:
+            return False
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.exhausted = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character, without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                raise ValueError('Unexpected end of JSON response')
+
+    def expect(self, chars):
+        """Consume and return the next character, which must be in `chars`."""
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(
+                'Expected one of "{0}" at "{1}" in JSON response'.format(
+                    chars, self.buf[self.pos:self.pos + 20]))
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode and consume the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _DECODER.raw_decode(self.buf, self.pos)
+            except ValueError:
+                # A value cut off by the end of the chunk, like ``1.``,
+                # ``1e-`` or an open string, fails to decode, and its error
+                # may point anywhere in it.  Only fail once there is no more.
+                if not self._more():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next
+            # chunk, even after a ``1`` decodes from ``1.``, so only trust a
+            # value followed by something which can not continue it
+            tail = end
+            while tail < len(self.buf) and self.buf[tail] in _NUMBER_CHARS:
+                tail += 1
+            if tail < len(self.buf) or not self._more():
+                self.pos = end
+                return obj
+
+def iter_json_members(chunks, path=()):
+    """
+    Incrementally parse the JSON text in `chunks`, and yield ``(key, value)``
+    for each member of the object found at `path`, or ``(position, value)``
+    for each element if it is an array.  Values outside `path` are decoded one
+    at a time and discarded, so only one record is held in memory at once.
+
+    :arg chunks: An iterable of text chunks which together form a JSON document
+    :arg path: A tuple of the object keys leading to the container to iterate.
+        The default, ``()``, iterates the top level.
+    """
+    reader = _ChunkReader(chunks)
+    for depth, wanted in enumerate(path):
+        reader.expect('{')
+        found = reader.peek() != '}'
+        while found:
+            key = reader.value()
+            reader.expect(':')
+            if key == wanted:
+                break
+            reader.value()
+            found = reader.expect(',}') == ','
+        if not found:
+            logger.debug('Key "{0}" not found at depth {1}'.format(wanted, depth))
+            return
+    opener = reader.expect('{[')
+    closer = '}' if opener == '{' else ']'
+    if reader.peek() == closer:
+        return
+    position = 0
+    while True:
+        if opener == '{':
+            key = reader.value()
+            reader.expect(':')
+        else:
+            key = position
+        yield key, reader.value()
+        position += 1
+        if reader.expect(',' + closer) == closer:
+            return
+
+def _transport_error(status, raw_data):
+    """
+    Return the :class:`elasticsearch.exceptions.TransportError` subclass the
+    client raises for `status`, with the error type read from `raw_data`.
+    """
+    message, info = raw_data, None
+    try:
+        info = json.loads(raw_data) if raw_data else None
+        message = info.get('error', message)
+        if isinstance(message, dict) and 'type' in message:
+            message = message['type']
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return HTTP_EXCEPTIONS.get(status, TransportError)(status, message, info)
+
+def _open(connection, method, url, params):
+    """
+    Send the request on `connection`, without reading the body, and return
+    the :class:`urllib3.HTTPResponse`.  Raise the same exceptions as
+    :py:meth:`elasticsearch.Urllib3HttpConnection.perform_request` would.
+    """
+    path = connection.url_prefix + url
+    if params:
+        path = '{0}?{1}'.format(path, urlencode(params))
+    full_url = connection.host + path
+    start = time.time()
+    try:
+        response = connection.pool.urlopen(
+            method, path, retries=Retry(False), headers=connection.headers,
+            preload_content=False
+        )
+    except Exception as err:
+        connection.log_request_fail(
+            method, full_url, path, None, time.time() - start, exception=err)
+        if isinstance(err, UrllibSSLError):
+            raise SSLError('N/A', str(err), err)
+        if isinstance(err, ReadTimeoutError):
+            raise ConnectionTimeout('TIMEOUT', str(err), err)
+        raise ConnectionError('N/A', str(err), err)
+    if not 200 <= response.status < 300:
+        try:
+            raw_data = response.data.decode('utf-8', 'surrogatepass')
+        finally:
+            response.release_conn()
+        connection.log_request_fail(
+            method, full_url, path, None, time.time() - start,
+            response.status, raw_data
+        )
+        raise _transport_error(response.status, raw_data)
+    return response
+
+def _stream(transport, method, url, params):
+    """
+    Open the response with the retry rules of
+    :py:meth:`elasticsearch.Transport.perform_request`: connection errors,
+    and timeouts and statuses the transport retries on, mark the connection
+    dead and try the next one, up to `max_retries` times.
+    """
+    for attempt in range(transport.max_retries + 1):
+        connection = transport.get_connection()
+        # The same backoff as the transport: 0, 1, 3, 7, etc...
+        time.sleep(2 ** attempt - 1)
+        try:
+            response = _open(connection, method, url, params)
+        except TransportError as err:
+            if isinstance(err, ConnectionTimeout):
+                retry = transport.retry_on_timeout
+            elif isinstance(err, ConnectionError):
+                retry = True
+            else:
+                retry = err.status_code in transport.retry_on_status
+            if not retry:
+                raise
+            transport.mark_dead(connection)
+            if attempt == transport.max_retries:
+                raise
+        else:
+            transport.connection_pool.mark_live(connection)
+            return connection, response
+
+def stream_response(client, method, url, params=None, chunk_size=65536):
+    """
+    Perform a request and yield the response body as text chunks, as they
+    arrive, rather than reading it all into memory.  The request is retried
+    on other nodes, and failed nodes are marked dead, as the transport would.
+    Connections which are not an :class:`elasticsearch.Urllib3HttpConnection`
+    fall back to :py:meth:`elasticsearch.Transport.perform_request`, and
+    yield the whole body as a single chunk.
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg method: HTTP method to use
+    :arg url: Absolute url (without host) to target
+    :arg params: Dictionary of query parameters
+    :arg chunk_size: Number of bytes to read at a time
+    """
+    transport = client.transport
+    if not hasattr(transport.get_connection(), 'pool'):
+        data = transport.perform_request(method, url, params=params)
+        yield transport.serializer.dumps(data)
+        return
+    connection, response = _stream(transport, method, url, params)
+    try:
+        decoder = codecs.getincrementaldecoder('utf-8')('surrogatepass')
+        try:
+            for chunk in response.stream(chunk_size):
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+        except (HTTPError, socket.error) as err:
+            # The node went away part way through the body, which can not be
+            # resumed elsewhere
+            transport.mark_dead(connection)
+            raise ConnectionError('N/A', str(err), err)
+        text = decoder.decode(b'', True)
+        if text:
+            yield text
+    finally:
+        response.release_conn()
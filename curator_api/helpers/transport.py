@@ -0,0 +1,203 @@
+"""
+Latency-aware transport
+
+Route requests to the coordinating nodes which have been answering fastest,
+and optionally hedge idempotent reads by sending a second copy to another node
+when the first is slow to answer.
+"""
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from elasticsearch import Transport, Urllib3HttpConnection
+from elasticsearch.connection_pool import ConnectionSelector
+
+logger = logging.getLogger(__name__)
+
+class Latency(object):
+    """
+    Track the latency of one connection as an exponentially weighted moving
+    average, and keep recent samples for percentiles.
+    """
+    def __init__(self, alpha=0.3, samples=100):
+        """
+        :arg alpha: Weight of each new sample in the moving average
+        :arg samples: Number of recent samples kept for percentiles
+        """
+        #: Instance variable.
+        #: The moving average, in seconds, or `None` before the first sample
+        self.ewma = None
+        self.alpha = alpha
+        self.samples = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        """Add a sample of `seconds`"""
+        with self._lock:
+            self.samples.append(seconds)
+            if self.ewma is None:
+                self.ewma = seconds
+            else:
+                self.ewma = self.alpha * seconds + (1 - self.alpha) * self.ewma
+
+    def percentile(self, pct, minimum=10):
+        """
+        Return the `pct` percentile of the recent samples, or `None` if there
+        are fewer than `minimum` of them.
+        """
+        with self._lock:
+            ordered = sorted(self.samples)
+        if len(ordered) < minimum:
+            return None
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+def latency_tracking(connection_class):
+    """
+    Return a subclass of `connection_class` which records the duration of each
+    request in its ``latency`` attribute, a :class:`Latency` object.
+
+    :arg connection_class: A subclass of :class:`elasticsearch.Connection`
+    """
+    if getattr(connection_class, 'tracks_latency', False):
+        return connection_class
+    class LatencyTrackingConnection(connection_class):
+        tracks_latency = True
+        def __init__(self, *args, **kwargs):
+            super(LatencyTrackingConnection, self).__init__(*args, **kwargs)
+            self.latency = Latency()
+        def perform_request(self, *args, **kwargs):
+            start = time.time()
+            try:
+                return super(LatencyTrackingConnection, self).perform_request(
+                    *args, **kwargs)
+            finally:
+                self.latency.record(time.time() - start)
+    LatencyTrackingConnection.__name__ = 'LatencyTracking' + connection_class.__name__
+    return LatencyTrackingConnection
+
+def _ewma(connection):
+    """Return the latency average of `connection`, or `None` if unmeasured"""
+    latency = getattr(connection, 'latency', None)
+    return None if latency is None else latency.ewma
+
+class LatencySelector(ConnectionSelector):
+    """
+    Select the live connection with the lowest latency average.  Connections
+    which have not been measured yet are tried first, and a small share of
+    requests (`explore`) goes to a random connection, so that a node which
+    was slow gets the chance to show it has recovered.
+    """
+    explore = 0.05
+
+    def select(self, connections):
+        unmeasured = [c for c in connections if _ewma(c) is None]
+        if unmeasured:
+            return unmeasured[0]
+        if self.explore and random.random() < self.explore:
+            return random.choice(connections)
+        return min(connections, key=_ewma)
+
+class LatencyAwareTransport(Transport):
+    """
+    A :class:`elasticsearch.Transport` which measures the latency of every
+    connection, and selects connections with :class:`LatencySelector`.
+
+    With `hedged_reads`, a ``GET`` or ``HEAD`` which has not been answered
+    within the 95th percentile latency of its node (or `hedge_delay` seconds,
+    until enough samples exist) is also sent to the next fastest node, and the
+    first answer is used.
+    """
+    hedge_methods = ('GET', 'HEAD')
+
+    def __init__(
+            self, hosts, hedged_reads=False, hedge_delay=1.0, hedge_workers=4,
+            **kwargs
+        ):
+        """
+        :arg hosts: Same as :class:`elasticsearch.Transport`
+        :arg hedged_reads: Whether to hedge idempotent reads
+        :arg hedge_delay: Seconds to wait before hedging, until a node has
+            enough samples for its 95th percentile
+        :arg hedge_workers: Number of threads used to send hedged reads
+        :arg kwargs: Any other arguments accepted by
+            :class:`elasticsearch.Transport`
+        """
+        kwargs['connection_class'] = latency_tracking(
+            kwargs.get('connection_class', Urllib3HttpConnection))
+        kwargs.setdefault('selector_class', LatencySelector)
+        #: Instance variable.
+        #: Whether to hedge idempotent reads
+        self.hedged_reads = hedged_reads
+        #: Instance variable.
+        #: Seconds to wait before hedging, until there are enough samples
+        self.hedge_delay = hedge_delay
+        self.hedge_workers = hedge_workers
+        self._executor = None
+        self._pinned = threading.local()
+        super(LatencyAwareTransport, self).__init__(hosts, **kwargs)
+
+    def get_connection(self):
+        """
+        Return the connection pinned for this thread's next attempt, if any,
+        or select one from the pool.
+        """
+        pinned = getattr(self._pinned, 'connection', None)
+        if pinned is not None:
+            # Only pin the first attempt; retries select as usual
+            self._pinned.connection = None
+            return pinned
+        return super(LatencyAwareTransport, self).get_connection()
+
+    def _attempt(self, connection, method, url, headers, params, body):
+        """Perform the request on a thread, starting with `connection`"""
+        self._pinned.connection = connection
+        return super(LatencyAwareTransport, self).perform_request(
+            method, url, headers=headers,
+            params=None if params is None else dict(params), body=body
+        )
+
+    def _hedge_target(self, primary):
+        """Return the fastest live connection other than `primary`, or `None`"""
+        others = [
+            c for c in self.connection_pool.connections if c is not primary]
+        if not others:
+            return None
+        return min(others, key=lambda c: (_ewma(c) is not None, _ewma(c)))
+
+    def perform_request(self, method, url, headers=None, params=None, body=None):
+        """
+        Same as :py:meth:`elasticsearch.Transport.perform_request`, hedging
+        idempotent reads if `hedged_reads` is set.
+        """
+        if not self.hedged_reads or method not in self.hedge_methods:
+            return super(LatencyAwareTransport, self).perform_request(
+                method, url, headers=headers, params=params, body=body)
+        primary = self.get_connection()
+        secondary = self._hedge_target(primary)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.hedge_workers)
+        args = (method, url, headers, params, body)
+        futures = [self._executor.submit(self._attempt, primary, *args)]
+        if secondary is None:
+            return futures[0].result()
+        delay = primary.latency.percentile(95)
+        done, _ = wait(futures, timeout=self.hedge_delay if delay is None else delay)
+        if not done:
+            logger.debug(
+                'Hedging {0} {1} to {2} after {3} seconds'.format(
+                    method, url, secondary, delay))
+            futures.append(self._executor.submit(self._attempt, secondary, *args))
+        pending = set(futures)
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None or not pending:
+                    return future.result()
+
+    def close(self):
+        """Explicitly closes connections, and the hedging threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        super(LatencyAwareTransport, self).close()
@@ -1,6 +1,7 @@
 """Utility functions"""
 # from sys import version_info as python_version
 import logging
+import re
 from six import string_types
 from curator_api.exceptions import NoIndices
 
@@ -19,6 +20,42 @@ def byte_size(num, suffix='B'):
         num /= 1024.0
     return "%.1f%s%s" % (num, 'Y', suffix)
 
+def parse_byte_size(value):
+    """
+    Return a size setting such as ``4kb``, ``1.5gb`` or ``8192`` as a number
+    of bytes, the inverse of :py:func:`byte_size`.  Raise a `ValueError` if
+    `value` is not a size.
+
+    :arg value: A size, as a string or a number
+    :rtype: int
+    """
+    match = re.match(
+        r'^\s*(\d+(?:\.\d+)?)\s*([kmgtp]?)b?\s*$', str(value).lower())
+    if not match:
+        raise ValueError('Unable to parse byte size: {0}'.format(value))
+    return int(
+        float(match.group(1)) * 1024 ** ' kmgtp'.index(match.group(2) or ' '))
+
+# Seconds in each unit of an Elasticsearch time value
+_TIME_UNITS = {
+    'nanos': 1e-9, 'micros': 1e-6, 'ms': 1e-3, 's': 1, 'm': 60, 'h': 3600,
+    'd': 86400,
+}
+
+def parse_time(value):
+    """
+    Return a time value such as ``7d`` or ``12h`` as a number of seconds.
+    Raise a `ValueError` if `value` is not a time value.
+
+    :arg value: A time value, as a string
+    :rtype: float
+    """
+    match = re.match(
+        r'^\s*(\d+(?:\.\d+)?)\s*(nanos|micros|ms|s|m|h|d)\s*$', str(value))
+    if not match:
+        raise ValueError('Unable to parse time value: {0}'.format(value))
+    return float(match.group(1)) * _TIME_UNITS[match.group(2)]
+
 def ensure_list(indices):
     """
     Return a list, even if indices is a single value
@@ -1,25 +1,20 @@
 import logging
 import time
 from curator_api.exceptions import ActionTimeout, ConfigurationError, CuratorException, MissingArgument
+from curator_api.helpers.client import api_params
 from curator_api.helpers.utils import to_csv
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-def health_check(client, **kwargs):
+def _health_check_result(hc_data, **kwargs):
     """
-    This function calls client.cluster.health and, based on the args provided,
-    will return `True` or `False` depending on whether that particular keyword 
-    appears in the output, and has the expected value.
-    If multiple keys are provided, all must match for a `True` response. 
+    Evaluate a ``client.cluster.health`` response for :py:func:`health_check`
 
-    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg hc_data: The cluster health response
+    :rtype: bool
     """
-    logger.debug('KWARGS= "{0}"'.format(kwargs))
     klist = list(kwargs.keys())
-    if len(klist) < 1:
-        raise MissingArgument('Must provide at least one keyword argument')
-    hc_data = client.cluster.health()
     response = True
     
     for k in klist:
@@ -41,6 +36,56 @@ def health_check(client, **kwargs):
         logger.info('Health Check for all provided keys passed.')   
     return response
 
+def _health_check_request(kwargs):
+    """
+    Return the keyword arguments for the ``cluster.health`` call made by
+    :py:func:`health_check`, asking only for the keys in `kwargs`.
+    """
+    return api_params('health_check', keys=','.join(sorted(kwargs.keys())))
+
+def _verify_health_check_args(kwargs):
+    """Raise `MissingArgument` if :py:func:`health_check` has nothing to check"""
+    logger.debug('KWARGS= "{0}"'.format(kwargs))
+    if len(list(kwargs.keys())) < 1:
+        raise MissingArgument('Must provide at least one keyword argument')
+
+def health_check(client, **kwargs):
+    """
+    This function calls client.cluster.health and, based on the args provided,
+    will return `True` or `False` depending on whether that particular keyword 
+    appears in the output, and has the expected value.
+    If multiple keys are provided, all must match for a `True` response. 
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    """
+    _verify_health_check_args(kwargs)
+    return _health_check_result(
+        client.cluster.health(**_health_check_request(kwargs)), **kwargs)
+
+def _relocate_check_request(index):
+    """
+    Return the keyword arguments for the ``cluster.state`` call made by
+    :py:func:`relocate_check`
+    """
+    request = {'index': index}
+    request.update(api_params('relocate_check'))
+    return request
+
+def _relocate_check_result(state, index):
+    """
+    Evaluate a ``client.cluster.state`` response for :py:func:`relocate_check`
+
+    :arg state: The cluster state response
+    :arg index: The index to check the index shards state.
+    :rtype: bool
+    """
+    shard_state_data = state['routing_table']['indices'][index]['shards']
+
+    finished_state = all(all(shard['state']=="STARTED" for shard in shards) for shards in shard_state_data.values())
+    if finished_state:
+        logger.info('Relocate Check for index: "{0}" has passed.'.format(index))
+    return finished_state
+
 def relocate_check(client, index):
     """
     This function calls client.cluster.state with a given index to check if
@@ -52,34 +97,33 @@ def relocate_check(client, index):
     :arg client: An :class:`elasticsearch.Elasticsearch` client object
     :arg index: The index to check the index shards state.
     """
-    shard_state_data = client.cluster.state(index=index)['routing_table']['indices'][index]['shards']
+    return _relocate_check_result(
+        client.cluster.state(**_relocate_check_request(index)), index)
 
-    finished_state = all(all(shard['state']=="STARTED" for shard in shards) for shards in shard_state_data.values())
-    if finished_state:
-        logger.info('Relocate Check for index: "{0}" has passed.'.format(index))
-    return finished_state
+def _snapshot_failure(snapshot, repository, err):
+    """Return the exception raised when snapshot information is unavailable"""
+    return CuratorException(
+        'Unable to obtain information for snapshot "{0}" in repository '
+        '"{1}". Error: {2}'.format(snapshot, repository, err)
+    )
 
-def snapshot_check(client, snapshot=None, repository=None):
+def _snapshot_check_request(snapshot, repository):
     """
-    This function calls `client.snapshot.get` and tests to see whether the 
-    snapshot is complete, and if so, with what status.  It will log errors
-    according to the result. If the snapshot is still `IN_PROGRESS`, it will 
-    return `False`.  `SUCCESS` will be an `INFO` level message, `PARTIAL` nets
-    a `WARNING` message, `FAILED` is an `ERROR`, message, and all others will be
-    a `WARNING` level message.
+    Return the keyword arguments for the ``snapshot.get`` call made by
+    :py:func:`snapshot_check`
+    """
+    request = {'repository': repository, 'snapshot': snapshot}
+    request.update(api_params('snapshot_check'))
+    return request
 
-    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+def _snapshot_check_result(state, snapshot):
+    """
+    Evaluate and log the snapshot `state` found by :py:func:`snapshot_check`
+
+    :arg state: The ``state`` value of the snapshot
     :arg snapshot: The name of the snapshot.
-    :arg repository: The Elasticsearch snapshot repository to use
+    :rtype: bool
     """
-    try:
-        state = client.snapshot.get(
-            repository=repository, snapshot=snapshot)['snapshots'][0]['state']
-    except Exception as e:
-        raise CuratorException(
-            'Unable to obtain information for snapshot "{0}" in repository '
-            '"{1}". Error: {2}'.format(snapshot, repository, e)
-        )
     logger.debug('Snapshot state = {0}'.format(state))
     if state == 'IN_PROGRESS':
         logger.info('Snapshot {0} still in progress.'.format(snapshot))
@@ -98,26 +142,52 @@ def snapshot_check(client, snapshot=None, repository=None):
             'Snapshot {0} completed with state: {0}'.format(snapshot))
     return True
 
-
-def restore_check(client, index_list):
+def snapshot_check(client, snapshot=None, repository=None):
     """
-    This function calls client.indices.recovery with the list of indices to 
-    check for complete recovery.  It will return `True` if recovery of those 
-    indices is complete, and `False` otherwise.  It is designed to fail fast:
-    if a single shard is encountered that is still recovering (not in `DONE`
-    stage), it will immediately return `False`, rather than complete iterating
-    over the rest of the response.
+    This function calls `client.snapshot.get` and tests to see whether the 
+    snapshot is complete, and if so, with what status.  It will log errors
+    according to the result. If the snapshot is still `IN_PROGRESS`, it will 
+    return `False`.  `SUCCESS` will be an `INFO` level message, `PARTIAL` nets
+    a `WARNING` message, `FAILED` is an `ERROR`, message, and all others will be
+    a `WARNING` level message.
 
-    :arg client: An :class:`elasticsearch.Elasticsearch` client object 
-    :arg index_list: The list of indices to verify having been restored.
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg snapshot: The name of the snapshot.
+    :arg repository: The Elasticsearch snapshot repository to use
     """
     try:
-        response = client.indices.recovery(index=to_csv(index_list), human=True)
+        state = client.snapshot.get(
+            **_snapshot_check_request(snapshot, repository))['snapshots'][0]['state']
     except Exception as e:
-        raise CuratorException(
-            'Unable to obtain recovery information for specified indices. '
-            'Error: {0}'.format(e)
-        )
+        raise _snapshot_failure(snapshot, repository, e)
+    return _snapshot_check_result(state, snapshot)
+
+
+def _restore_failure(err):
+    """Return the exception raised when recovery information is unavailable"""
+    return CuratorException(
+        'Unable to obtain recovery information for specified indices. '
+        'Error: {0}'.format(err)
+    )
+
+def _restore_check_request(index_list):
+    """
+    Return the keyword arguments for the ``indices.recovery`` call made by
+    :py:func:`restore_check`
+    """
+    request = {'index': to_csv(index_list), 'human': True}
+    request.update(api_params('restore_check'))
+    return request
+
+def _restore_check_result(response, index_list):
+    """
+    Evaluate a ``client.indices.recovery`` response for
+    :py:func:`restore_check`
+
+    :arg response: The recovery API response
+    :arg index_list: The list of indices to verify having been restored.
+    :rtype: bool
+    """
     # This should address #962, where perhaps the cluster state hasn't yet
     # had a chance to add a _recovery state yet, so it comes back empty.
     if response == {}:
@@ -140,25 +210,49 @@ def restore_check(client, index_list):
     # If we've gotten here, all of the indices have recovered
     return True
 
-
-def task_check(client, task_id=None):
+def restore_check(client, index_list):
     """
-    This function calls client.tasks.get with the provided `task_id`.  If the
-    task data contains ``'completed': True``, then it will return `True` 
-    If the task is not completed, it will log some information about the task
-    and return `False`
+    This function calls client.indices.recovery with the list of indices to 
+    check for complete recovery.  It will return `True` if recovery of those 
+    indices is complete, and `False` otherwise.  It is designed to fail fast:
+    if a single shard is encountered that is still recovering (not in `DONE`
+    stage), it will immediately return `False`, rather than complete iterating
+    over the rest of the response.
 
-    :arg client: An :class:`elasticsearch.Elasticsearch` client object    
-    :arg task_id: A task_id which ostensibly matches a task searchable in the
-        tasks API.
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object 
+    :arg index_list: The list of indices to verify having been restored.
     """
     try:
-        task_data = client.tasks.get(task_id=task_id)
+        response = client.indices.recovery(**_restore_check_request(index_list))
     except Exception as e:
-        raise CuratorException(
-            'Unable to obtain task information for task_id "{0}". Exception '
-            '{1}'.format(task_id, e)
-        )
+        raise _restore_failure(e)
+    return _restore_check_result(response, index_list)
+
+
+def _task_failure(task_id, err):
+    """Return the exception raised when task information is unavailable"""
+    return CuratorException(
+        'Unable to obtain task information for task_id "{0}". Exception '
+        '{1}'.format(task_id, err)
+    )
+
+def _task_check_request(task_id):
+    """
+    Return the keyword arguments for the ``tasks.get`` call made by
+    :py:func:`task_check`
+    """
+    request = {'task_id': task_id}
+    request.update(api_params('task_check'))
+    return request
+
+def _task_check_result(task_data, task_id):
+    """
+    Evaluate a ``client.tasks.get`` response for :py:func:`task_check`
+
+    :arg task_data: The tasks API response
+    :arg task_id: The task_id, used for logging.
+    :rtype: bool
+    """
     task = task_data['task']
     completed = task_data['completed']
     running_time = 0.000000001 * task['running_time_in_nanos']
@@ -180,62 +274,79 @@ def task_check(client, task_id=None):
             '{2} seconds'.format(descr, task_id, running_time))
         return False
 
+def task_check(client, task_id=None):
+    """
+    This function calls client.tasks.get with the provided `task_id`.  If the
+    task data contains ``'completed': True``, then it will return `True` 
+    If the task is not completed, it will log some information about the task
+    and return `False`
 
-def wait_for_it(
-        client, action, task_id=None, snapshot=None, repository=None,
-        index=None, index_list=None, wait_interval=9, max_wait=-1
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object    
+    :arg task_id: A task_id which ostensibly matches a task searchable in the
+        tasks API.
+    """
+    try:
+        task_data = client.tasks.get(**_task_check_request(task_id))
+    except Exception as e:
+        raise _task_failure(task_id, e)
+    return _task_check_result(task_data, task_id)
+
+
+def _wait_action_map(
+        checks, task_id=None, snapshot=None, repository=None, index=None,
+        index_list=None
     ):
     """
-    This function becomes one place to do all wait_for_completion type behaviors
+    Map each :py:func:`wait_for_it` action to its check function and args.
 
-    :arg client: An :class:`elasticsearch.Elasticsearch` client object
-    :arg action: The action name that will identify how to wait
-    :arg task_id: If the action provided a task_id, this is where it must be
-        declared.
-    :arg snapshot: The name of the snapshot.
-    :arg repository: The Elasticsearch snapshot repository to use
-    :arg wait_interval: How frequently the specified "wait" behavior will be
-        polled to check for completion.
-    :arg max_wait: Number of seconds will the "wait" behavior persist 
-        before giving up and raising an Exception.  The default is -1, meaning
-        it will try forever.
+    :arg checks: A dictionary of the check functions to use, keyed by
+        ``health``, ``snapshot``, ``restore``, ``task`` and ``relocate``, so
+        that sync and async callers share the same mapping.
+    :rtype: dict
     """
-    action_map = {
+    return {
         'allocation':{
-            'function': health_check,
+            'function': checks['health'],
             'args': {'relocating_shards':0},
         },
         'replicas':{
-            'function': health_check,
+            'function': checks['health'],
             'args': {'status':'green'},
         },
         'cluster_routing':{
-            'function': health_check,
+            'function': checks['health'],
             'args': {'relocating_shards':0},
         },
         'snapshot':{
-            'function':snapshot_check,
+            'function':checks['snapshot'],
             'args':{'snapshot':snapshot, 'repository':repository},
         },
         'restore':{
-            'function':restore_check,
+            'function':checks['restore'],
             'args':{'index_list':index_list},
         },
         'reindex':{
-            'function':task_check,
+            'function':checks['task'],
             'args':{'task_id':task_id},
         },
         'shrink':{
-            'function': health_check,
+            'function': checks['health'],
             'args': {'status':'green'},
         },
         'relocate':{
-            'function': relocate_check,
+            'function': checks['relocate'],
             'args': {'index':index}
         },
     }
-    wait_actions = list(action_map.keys())
 
+def _verify_wait_args(
+        action, wait_actions, task_id=None, snapshot=None, repository=None,
+        index_list=None
+    ):
+    """
+    Raise an exception if `action` is unknown, or is missing the arguments it
+    needs in order to wait.
+    """
     if action not in wait_actions:
         raise ConfigurationError(
             '"action" must be one of {0}'.format(wait_actions)
@@ -253,50 +364,103 @@ def wait_for_it(
         raise MissingArgument(
             'An index_list must accompany "action" {0}'.format(action)
         )
-    elif action == 'reindex':
+
+def _missing_task(task_id, err):
+    """Return the exception raised when the reindex `task_id` is not found"""
+    # This exception should only exist in API usage. It should never
+    # occur in regular Curator usage.
+    return CuratorException(
+        'Unable to find task_id {0}. Exception: {1}'.format(task_id, err)
+    )
+
+def _wait_outcome(action, response, elapsed, max_wait, wait_interval):
+    """
+    Decide what :py:func:`wait_for_it` does after one check.
+
+    :arg response: The result of the check function
+    :arg elapsed: Seconds elapsed since waiting began
+    :rtype: `True` if finished, `False` if `max_wait` was reached, or `None`
+        if it is time to sleep `wait_interval` seconds and check again.
+    """
+    logger.debug('Response: {0}'.format(response))
+    # Success
+    if response:
+        logger.debug(
+            'Action "{0}" finished executing (may or may not have been '
+            'successful)'.format(action))
+        return True
+    # Not success, and reached maximum wait (if defined)
+    elif (max_wait != -1) and (elapsed >= max_wait):
+        logger.error(
+            'Unable to complete action "{0}" within max_wait ({1}) '
+            'seconds.'.format(action, max_wait)
+        )
+        return False
+    # Not success, so we wait.
+    logger.debug(
+        'Action "{0}" not yet complete, {1} total seconds elapsed. '
+        'Waiting {2} seconds before checking '
+        'again.'.format(action, elapsed, wait_interval))
+    return None
+
+def _verify_wait_result(action, result, max_wait):
+    """Raise `ActionTimeout` if `result` shows the wait did not finish"""
+    logger.debug('Result: {0}'.format(result))
+    if result == False:
+        raise ActionTimeout(
+            'Action "{0}" failed to complete in the max_wait period of '
+            '{1} seconds'.format(action, max_wait)
+        )
+
+def wait_for_it(
+        client, action, task_id=None, snapshot=None, repository=None,
+        index=None, index_list=None, wait_interval=9, max_wait=-1
+    ):
+    """
+    This function becomes one place to do all wait_for_completion type behaviors
+
+    :arg client: An :class:`elasticsearch.Elasticsearch` client object
+    :arg action: The action name that will identify how to wait
+    :arg task_id: If the action provided a task_id, this is where it must be
+        declared.
+    :arg snapshot: The name of the snapshot.
+    :arg repository: The Elasticsearch snapshot repository to use
+    :arg wait_interval: How frequently the specified "wait" behavior will be
+        polled to check for completion.
+    :arg max_wait: Number of seconds will the "wait" behavior persist 
+        before giving up and raising an Exception.  The default is -1, meaning
+        it will try forever.
+    """
+    action_map = _wait_action_map(
+        {
+            'health': health_check,
+            'snapshot': snapshot_check,
+            'restore': restore_check,
+            'task': task_check,
+            'relocate': relocate_check,
+        },
+        task_id=task_id, snapshot=snapshot, repository=repository,
+        index=index, index_list=index_list
+    )
+    _verify_wait_args(
+        action, list(action_map.keys()), task_id=task_id, snapshot=snapshot,
+        repository=repository, index_list=index_list
+    )
+    if action == 'reindex':
         try:
             _ = client.tasks.get(task_id=task_id)
         except Exception as e:
-            # This exception should only exist in API usage. It should never
-            # occur in regular Curator usage.
-            raise CuratorException(
-                'Unable to find task_id {0}. Exception: {1}'.format(task_id, e)
-            )
+            raise _missing_task(task_id, e)
 
     # Now with this mapped, we can perform the wait as indicated.
     start_time = datetime.now()
-    result = False
-    while True:
+    result = None
+    while result is None:
         elapsed = int((datetime.now() - start_time).total_seconds())
         logger.debug('Elapsed time: {0} seconds'.format(elapsed))
         response = action_map[action]['function'](
             client, **action_map[action]['args'])
-        logger.debug('Response: {0}'.format(response))
-        # Success
-        if response:
-            logger.debug(
-                'Action "{0}" finished executing (may or may not have been '
-                'successful)'.format(action))
-            result = True
-            break
-        # Not success, and reached maximum wait (if defined)
-        elif (max_wait != -1) and (elapsed >= max_wait):
-            logger.error(
-                'Unable to complete action "{0}" within max_wait ({1}) '
-                'seconds.'.format(action, max_wait)
-            )
-            break
-        # Not success, so we wait.
-        else:
-            logger.debug(
-                'Action "{0}" not yet complete, {1} total seconds elapsed. '
-                'Waiting {2} seconds before checking '
-                'again.'.format(action, elapsed, wait_interval))
+        result = _wait_outcome(action, response, elapsed, max_wait, wait_interval)
+        if result is None:
             time.sleep(wait_interval)
-
-    logger.debug('Result: {0}'.format(result))
-    if result == False:
-        raise ActionTimeout(
-            'Action "{0}" failed to complete in the max_wait period of '
-            '{1} seconds'.format(action, max_wait)
-        )
\ No newline at end of file
+    _verify_wait_result(action, result, max_wait)
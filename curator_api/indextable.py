@@ -0,0 +1,217 @@
+"""Columnar index metadata"""
+import operator
+from array import array
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#: The integer columns of an :class:`IndexTable`.  Missing values are stored
+#: as ``-1``.
+COLUMNS = (
+    'creation_date', 'size_in_bytes', 'docs', 'number_of_shards',
+    'number_of_replicas', 'segments',
+)
+
+#: Index states, stored by their position in this tuple
+STATES = ('open', 'close')
+
+_MISSING = -1
+
+_OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>=': operator.ge,
+    '>': operator.gt,
+}
+
+try:
+    array('q')
+    _INT64 = 'q'
+except ValueError:
+    # Python 2 has no 'q' typecode, but its 'l' is 64 bits on 64 bit Unix
+    _INT64 = 'l'
+
+def _column(values, typecode=_INT64):
+    """Return `values` as a compact integer column"""
+    if np is not None:
+        return np.array(values, dtype='int64' if typecode == _INT64 else 'int8')
+    return array(typecode, values)
+
+def _stored(value):
+    """Return `value` as it is stored in a column"""
+    return _MISSING if value is None else int(value)
+
+def _loaded(value):
+    """Return a stored column value as it is presented in a row"""
+    value = int(value)
+    return None if value == _MISSING else value
+
+class _IndexInfoView(Mapping):
+    """
+    A read-only, dict of dicts view of an :class:`IndexTable`, in the shape of
+    the ``index_info`` of a Curator ``IndexList``.  Each row's dictionary is
+    only built when it is looked up.
+    """
+    def __init__(self, table):
+        self.table = table
+
+    def __getitem__(self, index):
+        return self.table.row(index)
+
+    def __iter__(self):
+        return iter(self.table.names)
+
+    def __len__(self):
+        return len(self.table.names)
+
+class IndexTable(object):
+    """
+    Per-index metadata stored as parallel columns: a list of index names,
+    whose positions are the row ids, and compact integer arrays for the
+    creation date (epoch seconds), size in bytes, document count, state,
+    shard, replica and segment counts.  Columns are NumPy arrays if NumPy can
+    be imported, otherwise :class:`array.array` objects.
+
+    For 150k indices this is a handful of objects rather than millions of
+    small dictionaries, and filters compare whole columns at once.
+    """
+    def __init__(self, rows=()):
+        """
+        :arg rows: An iterable of ``(name, info)`` tuples, where `info` is a
+            dictionary holding any of the :py:data:`COLUMNS` keys, plus
+            ``state``.  A ``creation_date`` may also be given as
+            ``info['age']['creation_date']``, as in a Curator ``index_info``.
+        """
+        names = []
+        values = dict((column, []) for column in COLUMNS)
+        states = []
+        for name, info in rows:
+            names.append(name)
+            if 'creation_date' not in info and 'age' in info:
+                info = dict(info, creation_date=info['age'].get('creation_date'))
+            for column in COLUMNS:
+                values[column].append(_stored(info.get(column)))
+            states.append(
+                STATES.index(info['state']) if info.get('state') in STATES
+                else _MISSING
+            )
+        #: Instance variable.
+        #: The index names, in row order
+        self.names = names
+        #: Instance variable.
+        #: A dictionary of index name to row id
+        self.rows = dict((name, row) for row, name in enumerate(names))
+        #: Instance variable.
+        #: A dictionary of column name to column
+        self.columns = dict(
+            (column, _column(values[column])) for column in COLUMNS)
+        self.columns['state'] = _column(states, typecode='b')
+
+    @classmethod
+    def from_index_info(cls, index_info):
+        """
+        Build an :class:`IndexTable` from a dict of dicts of index metadata.
+
+        :arg index_info: A dictionary of index name to metadata dictionary
+        """
+        return cls(sorted(index_info.items()))
+
+    @classmethod
+    def from_inventory(cls, inventory):
+        """
+        Build an :class:`IndexTable` from an
+        :class:`curator_api.inventory.IndexInventory`, converting its creation
+        dates from milliseconds to seconds.
+
+        :arg inventory: A :class:`curator_api.inventory.IndexInventory` object
+        """
+        rows = []
+        for index in inventory.indices:
+            info = dict(inventory[index])
+            if info.get('creation_date') is not None:
+                info['creation_date'] //= 1000
+            rows.append((index, info))
+        return cls(rows)
+
+    def __contains__(self, index):
+        return index in self.rows
+
+    def __len__(self):
+        return len(self.names)
+
+    def get(self, index, column):
+        """
+        Return the value of `column` for `index`, or `None` if it is missing.
+        """
+        value = self.columns[column][self.rows[index]]
+        if column == 'state':
+            return None if value == _MISSING else STATES[value]
+        return _loaded(value)
+
+    def set(self, column, values):
+        """
+        Store the values of `column` for some indices, e.g. segment counts
+        which were read later.
+
+        :arg column: The column name
+        :arg values: A dictionary of index name to value
+        """
+        data = self.columns[column]
+        for index, value in values.items():
+            if column == 'state':
+                data[self.rows[index]] = STATES.index(value)
+            else:
+                data[self.rows[index]] = _stored(value)
+
+    def row(self, index):
+        """
+        Return the metadata of `index` as a dictionary, in the shape of the
+        ``index_info`` of a Curator ``IndexList``.
+        """
+        info = dict((column, self.get(index, column)) for column in COLUMNS)
+        info['age'] = {'creation_date': info.pop('creation_date')}
+        info['state'] = self.get(index, 'state')
+        return info
+
+    @property
+    def index_info(self):
+        """A lazy, read-only dict of dicts view of the table"""
+        return _IndexInfoView(self)
+
+    def select(self, column, op, value):
+        """
+        Return the row ids where `column` compares to `value` with `op`.
+        Rows missing the value never match.
+
+        :arg column: The column name
+        :arg op: One of ``<``, ``<=``, ``==``, ``!=``, ``>=`` or ``>``
+        :arg value: The value to compare with.  For ``state``, one of
+            :py:data:`STATES`.
+        :rtype: list
+        """
+        compare = _OPERATORS[op]
+        data = self.columns[column]
+        if column == 'state':
+            value = STATES.index(value)
+        if np is not None:
+            return np.nonzero(compare(data, value) & (data != _MISSING))[0].tolist()
+        return [
+            row for row, item in enumerate(data)
+            if item != _MISSING and compare(item, value)
+        ]
+
+    def filter(self, column, op, value):
+        """
+        Return the names of the indices where `column` compares to `value` with
+        `op`.  Arguments are the same as :py:meth:`select`.
+
+        :rtype: list
+        """
+        return [self.names[row] for row in self.select(column, op, value)]
@@ -0,0 +1,152 @@
+"""Index inventory"""
+import logging
+from curator_api.exceptions import FailedExecution
+from curator_api.helpers.client import api_params
+from curator_api.helpers.index import chunk_index_list
+
+#: The ``_cat/indices`` columns requested, and the ``index_info`` key each
+#: one is stored under
+CAT_COLUMNS = (
+    ('index', 'name'),
+    ('uuid', 'uuid'),
+    ('status', 'state'),
+    ('health', 'health'),
+    ('pri', 'number_of_shards'),
+    ('rep', 'number_of_replicas'),
+    ('docs.count', 'docs'),
+    ('store.size', 'size_in_bytes'),
+    ('pri.store.size', 'primary_size_in_bytes'),
+    ('creation.date', 'creation_date'),
+)
+
+#: The ``index_info`` keys which hold numbers
+_NUMERIC = (
+    'number_of_shards', 'number_of_replicas', 'docs', 'size_in_bytes',
+    'primary_size_in_bytes', 'creation_date',
+)
+
+#: The ``index_info`` keys which can be read from the index settings when
+#: ``_cat/indices`` leaves them out, as it does for closed indices
+_FROM_SETTINGS = {
+    'number_of_shards': 'number_of_shards',
+    'number_of_replicas': 'number_of_replicas',
+    'creation_date': 'creation_date',
+}
+
+def _number(value):
+    """Return `value` as an int, or `None` if ``_cat`` left it blank"""
+    if value is None or value == '':
+        return None
+    return int(value)
+
+class IndexInventory(object):
+    """
+    The name, uuid, state, health, shard and replica counts, document count,
+    store size and creation date of every index in the cluster, read with a
+    single ``_cat/indices`` call instead of separate ``indices.get_settings``,
+    ``cluster.state`` and ``indices.stats`` calls.
+
+    Fields which ``_cat/indices`` does not report for an index (shard counts
+    and creation date of closed indices) are read from the index settings, in
+    one more call for only those indices.  Document counts and sizes of closed
+    indices are not available from any API, and are `None`.
+    """
+    def __init__(self, client, index='_all'):
+        """
+        :arg client: An :class:`elasticsearch.Elasticsearch` client object
+        :arg index: An index expression, such as ``logs-*,-logs-old-*``, to
+            list only the indices it matches.  See
+            :py:func:`curator_api.filterplan.wildcard_expression`.
+        """
+        #: Instance variable.
+        #: The Elasticsearch Client object
+        self.client = client
+        #: Instance variable.
+        #: The index expression listed
+        self.index = index
+        #: Instance variable.
+        #: A dictionary of index name to a dictionary of its metadata, keyed
+        #: by the second value of each entry in :py:data:`CAT_COLUMNS`.
+        #: ``creation_date`` is in epoch milliseconds.
+        self.index_info = {}
+        self.loggit = logging.getLogger('curator_api.inventory')
+        self.refresh()
+
+    def __contains__(self, index):
+        return index in self.index_info
+
+    def __getitem__(self, index):
+        return self.index_info[index]
+
+    def __iter__(self):
+        return iter(self.indices)
+
+    def __len__(self):
+        return len(self.index_info)
+
+    @property
+    def indices(self):
+        """The sorted list of index names"""
+        return sorted(self.index_info)
+
+    def refresh(self):
+        """Read the inventory from the cluster again."""
+        try:
+            rows = self.client.cat.indices(
+                index=self.index, format='json', bytes='b',
+                h=','.join([column for column, _ in CAT_COLUMNS])
+            )
+        except Exception as err:
+            raise FailedExecution(
+                'Failed to read the index inventory. Error: {0}'.format(err))
+        self.index_info = {}
+        for row in rows:
+            info = {}
+            for column, key in CAT_COLUMNS:
+                value = row.get(column)
+                info[key] = _number(value) if key in _NUMERIC else value
+            self.index_info[info.pop('name')] = info
+        self._fill_from_settings()
+        self.loggit.debug('All indices: {0}'.format(self.indices))
+
+    def _fill_from_settings(self):
+        """
+        Read the fields ``_cat/indices`` left out from the index settings, for
+        only the indices missing them.
+        """
+        missing = [
+            index for index, info in self.index_info.items()
+            if any(info[key] is None for key in _FROM_SETTINGS)
+        ]
+        if not missing:
+            return
+        self.loggit.debug(
+            'Reading settings of indices missing from _cat: {0}'.format(missing))
+        for chunk in chunk_index_list(sorted(missing)):
+            try:
+                response = self.client.indices.get_settings(
+                    index=','.join(chunk),
+                    params={'expand_wildcards': 'open,closed'},
+                    **api_params('index_inventory_settings')
+                )
+            except Exception as err:
+                raise FailedExecution(
+                    'Failed to read index settings. Error: {0}'.format(err))
+            for index, data in response.items():
+                settings = data['settings']['index']
+                info = self.index_info[index]
+                for key, setting in _FROM_SETTINGS.items():
+                    if info[key] is None:
+                        info[key] = _number(settings.get(setting))
+
+    def filter(self, **kwargs):
+        """
+        Return the names of the indices whose metadata matches every keyword
+        argument, e.g. ``filter(state='close')``.
+
+        :rtype: list
+        """
+        return [
+            index for index in self.indices
+            if all(self.index_info[index].get(k) == v for k, v in kwargs.items())
+        ]
@@ -0,0 +1,259 @@
+"""Predictive rollover scheduling"""
+import json
+import logging
+import os
+import time
+from curator_api.actions.rollover import (
+    RolloverGroup, condition_values, evaluate_conditions, write_index_stats
+)
+from curator_api.exceptions import FailedExecution
+from curator_api.helpers.alias import get_alias_map
+from curator_api.helpers.utils import parse_byte_size, parse_time
+
+logger = logging.getLogger(__name__)
+
+# The position in a sample of the stat each growing condition is measured by
+_GROWTH = {'max_docs': 1, 'max_size': 2}
+
+def seconds_until(conditions, samples, creation_date=None, now=None):
+    """
+    Estimate the number of seconds until the first of `conditions` is met,
+    from `samples` of a write index taken over time.  ``max_docs`` and
+    ``max_size`` are extrapolated at the rate they grew from the first to
+    the last sample, and ``max_age`` is read off `creation_date`.  Return
+    `None` if no condition can be estimated, e.g. with fewer than two
+    samples and no ``max_age``.
+
+    :arg conditions: A dictionary of conditions, as for
+        :class:`curator_api.actions.rollover.Rollover`
+    :arg samples: A list of ``[time, docs, size_in_bytes]`` lists, oldest
+        first
+    :arg creation_date: The creation date of the index, in epoch seconds
+    :arg now: The epoch time to estimate from, or `None` for now
+    :rtype: float
+    """
+    now = time.time() if now is None else now
+    estimates = []
+    for name, limit in condition_values(conditions).items():
+        try:
+            if name == 'max_age':
+                if creation_date is not None:
+                    estimates.append(creation_date + parse_time(limit) - now)
+                continue
+            if name not in _GROWTH or len(samples) < 2:
+                continue
+            limit = int(limit) if name == 'max_docs' else parse_byte_size(limit)
+        except ValueError as err:
+            logger.debug('Unable to estimate {0}: {1}'.format(name, err))
+            continue
+        column = _GROWTH[name]
+        first, last = samples[0], samples[-1]
+        elapsed = last[0] - first[0]
+        growth = last[column] - first[column]
+        if elapsed <= 0 or growth <= 0:
+            continue
+        rate = float(growth) / elapsed
+        estimates.append((limit - last[column]) / rate - (now - last[0]))
+    return min(estimates) if estimates else None
+
+class RolloverScheduler(object):
+    """
+    Check rollover conditions only when they may be met, instead of on every
+    run of a fixed schedule.
+
+    Each :py:meth:`run` takes the stats of the write index of every alias
+    which is due, records its document count and size in a small JSON
+    state file, and rolls over those aliases which meet, or are within
+    `margin` of, a condition, with a :class:`RolloverGroup`.  The next check
+    of each alias is then set from the rate its write index grew across
+    checks, by :py:func:`seconds_until`, somewhat early by `margin`, and
+    kept between `min_interval` and `max_interval`.
+
+    Run it as often as `min_interval`, e.g. from cron.  Aliases which are not
+    due cost no API calls.
+    """
+    def __init__(
+            self, client, conditions, state_file, margin=0.1, min_interval=300,
+            max_interval=86400, max_samples=10, **kwargs
+        ):
+        """
+        :arg client: An :class:`elasticsearch.Elasticsearch` client object
+        :arg conditions: A dictionary of conditions, as for
+            :class:`curator_api.actions.rollover.Rollover`
+        :arg state_file: The path of the JSON state file
+        :arg margin: The fraction of each condition's limit within which an
+            alias is rolled over, and by which the next check is brought
+            forward
+        :arg min_interval: The fewest seconds between checks of an alias
+        :arg max_interval: The most seconds between checks of an alias
+        :arg max_samples: The number of samples kept for each alias
+        :arg kwargs: Passed to :class:`RolloverGroup`, e.g. `extra_settings`
+            or `max_workers`
+        """
+        #: Instance variable.
+        #: The Elasticsearch Client object
+        self.client = client
+        #: Instance variable.
+        #: The rollover conditions
+        self.conditions = conditions
+        #: Instance variable.
+        #: The path of the JSON state file
+        self.state_file = state_file
+        #: Instance variable.
+        #: The fraction of each limit used as a safety margin
+        self.margin = margin
+        #: Instance variable.
+        #: The fewest seconds between checks of an alias
+        self.min_interval = min_interval
+        #: Instance variable.
+        #: The most seconds between checks of an alias
+        self.max_interval = max_interval
+        #: Instance variable.
+        #: The number of samples kept for each alias
+        self.max_samples = max_samples
+        #: Instance variable.
+        #: Keyword arguments for :class:`RolloverGroup`
+        self.group_kwargs = kwargs
+        #: Instance variable.
+        #: A dictionary of alias name to a dictionary of its write ``index``,
+        #: that index's ``samples`` and the epoch time of its ``next_check``
+        self.state = self._load()
+        #: Instance variable.
+        #: The :class:`RolloverGroup` of the last :py:meth:`run`, if any
+        self.group = None
+
+    def _load(self):
+        """Return the state read from :attr:`state_file`, or an empty one"""
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r') as handle:
+                state = json.load(handle)
+        except (IOError, ValueError) as err:
+            logger.warning(
+                'Unable to read rollover state file {0}, starting over. '
+                'Error: {1}'.format(self.state_file, err))
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def save(self):
+        """Write :attr:`state` to :attr:`state_file`."""
+        temporary = '{0}.tmp'.format(self.state_file)
+        try:
+            with open(temporary, 'w') as handle:
+                json.dump(self.state, handle, sort_keys=True)
+            # Replace the old state in one step, so it is never half written
+            getattr(os, 'replace', os.rename)(temporary, self.state_file)
+        except (IOError, OSError) as err:
+            raise FailedExecution(
+                'Unable to write rollover state file {0}. Error: {1}'.format(
+                    self.state_file, err))
+
+    def due(self, aliases, now=None):
+        """
+        Return those of `aliases` whose next check is due, or which have
+        never been checked.
+
+        :arg aliases: A list of alias names
+        :arg now: The epoch time, or `None` for now
+        :rtype: list
+        """
+        now = time.time() if now is None else now
+        return [
+            alias for alias in aliases
+            if self.state.get(alias, {}).get('next_check', 0) <= now
+        ]
+
+    def _record(self, alias, index, stats, now):
+        """Add a sample of `index` to the state of `alias`"""
+        entry = self.state.get(alias)
+        if not entry or entry.get('index') != index:
+            entry = {'index': index, 'samples': []}
+            self.state[alias] = entry
+        if 'docs' in stats and 'size_in_bytes' in stats:
+            entry['samples'].append([now, stats['docs'], stats['size_in_bytes']])
+            del entry['samples'][:-self.max_samples]
+        return entry
+
+    def _schedule(self, entry, creation_date, now):
+        """Set the next check of `entry`, and return it"""
+        estimate = seconds_until(
+            self.conditions, entry['samples'], creation_date, now)
+        if estimate is None:
+            wait = self.min_interval
+        else:
+            wait = estimate * (1 - self.margin)
+        wait = max(self.min_interval, min(self.max_interval, wait))
+        entry['next_check'] = now + wait
+        return entry['next_check']
+
+    def run(self, aliases, dry_run=False, now=None):
+        """
+        Check the aliases in `aliases` which are due, roll over those which
+        meet or nearly meet a condition, schedule their next checks, and save
+        the state.  Return a dictionary of each alias checked to the epoch
+        time of its next check.
+
+        :arg aliases: A list of alias names
+        :arg dry_run: Only test the rollover conditions of the aliases which
+            nearly meet them, and do not save the state.
+        :arg now: The epoch time, or `None` for now
+        :rtype: dict
+        """
+        now = time.time() if now is None else now
+        due = self.due(aliases, now)
+        self.group = None
+        if not due:
+            logger.debug('No rollover checks are due')
+            return {}
+        alias_map = get_alias_map(self.client)
+        write_indices = {}
+        for alias in due:
+            indices = alias_map.indices_of(alias)
+            if len(indices) == 1:
+                write_indices[alias] = indices[0]
+        stats = {}
+        if write_indices:
+            stats = write_index_stats(
+                self.client, sorted(set(write_indices.values())))
+        send = []
+        scheduled = {}
+        for alias in due:
+            if alias not in write_indices:
+                # Let RolloverGroup report why it can not be rolled over
+                send.append(alias)
+                continue
+            index = write_indices[alias]
+            entry = self._record(alias, index, stats[index], now)
+            scheduled[alias] = self._schedule(
+                entry, stats[index].get('creation_date'), now)
+            if evaluate_conditions(
+                    self.conditions, stats[index], self.margin, now) != 'far':
+                send.append(alias)
+        logger.info('Checked {0} of {1} aliases, {2} may roll over'.format(
+            len(due), len(aliases), len(send)))
+        try:
+            if send:
+                self.group = RolloverGroup(
+                    self.client, send, self.conditions, **self.group_kwargs)
+                if dry_run:
+                    self.group.do_dry_run()
+                else:
+                    self.group.do_action()
+        finally:
+            if self.group is not None:
+                for result in self.group.results:
+                    alias = result['alias']
+                    if result['rolled_over']:
+                        # Start learning the new write index
+                        self.state[alias] = {
+                            'index': result['new_index'], 'samples': [],
+                            'next_check': now + self.min_interval,
+                        }
+                    elif result['error'] is not None:
+                        self.state.setdefault(alias, {'samples': []})
+                        self.state[alias]['next_check'] = now + self.min_interval
+                    scheduled[alias] = self.state[alias]['next_check']
+            if not dry_run:
+                self.save()
+        return scheduled
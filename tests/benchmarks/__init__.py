@@ -0,0 +1,4 @@
+"""
+Benchmarks.  These are not collected by the test runner; run them directly,
+e.g. ``python -m tests.benchmarks.serializer``
+"""
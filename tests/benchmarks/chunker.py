@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""
+Benchmark chunking index lists of 10k to 1M names with
+:py:func:`curator_api.helpers.index.chunk_index_list`, and check that every
+chunk fits its budget.
+"""
+from __future__ import print_function
+
+import sys
+import timeit
+from curator_api.helpers.index import chunk_index_list, url_length
+
+SIZES = [10000, 100000, 1000000]
+BUDGETS = [3072, 15360]
+REPEAT = 3
+
+def index_name(num):
+    return 'logs-app{0}-2018.{1:02d}.{2:02d}-{3}'.format(
+        num % 50, num % 12 + 1, num % 28 + 1, num)
+
+def check(indices, chunks, budget):
+    assert [index for chunk in chunks for index in chunk] == indices
+    for chunk in chunks:
+        size = sum(url_length(index) for index in chunk) + len(chunk) - 1
+        assert size <= budget or len(chunk) == 1
+
+def main(sizes):
+    for size in sizes:
+        indices = [index_name(i) for i in range(size)]
+        for budget in BUDGETS:
+            best = min(timeit.repeat(
+                lambda: chunk_index_list(indices, max_bytes=budget),
+                number=1, repeat=REPEAT
+            ))
+            chunks = chunk_index_list(indices, max_bytes=budget)
+            check(indices, chunks, budget)
+            print('{0:8d} names  {1:6d} bytes  {2:6d} chunks  {3:8.3f}s'.format(
+                size, budget, len(chunks), best))
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
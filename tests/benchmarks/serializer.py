@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Benchmark decoding large metadata responses with each available serializer.
+
+Pass the paths of recorded responses (e.g. saved with
+``curl 'localhost:9200/_all/_settings?expand_wildcards=open,closed'``) to time
+those, or run without arguments to time generated responses shaped like
+``get_settings(index='_all')``, ``cluster.state`` and ``snapshot.get`` on a
+large cluster.
+"""
+from __future__ import print_function
+
+import json
+import sys
+import timeit
+from elasticsearch.serializer import JSONSerializer
+from curator_api.helpers.serializer import OrjsonSerializer, orjson
+
+INDICES = 20000
+SNAPSHOTS = 2000
+REPEAT = 3
+
+def index_name(num):
+    return 'logs-app{0}-2018.{1:02d}.{2:02d}'.format(num % 50, num % 12 + 1, num % 28 + 1)
+
+def settings_response():
+    return dict(
+        (index_name(i) + '-{0}'.format(i), {'settings': {'index': {
+            'creation_date': str(1514764800000 + i),
+            'number_of_shards': '5',
+            'number_of_replicas': '1',
+            'uuid': 'Vd8sZyKNQ4O9uAzU{0:06d}'.format(i),
+            'version': {'created': '6050199'},
+            'provided_name': index_name(i),
+            'routing': {'allocation': {'require': {'box_type': 'hot'}}},
+        }}})
+        for i in range(INDICES)
+    )
+
+def state_response():
+    return {'metadata': {'indices': dict(
+        (index_name(i) + '-{0}'.format(i), {
+            'state': 'open',
+            'settings': {'index': {'number_of_shards': '5', 'number_of_replicas': '1'}},
+            'aliases': ['logs'],
+            'mappings': {'doc': {'properties': {
+                'message': {'type': 'text'},
+                '@timestamp': {'type': 'date'},
+                'host': {'type': 'keyword'},
+            }}},
+        })
+        for i in range(INDICES)
+    )}}
+
+def snapshot_response():
+    return {'snapshots': [
+        {
+            'snapshot': 'curator-{0:06d}'.format(i),
+            'uuid': 'dKb54xw67gvdRctLCxSket{0:04d}'.format(i),
+            'state': 'SUCCESS',
+            'start_time_in_millis': 1514764800000 + i * 3600000,
+            'end_time_in_millis': 1514764900000 + i * 3600000,
+            'indices': [index_name(i + j) for j in range(50)],
+            'shards': {'total': 250, 'failed': 0, 'successful': 250},
+        }
+        for i in range(SNAPSHOTS)
+    ]}
+
+def responses(paths):
+    if paths:
+        for path in paths:
+            with open(path, 'r') as f:
+                yield path, f.read()
+    else:
+        yield 'get_settings(_all)', json.dumps(settings_response())
+        yield 'cluster.state', json.dumps(state_response())
+        yield 'snapshot.get(_all)', json.dumps(snapshot_response())
+
+def main(paths):
+    serializers = [('json', JSONSerializer())]
+    if orjson is None:
+        print('orjson is not installed; only timing the json module.')
+    else:
+        serializers.append(('orjson', OrjsonSerializer()))
+    for name, body in responses(paths):
+        print('{0} ({1:.1f} MB)'.format(name, len(body) / 1048576.0))
+        baseline = None
+        for label, serializer in serializers:
+            best = min(timeit.repeat(
+                lambda: serializer.loads(body), number=1, repeat=REPEAT))
+            baseline = baseline or best
+            print('  {0:8s} {1:8.3f}s  {2:5.1f}x'.format(label, best, baseline / best))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,157 @@
+"""
+Test asyncio helper functions, and the async versions of the actions.
+
+These need `AsyncMock`, from Python 3.8+, so :mod:`tests.unit.test_async`
+only imports them there.
+"""
+# pylint: disable=C0103,C0111
+import asyncio
+from unittest import TestCase
+from mock import AsyncMock, Mock
+from curator_api.actions import Alias, Rollover
+from curator_api.exceptions import (
+    ActionTimeout, FailedExecution, MissingArgument, NoIndices
+)
+from curator_api.helpers.aio import (
+    async_get_indices, async_get_version, async_health_check, async_wait_for_it
+)
+from . import testvars as testvars
+
+def run_async(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+class TestAsyncGetVersion(TestCase):
+    def test_positive(self):
+        client = Mock()
+        client.info = AsyncMock(return_value={'version': {'number': '9.9.9-dev'}})
+        self.assertEqual((9, 9, 9), run_async(async_get_version(client)))
+
+class TestAsyncGetIndices(TestCase):
+    def test_positive(self):
+        client = Mock()
+        client.info = AsyncMock(return_value={'version': {'number': '6.5.0'}})
+        client.indices.get_settings = AsyncMock(return_value=testvars.settings_two)
+        self.assertEqual(
+            ['index-2016.03.03', 'index-2016.03.04'],
+            sorted(run_async(async_get_indices(client))))
+        client.indices.get_settings.assert_awaited_once_with(
+            index='_all', params={'expand_wildcards': 'open,closed'},
+            name='index.uuid')
+    def test_client_exception(self):
+        client = Mock()
+        client.indices.get_settings = AsyncMock(side_effect=testvars.fake_fail)
+        self.assertRaises(FailedExecution, run_async, async_get_indices(client))
+
+class TestAsyncHealthCheck(TestCase):
+    def test_no_kwargs(self):
+        client = Mock()
+        self.assertRaises(MissingArgument, run_async, async_health_check(client))
+    def test_key_value_match(self):
+        client = Mock()
+        client.cluster.health = AsyncMock(return_value=testvars.cluster_health)
+        self.assertTrue(run_async(async_health_check(client, status='green')))
+    def test_key_value_no_match(self):
+        client = Mock()
+        client.cluster.health = AsyncMock(return_value=testvars.cluster_health)
+        self.assertFalse(run_async(async_health_check(client, status='red')))
+
+class TestAsyncWaitForIt(TestCase):
+    def test_health_wait(self):
+        client = Mock()
+        client.cluster.health = AsyncMock(return_value=testvars.cluster_health)
+        self.assertIsNone(run_async(async_wait_for_it(client, 'replicas')))
+    def test_max_wait(self):
+        client = Mock()
+        client.cluster.health = AsyncMock(return_value={'status': 'red'})
+        self.assertRaises(
+            ActionTimeout, run_async,
+            async_wait_for_it(client, 'replicas', wait_interval=0, max_wait=0)
+        )
+    def test_reindex_missing_task_id(self):
+        client = Mock()
+        self.assertRaises(
+            MissingArgument, run_async, async_wait_for_it(client, 'reindex'))
+
+class AsyncElasticsearch(Mock):
+    """Stand-in for an asyncio client, which is identified by class name"""
+
+ALIAS = 'testalias'
+IDX1 = 'my_index'
+IDX2 = 'dummy'
+
+class TestActionAliasAsync(TestCase):
+    def test_do_action_async(self):
+        client = AsyncElasticsearch()
+        client.indices.update_aliases = AsyncMock(return_value=testvars.alias_success)
+        _ = Alias(client, name=ALIAS)
+        _.add([IDX1, IDX2])
+        self.assertIsNone(run_async(_.do_action_async()))
+        client.indices.update_aliases.assert_awaited_once_with(body=_.body())
+    def test_do_action_async_raises_exception(self):
+        client = AsyncElasticsearch()
+        client.indices.update_aliases = AsyncMock(side_effect=testvars.four_oh_one)
+        _ = Alias(client, name=ALIAS)
+        _.add([IDX1, IDX2])
+        self.assertRaises(FailedExecution, run_async, _.do_action_async())
+    def test_remove_awaits_rows(self):
+        client = AsyncElasticsearch()
+        client.cat.aliases = AsyncMock(return_value=[
+            {'alias': ALIAS, 'index': IDX1, 'filter': '-',
+             'routing.index': '-', 'routing.search': '-'},
+        ])
+        client.indices.update_aliases = AsyncMock(return_value=testvars.alias_success)
+        _ = Alias(client, name=ALIAS)
+        _.remove([IDX1, IDX2])
+        client.cat.aliases.assert_not_called()
+        self.assertIsNone(run_async(_.do_action_async()))
+        client.cat.aliases.assert_awaited_once()
+        client.indices.update_aliases.assert_awaited_once_with(
+            body={'actions': [{'remove': {'index': IDX1, 'alias': ALIAS}}]})
+        self.assertEqual(1, _.skipped)
+    def test_remove_not_in_alias(self):
+        client = AsyncElasticsearch()
+        client.cat.aliases = AsyncMock(side_effect=testvars.get_alias_fail)
+        client.indices.update_aliases = AsyncMock()
+        _ = Alias(client, name=ALIAS)
+        _.remove([IDX1])
+        self.assertRaises(NoIndices, run_async, _.do_action_async())
+        client.indices.update_aliases.assert_not_awaited()
+    def test_remove_read_fails(self):
+        client = AsyncElasticsearch()
+        client.cat.aliases = AsyncMock(side_effect=testvars.fake_fail)
+        client.indices.update_aliases = AsyncMock()
+        _ = Alias(client, name=ALIAS)
+        _.remove([IDX1])
+        self.assertRaises(FailedExecution, run_async, _.do_action_async())
+        client.indices.update_aliases.assert_not_awaited()
+
+class TestActionRolloverAsync(TestCase):
+    def test_init_makes_no_calls(self):
+        client = AsyncElasticsearch()
+        Rollover(client, testvars.named_alias, testvars.rollover_conditions)
+        client.indices.get_alias.assert_not_called()
+    def test_do_action_async(self):
+        client = AsyncElasticsearch()
+        client.info = AsyncMock(return_value={'version': {'number': '6.1.0'}})
+        client.indices.get_alias = AsyncMock(return_value=testvars.rollable_alias)
+        client.indices.rollover = AsyncMock(return_value=testvars.dry_run_rollover)
+        ro = Rollover(client, testvars.named_alias, testvars.rollover_conditions)
+        self.assertIsNone(run_async(ro.do_action_async()))
+        client.indices.rollover.assert_awaited_once()
+    def test_do_action_async_raise_non_rollable_index(self):
+        client = AsyncElasticsearch()
+        client.indices.get_alias = AsyncMock(return_value=testvars.alias_retval)
+        client.indices.rollover = AsyncMock()
+        ro = Rollover(client, testvars.named_alias, testvars.rollover_conditions)
+        self.assertRaises(ValueError, run_async, ro.do_action_async())
+        client.indices.rollover.assert_not_awaited()
+    def test_do_action_async_raises_exception(self):
+        client = AsyncElasticsearch()
+        client.indices.get_alias = AsyncMock(return_value=testvars.rollable_alias)
+        client.indices.rollover = AsyncMock(side_effect=testvars.four_oh_one)
+        ro = Rollover(client, testvars.named_alias, testvars.rollover_conditions)
+        self.assertRaises(FailedExecution, run_async, ro.do_action_async())
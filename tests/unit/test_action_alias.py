@@ -3,8 +3,9 @@
 from unittest import TestCase
 from mock import Mock, patch
 import elasticsearch
-from curator_api.actions import Alias
+from curator_api.actions import Alias, AliasBatch
 from curator_api.exceptions import ActionError, FailedExecution, NoIndices
+from curator_api.helpers.alias import get_alias_map
 # Get test variables and constants from a single source
 from . import testvars as testvars
 
@@ -28,6 +29,7 @@ class TestActionAlias(TestCase):
         self.assertRaises(NoIndices, _.body)
     def test_do_action_raises_exception(self):
         client = Mock()
+        client.cat.aliases.return_value = []
         # client.indices.get_settings.return_value = testvars.settings_one
         # client.cluster.state.return_value = testvars.clu_state_one
         # client.indices.stats.return_value = testvars.stats_one
@@ -36,6 +38,25 @@ class TestActionAlias(TestCase):
         _ = Alias(client, name=ALIAS)
         _.add([IDX1, IDX2])
         self.assertRaises(FailedExecution, _.do_action)
+    def test_remove_reads_only_this_alias(self):
+        client = Mock()
+        client.cat.aliases.return_value = [
+            {'alias': ALIAS, 'index': IDX1},
+            {'alias': 'other', 'index': IDX2},
+        ]
+        _ = Alias(client, name=ALIAS)
+        _.remove([IDX1, IDX2])
+        _.remove([IDX1])
+        self.assertEqual(
+            [{'remove': {'index': IDX1, 'alias': ALIAS}}] * 2, _.actions)
+        client.cat.aliases.assert_called_once_with(
+            name=ALIAS, format='json',
+            h='alias,index,filter,routing.index,routing.search')
+        client.indices.get_alias.assert_not_called()
+        # Updating aliases reads the alias again
+        _.do_action()
+        _.remove([IDX1])
+        self.assertEqual(2, client.cat.aliases.call_count)
 
     # def test_add_raises_on_invalid_parameter(self):
     #     client = Mock()
@@ -158,3 +179,157 @@ class TestActionAlias(TestCase):
     #     ao = curator_api.Alias(name='alias')
     #     ao.add(_)
     #     self.assertRaises(curator_api.FailedExecution, ao.do_action)
+
+class TestActionAliasBatch(TestCase):
+    def batch(self, client, max_actions=1000):
+        batch = AliasBatch(client, max_actions=max_actions)
+        batch.add('alias-a', ['index-1', 'index-2'])
+        batch.add('alias-b', ['index-3'], extra_settings={'routing': '1'})
+        batch.add('alias-c', ['index-4', 'index-5', 'index-6'])
+        return batch
+    def test_one_call(self):
+        client = Mock()
+        client.cat.aliases.return_value = []
+        batch = self.batch(client)
+        batch.do_action()
+        client.indices.update_aliases.assert_called_once()
+        actions = client.indices.update_aliases.call_args[1]['body']['actions']
+        self.assertEqual(6, len(actions))
+        self.assertEqual(
+            {'add': {'index': 'index-3', 'alias': 'alias-b', 'routing': '1'}},
+            actions[2])
+        self.assertEqual(
+            {'added': 3, 'removed': 0, 'skipped': 0, 'error': None},
+            batch.report['alias-c']
+        )
+    def test_size_bounded(self):
+        client = Mock()
+        client.cat.aliases.return_value = []
+        bodies = self.batch(client, max_actions=3).bodies()
+        self.assertEqual(
+            [['alias-a', 'alias-b'], ['alias-c']],
+            [body['aliases'] for body in bodies])
+        bodies = self.batch(client, max_actions=2).bodies()
+        self.assertEqual(
+            [['alias-a'], ['alias-b'], ['alias-c'], ['alias-c']],
+            [body['aliases'] for body in bodies])
+        self.assertEqual([2, 1, 2, 1], [len(body['actions']) for body in bodies])
+    def test_failure_report(self):
+        client = Mock()
+        client.cat.aliases.return_value = []
+        client.indices.update_aliases.side_effect = [
+            testvars.alias_success, testvars.four_oh_one]
+        batch = self.batch(client, max_actions=3)
+        self.assertRaises(FailedExecution, batch.do_action)
+        self.assertEqual(2, client.indices.update_aliases.call_count)
+        self.assertIsNone(batch.report['alias-b']['error'])
+        self.assertIsNotNone(batch.report['alias-c']['error'])
+        # Only the actions of the call which succeeded are counted
+        self.assertEqual(2, batch.report['alias-a']['added'])
+        self.assertEqual(0, batch.report['alias-c']['added'])
+        self.assertEqual(1, len(batch.failed_bodies))
+        self.assertEqual(['alias-c'], batch.failed_bodies[0]['aliases'])
+        self.assertEqual(3, len(batch.failed_bodies[0]['actions']))
+        self.assertIs(testvars.four_oh_one, batch.failed_bodies[0]['error'])
+    def test_failure_part_of_alias(self):
+        client = Mock()
+        client.cat.aliases.return_value = []
+        client.indices.update_aliases.side_effect = [
+            testvars.alias_success, testvars.alias_success,
+            testvars.alias_success, testvars.four_oh_one]
+        batch = self.batch(client, max_actions=2)
+        self.assertRaises(FailedExecution, batch.do_action)
+        self.assertEqual(2, batch.report['alias-c']['added'])
+        self.assertIsNotNone(batch.report['alias-c']['error'])
+        self.assertEqual(
+            [{'add': {'index': 'index-6', 'alias': 'alias-c'}}],
+            batch.failed_bodies[0]['actions'])
+    def test_remove_and_dry_run(self):
+        client = Mock()
+        client.cat.aliases.return_value = [{'alias': 'alias-a', 'index': IDX1}]
+        batch = AliasBatch(client)
+        batch.remove('alias-a', [IDX1])
+        batch.append(Alias(client, 'alias-b'))
+        with patch.object(batch.loggit, 'info') as mock_info:
+            batch.do_dry_run()
+        mock_info.assert_any_call(
+            'DRY-RUN: alias: removing index "my_index" from alias "alias-a"')
+        client.indices.update_aliases.assert_not_called()
+    def test_empty(self):
+        self.assertRaises(NoIndices, AliasBatch(Mock()).do_action)
+
+class TestActionAliasDiff(TestCase):
+    def client(self, rows, definitions=None):
+        client = Mock()
+        client.cat.aliases.return_value = rows
+        client.indices.get_alias.return_value = definitions or {}
+        return client
+    def test_skips_existing(self):
+        client = self.client([{'alias': ALIAS, 'index': IDX1, 'filter': '-',
+                               'routing.index': '-', 'routing.search': '-'}])
+        _ = Alias(client, ALIAS)
+        _.add([IDX1, IDX2])
+        self.assertEqual([{'add': {'index': IDX2, 'alias': ALIAS}}], _.actions)
+        self.assertEqual(1, _.skipped)
+        client.indices.get_alias.assert_not_called()
+    def test_routing_differs(self):
+        client = self.client([{'alias': ALIAS, 'index': IDX1, 'filter': '-',
+                               'routing.index': '1', 'routing.search': '1'}])
+        _ = Alias(client, ALIAS, extra_settings={'routing': 1})
+        _.add([IDX1])
+        self.assertEqual(1, _.skipped)
+        _ = Alias(client, ALIAS, extra_settings={'routing': '2'})
+        _.add([IDX1])
+        self.assertEqual(0, _.skipped)
+        _ = Alias(client, ALIAS)
+        _.add([IDX1])
+        self.assertEqual(0, _.skipped)
+    def test_filter_compared(self):
+        term = {'term': {'user': 'kimchy'}}
+        client = self.client(
+            [{'alias': ALIAS, 'index': IDX1, 'filter': '*'},
+             {'alias': ALIAS, 'index': IDX2, 'filter': '*'}],
+            {IDX1: {'aliases': {ALIAS: {'filter': term}}},
+             IDX2: {'aliases': {ALIAS: {'filter': {'term': {'user': 'x'}}}}}}
+        )
+        _ = Alias(client, ALIAS, extra_settings={'filter': term})
+        _.add([IDX1, IDX2])
+        self.assertEqual([IDX2], [item['add']['index'] for item in _.actions])
+        self.assertEqual(1, _.skipped)
+        client.indices.get_alias.assert_called_once_with(
+            index='my_index,dummy', name=ALIAS)
+        # No filter now, so the filter on the alias must go
+        _ = Alias(client, ALIAS)
+        _.add([IDX1])
+        self.assertEqual(0, _.skipped)
+    def test_not_diffed_against_stale_shared_map(self):
+        client = self.client([{'alias': ALIAS, 'index': IDX1, 'filter': '-',
+                               'routing.index': '-', 'routing.search': '-'}])
+        get_alias_map(client)
+        # Someone else removes the alias
+        client.cat.aliases.return_value = []
+        _ = Alias(client, ALIAS)
+        _.add([IDX1])
+        self.assertEqual([{'add': {'index': IDX1, 'alias': ALIAS}}], _.actions)
+        self.assertEqual(0, _.skipped)
+    def test_missing_alias(self):
+        client = Mock()
+        client.cat.aliases.side_effect = testvars.get_alias_fail
+        _ = Alias(client, ALIAS)
+        _.add([IDX1])
+        _.remove([IDX2])
+        self.assertEqual([{'add': {'index': IDX1, 'alias': ALIAS}}], _.actions)
+        self.assertEqual(1, _.skipped)
+    def test_all_done(self):
+        client = self.client([{'alias': ALIAS, 'index': IDX1}])
+        _ = Alias(client, ALIAS)
+        _.add([IDX1])
+        _.remove([IDX2])
+        self.assertEqual(2, _.skipped)
+        self.assertRaises(NoIndices, _.body)
+        batch = AliasBatch(client)
+        batch.append(_)
+        batch.add('other', [IDX2])
+        batch.do_action()
+        self.assertEqual(2, batch.report[ALIAS]['skipped'])
+        self.assertEqual(1, batch.report['other']['added'])
@@ -1,34 +1,145 @@
-# from unittest import TestCase
-# from mock import Mock, patch
-# import elasticsearch
-# import curator
-# # Get test variables and constants from a single source
-# from . import testvars as testvars
+"""Test Create Index Action"""
+# pylint: disable=C0103,C0111
+from datetime import datetime
+from unittest import TestCase
+from mock import Mock
+import elasticsearch
+from curator_api.actions import BulkCreateIndex, CreateIndex
+from curator_api.exceptions import (
+    ActionTimeout, ConfigurationError, FailedExecution
+)
+from curator_api.helpers.alias import get_alias_map
+# Get test variables and constants from a single source
+from . import testvars as testvars
 
-# class TestActionCreate_index(TestCase):
-#     def test_init_raise(self):
-#         self.assertRaises(TypeError, curator.CreateIndex, 'invalid')
-#     def test_init_raise_no_name(self):
-#         client = Mock()
-#         self.assertRaises(curator.ConfigurationError,
-#             curator.CreateIndex, client, None)
-#     def test_init(self):
-#         client = Mock()
-#         co = curator.CreateIndex(client, 'name')
-#         self.assertEqual('name', co.name)
-#         self.assertEqual(client, co.client)
-#     def test_do_dry_run(self):
-#         client = Mock()
-#         co = curator.CreateIndex(client, 'name')
-#         self.assertIsNone(co.do_dry_run())
-#     def test_do_action(self):
-#         client = Mock()
-#         client.indices.create.return_value = None
-#         co = curator.CreateIndex(client, 'name')
-#         self.assertIsNone(co.do_action())
-#     def test_do_action_raises_exception(self):
-#         client = Mock()
-#         client.indices.create.return_value = None
-#         client.indices.create.side_effect = testvars.fake_fail
-#         co = curator.CreateIndex(client, 'name')
-#         self.assertRaises(curator.FailedExecution, co.do_action)
+START = datetime(2017, 1, 30, 12)
+
+class TestActionCreate_index(TestCase):
+    def test_init_raise_no_name(self):
+        client = Mock()
+        self.assertRaises(ConfigurationError, CreateIndex, client, None)
+    def test_init(self):
+        client = Mock()
+        co = CreateIndex(client, 'name')
+        self.assertEqual('name', co.name)
+        self.assertEqual(client, co.client)
+    def test_do_dry_run(self):
+        client = Mock()
+        co = CreateIndex(client, 'name')
+        self.assertIsNone(co.do_dry_run())
+    def test_do_action(self):
+        client = Mock()
+        client.indices.create.return_value = None
+        co = CreateIndex(client, 'name')
+        self.assertIsNone(co.do_action())
+    def test_do_action_raises_exception(self):
+        client = Mock()
+        client.indices.create.return_value = None
+        client.indices.create.side_effect = testvars.fake_fail
+        co = CreateIndex(client, 'name')
+        self.assertRaises(FailedExecution, co.do_action)
+    def test_do_action_invalidates_alias_map(self):
+        client = Mock()
+        client.cat.aliases.return_value = []
+        alias_map = get_alias_map(client)
+        CreateIndex(client, 'name', {'aliases': {'logs': {}}}).do_action()
+        self.assertIsNot(alias_map, get_alias_map(client))
+
+class TestActionBulkCreateIndex(TestCase):
+    def client(self, existing=()):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '6.8.0'}}
+        client.indices.get_settings.return_value = dict(
+            (name, {}) for name in existing)
+        client.cat.aliases.return_value = []
+        client.cluster.health.return_value = {'timed_out': False}
+        return client
+    def test_names(self):
+        bulk = BulkCreateIndex(
+            self.client(), 'logs-%Y.%m.%d', 4, start=START)
+        self.assertEqual(
+            ['logs-2017.01.30', 'logs-2017.01.31', 'logs-2017.02.01',
+             'logs-2017.02.02'],
+            bulk.names
+        )
+        self.assertRaises(
+            ConfigurationError, BulkCreateIndex, Mock(), None, 4)
+    def test_do_action(self):
+        client = self.client(existing=['logs-2017.01.30'])
+        bulk = BulkCreateIndex(
+            client, 'logs-%Y.%m.%d', 3, start=START, extra_settings={'a': 'b'})
+        bulk.do_action()
+        self.assertEqual(['logs-2017.01.30'], bulk.existing)
+        self.assertEqual(['logs-2017.01.31', 'logs-2017.02.01'], bulk.created)
+        self.assertEqual(2, client.indices.create.call_count)
+        client.indices.create.assert_any_call(
+            index='logs-2017.02.01', body={'a': 'b'}, wait_for_active_shards=0)
+        # One existence check, and one health wait for the batch
+        client.indices.get_settings.assert_called_once()
+        client.cluster.health.assert_called_once_with(
+            index='logs-2017.01.31,logs-2017.02.01', timeout='30s',
+            wait_for_status='yellow'
+        )
+    def test_wait_for_shard_count(self):
+        client = self.client()
+        bulk = BulkCreateIndex(
+            client, 'logs-%Y.%m.%d', 2, start=START, wait_for_active_shards=2)
+        bulk.do_action()
+        client.indices.get_settings.return_value = {
+            'logs-2017.01.30': {'settings': {'index': {'number_of_shards': '3'}}},
+            'logs-2017.01.31': {'settings': {'index': {'number_of_shards': '1'}}},
+        }
+        self.assertEqual(
+            8, bulk._health_request(bulk.created)['wait_for_active_shards'])
+        bulk.wait_for_active_shards = 'all'
+        self.assertEqual(
+            'green', bulk._health_request(bulk.created)['wait_for_status'])
+    def test_no_wait(self):
+        client = self.client()
+        BulkCreateIndex(
+            client, 'logs-%Y.%m.%d', 2, start=START, wait_for_active_shards=None
+        ).do_action()
+        client.cluster.health.assert_not_called()
+    def test_timeout(self):
+        client = self.client()
+        client.cluster.health.return_value = {'timed_out': True}
+        bulk = BulkCreateIndex(client, 'logs-%Y.%m.%d', 2, start=START)
+        self.assertRaises(ActionTimeout, bulk.do_action)
+    def test_timeout_status(self):
+        client = self.client()
+        client.cluster.health.side_effect = elasticsearch.TransportError(
+            408, 'simulated timeout', {'timed_out': True})
+        bulk = BulkCreateIndex(client, 'logs-%Y.%m.%d', 2, start=START)
+        self.assertRaises(ActionTimeout, bulk.do_action)
+    def test_health_error(self):
+        client = self.client()
+        client.cluster.health.side_effect = testvars.four_oh_one
+        bulk = BulkCreateIndex(client, 'logs-%Y.%m.%d', 2, start=START)
+        self.assertRaises(FailedExecution, bulk.do_action)
+    def test_failures(self):
+        client = self.client()
+        def create(index, **kwargs):
+            if index == 'logs-2017.01.31':
+                raise testvars.fake_fail
+        client.indices.create.side_effect = create
+        bulk = BulkCreateIndex(client, 'logs-%Y.%m.%d', 3, start=START)
+        self.assertRaises(FailedExecution, bulk.do_action)
+        self.assertEqual(['logs-2017.01.31'], list(bulk.failures))
+        self.assertEqual(['logs-2017.01.30', 'logs-2017.02.01'], bulk.created)
+    def test_failures_not_hidden_by_timeout(self):
+        client = self.client()
+        client.cluster.health.return_value = {'timed_out': True}
+        def create(index, **kwargs):
+            if index == 'logs-2017.01.31':
+                raise testvars.fake_fail
+        client.indices.create.side_effect = create
+        bulk = BulkCreateIndex(client, 'logs-%Y.%m.%d', 3, start=START)
+        with self.assertRaises(FailedExecution) as raised:
+            bulk.do_action()
+        self.assertIn('logs-2017.01.31', str(raised.exception))
+        self.assertIn('Timed out', str(raised.exception))
+    def test_do_dry_run(self):
+        client = self.client(existing=['logs-2017.01.30'])
+        bulk = BulkCreateIndex(client, 'logs-%Y.%m.%d', 2, start=START)
+        self.assertIsNone(bulk.do_dry_run())
+        client.indices.create.assert_not_called()
@@ -1,79 +1,162 @@
-# from unittest import TestCase
-# from mock import Mock, patch
-# import elasticsearch
-# import curator
-# # Get test variables and constants from a single source
-# from . import testvars as testvars
+"""Test the IndexDelete action"""
+# pylint: disable=C0103,C0111
+import threading
+import time
+from unittest import TestCase
+from mock import Mock, patch
+from curator_api.actions.delete import IndexDelete
+from curator_api.exceptions import FailedExecution, NoIndices
+from curator_api.helpers.alias import get_alias_map
+from curator_api.helpers.index import resolve_names
+# Get test variables and constants from a single source
+from . import testvars as testvars
 
-# class TestActionDeleteIndices(TestCase):
-#     def test_init_raise(self):
-#         self.assertRaises(TypeError, curator.DeleteIndices, 'invalid')
-#     def test_init_raise_bad_master_timeout(self):
-#         client = Mock()
-#         client.info.return_value = {'version': {'number': '5.0.0'} }
-#         client.indices.get_settings.return_value = testvars.settings_one
-#         client.cluster.state.return_value = testvars.clu_state_one
-#         client.indices.stats.return_value = testvars.stats_one
-#         ilo = curator.IndexList(client)
-#         self.assertRaises(TypeError, curator.DeleteIndices, ilo, 'invalid')
-#     def test_init(self):
-#         client = Mock()
-#         client.info.return_value = {'version': {'number': '5.0.0'} }
-#         client.indices.get_settings.return_value = testvars.settings_one
-#         client.cluster.state.return_value = testvars.clu_state_one
-#         client.indices.stats.return_value = testvars.stats_one
-#         ilo = curator.IndexList(client)
-#         do = curator.DeleteIndices(ilo)
-#         self.assertEqual(ilo, do.index_list)
-#         self.assertEqual(client, do.client)
-#     def test_do_dry_run(self):
-#         client = Mock()
-#         client.info.return_value = {'version': {'number': '5.0.0'} }
-#         client.indices.get_settings.return_value = testvars.settings_four
-#         client.cluster.state.return_value = testvars.clu_state_four
-#         client.indices.stats.return_value = testvars.stats_four
-#         client.indices.delete.return_value = None
-#         ilo = curator.IndexList(client)
-#         do = curator.DeleteIndices(ilo)
-#         self.assertIsNone(do.do_dry_run())
-#     def test_do_action(self):
-#         client = Mock()
-#         client.info.return_value = {'version': {'number': '5.0.0'} }
-#         client.indices.get_settings.return_value = testvars.settings_four
-#         client.cluster.state.return_value = testvars.clu_state_four
-#         client.indices.stats.return_value = testvars.stats_four
-#         client.indices.delete.return_value = None
-#         ilo = curator.IndexList(client)
-#         do = curator.DeleteIndices(ilo)
-#         self.assertIsNone(do.do_action())
-#     def test_do_action_not_successful(self):
-#         client = Mock()
-#         client.info.return_value = {'version': {'number': '5.0.0'} }
-#         client.indices.get_settings.return_value = testvars.settings_four
-#         client.cluster.state.return_value = testvars.clu_state_four
-#         client.indices.stats.return_value = testvars.stats_four
-#         client.indices.delete.return_value = None
-#         ilo = curator.IndexList(client)
-#         do = curator.DeleteIndices(ilo)
-#         self.assertIsNone(do.do_action())
-#     def test_do_action_raises_exception(self):
-#         client = Mock()
-#         client.info.return_value = {'version': {'number': '5.0.0'} }
-#         client.indices.get_settings.return_value = testvars.settings_four
-#         client.cluster.state.return_value = testvars.clu_state_four
-#         client.indices.stats.return_value = testvars.stats_four
-#         client.indices.delete.return_value = None
-#         client.indices.delete.side_effect = testvars.fake_fail
-#         ilo = curator.IndexList(client)
-#         do = curator.DeleteIndices(ilo)
-#         self.assertRaises(curator.FailedExecution, do.do_action)
-#     def test_verify_result_positive(self):
-#         client = Mock()
-#         client.info.return_value = {'version': {'number': '5.0.0'} }
-#         client.indices.get_settings.return_value = testvars.settings_four
-#         client.cluster.state.return_value = testvars.clu_state_four
-#         client.indices.stats.return_value = testvars.stats_four
-#         client.indices.delete.return_value = None
-#         ilo = curator.IndexList(client)
-#         do = curator.DeleteIndices(ilo)
-#         self.assertTrue(do._verify_result([],2))
+INDICES = ['index-2016.03.03', 'index-2016.03.04']
+
+class TestActionDeleteIndices(TestCase):
+    def test_init_raise_bad_master_timeout(self):
+        self.assertRaises(TypeError, IndexDelete, Mock(), INDICES, 'invalid')
+    def test_init(self):
+        client = Mock()
+        do = IndexDelete(client, INDICES)
+        self.assertEqual(INDICES, do.index_list)
+        self.assertEqual(client, do.client)
+        self.assertEqual('30s', do.master_timeout)
+    def test_do_dry_run(self):
+        client = Mock()
+        do = IndexDelete(client, INDICES)
+        self.assertIsNone(do.do_dry_run())
+        client.indices.delete.assert_not_called()
+    def test_do_action(self):
+        client = Mock()
+        client.indices.get_settings.return_value = {}
+        client.indices.delete.return_value = None
+        do = IndexDelete(client, INDICES)
+        self.assertIsNone(do.do_action())
+        client.indices.delete.assert_called_once_with(
+            index='index-2016.03.03,index-2016.03.04', master_timeout='30s')
+        self.assertEqual([], do.survivors)
+    def test_verifies_only_chunk(self):
+        client = Mock()
+        client.indices.get_settings.return_value = {}
+        IndexDelete(client, INDICES).do_action()
+        client.info.assert_not_called()
+        kwargs = client.indices.get_settings.call_args[1]
+        self.assertEqual('index-2016.03.03,index-2016.03.04', kwargs['index'])
+        self.assertEqual('true', kwargs['params']['ignore_unavailable'])
+    def test_do_action_not_successful(self):
+        client = Mock()
+        client.indices.get_settings.return_value = {'index-2016.03.04': {}}
+        client.indices.delete.return_value = None
+        do = IndexDelete(client, INDICES, retry_backoff=0)
+        with patch('curator_api.actions.delete.time.sleep') as mock_sleep:
+            self.assertIsNone(do.do_action())
+        self.assertEqual(3, client.indices.delete.call_count)
+        self.assertEqual(
+            'index-2016.03.04', client.indices.delete.call_args[1]['index'])
+        self.assertEqual(['index-2016.03.04'], do.survivors)
+        self.assertEqual(2, mock_sleep.call_count)
+    def test_retry_backoff(self):
+        client = Mock()
+        client.indices.get_settings.return_value = testvars.settings_two
+        do = IndexDelete(client, INDICES, retry_backoff=2)
+        with patch('curator_api.actions.delete.time.sleep') as mock_sleep:
+            do.do_action()
+        self.assertEqual([((2,),), ((4,),)], mock_sleep.call_args_list)
+    def test_do_action_raises_exception(self):
+        client = Mock()
+        client.indices.delete.side_effect = testvars.fake_fail
+        do = IndexDelete(client, INDICES)
+        self.assertRaises(FailedExecution, do.do_action)
+    def test_isolates_failing_index(self):
+        client = Mock()
+        client.indices.get_settings.return_value = {}
+        def delete(index, **kwargs):
+            if 'index-2016.03.04' in index.split(','):
+                raise testvars.index_closed
+        client.indices.delete.side_effect = delete
+        indices = ['index-2016.03.03', 'index-2016.03.04', 'index-2016.03.05']
+        do = IndexDelete(client, indices)
+        self.assertRaises(FailedExecution, do.do_action)
+        deleted = [
+            c[1]['index'] for c in client.indices.delete.call_args_list][1:]
+        self.assertEqual(
+            [
+                'index-2016.03.03', 'index-2016.03.04,index-2016.03.05',
+                'index-2016.03.04', 'index-2016.03.05',
+            ],
+            deleted
+        )
+        self.assertEqual(['index-2016.03.04'], list(do.failures))
+        self.assertEqual(['index-2016.03.04'], do.remaining)
+    def test_forgets_deleted_names(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '6.8.0'}}
+        client.cat.aliases.return_value = []
+        client.indices.get_settings.return_value = testvars.settings_two
+        self.assertEqual(
+            {'index-2016.03.03': 'index'},
+            resolve_names(client, ['index-2016.03.03']))
+        client.indices.get_settings.return_value = {}
+        IndexDelete(client, INDICES).do_action()
+        self.assertEqual(
+            {'index-2016.03.03': 'missing'},
+            resolve_names(client, ['index-2016.03.03']))
+    def test_invalidates_alias_map(self):
+        client = Mock()
+        client.cat.aliases.return_value = []
+        client.indices.get_settings.return_value = {}
+        alias_map = get_alias_map(client)
+        IndexDelete(client, INDICES).do_action()
+        self.assertIsNot(alias_map, get_alias_map(client))
+    def test_no_bisect_on_auth_error(self):
+        client = Mock()
+        client.indices.get_settings.return_value = {}
+        client.indices.delete.side_effect = testvars.four_oh_one
+        indices = ['index-2016.03.03', 'index-2016.03.04', 'index-2016.03.05']
+        do = IndexDelete(client, indices)
+        with self.assertRaises(FailedExecution) as raised:
+            do.do_action()
+        self.assertEqual(1, client.indices.delete.call_count)
+        self.assertEqual(indices, do.remaining)
+        # The cause is in the message, not only in the log
+        self.assertIn('Failed to delete 3 indices', str(raised.exception))
+        self.assertIn('simulated error', str(raised.exception))
+    def test_blocked_index_isolated(self):
+        client = Mock()
+        client.indices.get_settings.return_value = {}
+        def delete(index, **kwargs):
+            if 'index-2016.03.04' in index.split(','):
+                raise testvars.index_blocked
+        client.indices.delete.side_effect = delete
+        indices = ['index-2016.03.03', 'index-2016.03.04', 'index-2016.03.05']
+        do = IndexDelete(client, indices)
+        self.assertRaises(FailedExecution, do.do_action)
+        self.assertEqual(['index-2016.03.04'], do.remaining)
+    def test_do_action_empty(self):
+        self.assertRaises(NoIndices, IndexDelete(Mock(), []).do_action)
+    def test_chunks_sent_concurrently(self):
+        client = Mock()
+        client.indices.get_settings.return_value = {}
+        active = []
+        peak = []
+        lock = threading.Lock()
+        def delete(**kwargs):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+        client.indices.delete.side_effect = delete
+        indices = ['index-{0:04d}-{1}'.format(i, 'x' * 200) for i in range(100)]
+        do = IndexDelete(client, indices, max_workers=3)
+        do.do_action()
+        self.assertTrue(client.indices.delete.call_count > 3)
+        self.assertEqual(3, max(peak))
+    def test_verify_result_positive(self):
+        do = IndexDelete(Mock(), INDICES)
+        self.assertTrue(do._verify_result([],2))
+    def test_verify_result_negative(self):
+        do = IndexDelete(Mock(), INDICES)
+        self.assertFalse(do._verify_result(INDICES,2))
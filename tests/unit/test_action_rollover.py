@@ -1,53 +1,238 @@
-# from unittest import TestCase
-# from mock import Mock, patch
-# import elasticsearch
-# import curator
-# # Get test variables and constants from a single source
-# from . import testvars as testvars
-
-# class TestActionRollover(TestCase):
-#     def test_init_raise_bad_client(self):
-#         self.assertRaises(
-#             TypeError, curator.Rollover, 'invalid', 'name', {})
-#     def test_init_raise_bad_conditions(self):
-#         client = Mock()
-#         client.info.return_value = {'version': {'number': '5.0.0'} }
-#         self.assertRaises(
-#             curator.ConfigurationError, curator.Rollover, client, 'name', 'string')
-#     def test_init_raise_bad_extra_settings(self):
-#         client = Mock()
-#         client.info.return_value = {'version': {'number': '5.0.0'} }
-#         self.assertRaises(
-#             curator.ConfigurationError, curator.Rollover, client, 'name',
-#             {'a':'b'}, None, 'string')
-#     def test_init_raise_non_rollable_index(self):
-#         client = Mock()
-#         client.info.return_value = {'version': {'number': '5.0.0'} }
-#         client.indices.get_alias.return_value = testvars.alias_retval
-#         self.assertRaises(
-#             ValueError, curator.Rollover, client, testvars.named_alias,
-#             {'a':'b'})
-#     def test_do_dry_run(self):
-#         client = Mock()
-#         client.info.return_value = {'version': {'number': '5.0.0'} }
-#         client.indices.get_alias.return_value = testvars.rollable_alias
-#         client.indices.rollover.return_value = testvars.dry_run_rollover
-#         ro = curator.Rollover(
-#             client, testvars.named_alias, testvars.rollover_conditions)
-#         self.assertIsNone(ro.do_dry_run())
-#     def test_init_raise_max_size_on_unsupported_version(self):
-#         client = Mock()
-#         client.info.return_value = {'version': {'number': '6.0.0'} }
-#         client.indices.get_alias.return_value = testvars.rollable_alias
-#         conditions = { 'max_size': '1g' }
-#         self.assertRaises(
-#             curator.ConfigurationError, curator.Rollover, client, 
-#             testvars.named_alias, conditions
-#         )
-#     def test_max_size_in_acceptable_verion(self):
-#         client = Mock()
-#         client.info.return_value = {'version': {'number': '6.1.0'} }
-#         client.indices.get_alias.return_value = testvars.rollable_alias
-#         conditions = { 'max_size': '1g' }
-#         ro = curator.Rollover(client, testvars.named_alias, conditions)
-#         self.assertEqual(conditions, ro.conditions)
+"""Test Rollover Action"""
+# pylint: disable=C0103,C0111
+from unittest import TestCase
+from mock import Mock
+from curator_api.actions import Rollover, RolloverGroup
+from curator_api.actions.rollover import (
+    condition_values, evaluate_conditions, write_index_stats
+)
+from curator_api.exceptions import ConfigurationError, FailedExecution
+from curator_api.helpers.alias import get_alias_map
+# Get test variables and constants from a single source
+from . import testvars as testvars
+
+class TestActionRollover(TestCase):
+    def test_init_raise_bad_conditions(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '5.0.0'} }
+        self.assertRaises(
+            ConfigurationError, Rollover, client, 'name', 'string')
+    def test_init_raise_bad_extra_settings(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '5.0.0'} }
+        self.assertRaises(
+            ConfigurationError, Rollover, client, 'name',
+            {'a':'b'}, None, 'string')
+    def test_init_raise_non_rollable_index(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '5.0.0'} }
+        client.indices.get_alias.return_value = testvars.alias_retval
+        self.assertRaises(
+            ValueError, Rollover, client, testvars.named_alias,
+            {'a':'b'})
+    def test_do_dry_run(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '5.0.0'} }
+        client.indices.get_alias.return_value = testvars.rollable_alias
+        client.indices.rollover.return_value = testvars.dry_run_rollover
+        ro = Rollover(
+            client, testvars.named_alias, testvars.rollover_conditions)
+        self.assertIsNone(ro.do_dry_run())
+    def test_init_raise_max_size_on_unsupported_version(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '6.0.0'} }
+        client.indices.get_alias.return_value = testvars.rollable_alias
+        conditions = { 'max_size': '1g' }
+        self.assertRaises(
+            ConfigurationError, Rollover, client,
+            testvars.named_alias, conditions
+        )
+    def test_max_size_in_acceptable_verion(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '6.1.0'} }
+        client.indices.get_alias.return_value = testvars.rollable_alias
+        conditions = { 'max_size': '1g' }
+        ro = Rollover(client, testvars.named_alias, conditions)
+        self.assertEqual(conditions, ro.conditions)
+    def test_nested_conditions_unwrapped(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '6.0.0'} }
+        client.indices.get_alias.return_value = testvars.rollable_alias
+        # The max_size check sees the condition inside the wrapper too
+        self.assertRaises(
+            ConfigurationError, Rollover, client, testvars.named_alias,
+            {'conditions': {'max_size': '1g'}}
+        )
+        client.info.return_value = {'version': {'number': '6.1.0'} }
+        ro = Rollover(
+            client, testvars.named_alias, {'conditions': {'max_size': '1g'}})
+        self.assertEqual({'max_size': '1g'}, ro.conditions)
+        self.assertEqual({'conditions': {'max_size': '1g'}}, ro.body())
+
+    def test_alias_map(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '6.1.0'} }
+        client.cat.aliases.return_value = [
+            {'alias': testvars.named_alias, 'index': 'index-000001'}]
+        client.indices.rollover.return_value = testvars.dry_run_rollover
+        alias_map = get_alias_map(client)
+        ro = Rollover(
+            client, testvars.named_alias, testvars.rollover_conditions,
+            alias_map=alias_map
+        )
+        client.indices.get_alias.assert_not_called()
+        ro.do_action()
+        self.assertIsNot(alias_map, get_alias_map(client))
+
+GROUP_ALIASES = [
+    {'alias': 'logs-a', 'index': 'logs-a-000001'},
+    {'alias': 'logs-b', 'index': 'logs-b-000003'},
+    {'alias': 'logs-c', 'index': 'logs-c-000001'},
+    {'alias': 'logs-c', 'index': 'logs-c-000002'},
+]
+
+def group_rollover(alias, **kwargs):
+    if alias == 'logs-b':
+        raise testvars.four_oh_one
+    number = int(alias.endswith('a'))
+    return {
+        'old_index': '{0}-000001'.format(alias),
+        'new_index': '{0}-000002'.format(alias),
+        'rolled_over': bool(number) and not kwargs['dry_run'],
+        'dry_run': kwargs['dry_run'],
+        'conditions': {'[max_docs: 1000]': bool(number)},
+    }
+
+class TestActionRolloverGroup(TestCase):
+    def client(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '6.8.0'}}
+        client.cat.aliases.return_value = GROUP_ALIASES
+        client.indices.rollover.side_effect = group_rollover
+        return client
+    def test_one_precheck(self):
+        client = self.client()
+        group = RolloverGroup(
+            client, ['logs-a', 'logs-b', 'logs-c', 'logs-d'], {'max_size': '1g'})
+        self.assertEqual(['logs-a', 'logs-b'], [r.name for r in group.rollovers])
+        self.assertEqual(
+            ['logs-c', 'logs-d'], [r['alias'] for r in group.invalid])
+        client.cat.aliases.assert_called_once()
+        client.info.assert_called_once()
+        client.indices.get_alias.assert_not_called()
+    def test_no_version_lookup(self):
+        client = self.client()
+        RolloverGroup(client, ['logs-a'], testvars.rollover_conditions)
+        client.info.assert_not_called()
+    def test_do_action(self):
+        client = self.client()
+        group = RolloverGroup(
+            client, ['logs-a', 'logs-b', 'logs-d'], testvars.rollover_conditions)
+        self.assertRaises(FailedExecution, group.do_action)
+        self.assertEqual(2, client.indices.rollover.call_count)
+        self.assertEqual(
+            ['logs-a', 'logs-b', 'logs-d'], [r['alias'] for r in group.results])
+        rolled = group.results[0]
+        self.assertTrue(rolled['rolled_over'])
+        self.assertEqual('logs-a-000002', rolled['new_index'])
+        self.assertEqual(['[max_docs: 1000]'], rolled['conditions'])
+        self.assertIsNotNone(group.results[1]['error'])
+        lines = group.format_results()
+        self.assertEqual(
+            'alias   old_index      new_index      rolled_over  conditions',
+            lines[0])
+        self.assertEqual(
+            'logs-a  logs-a-000001  logs-a-000002  True         [max_docs: 1000]',
+            lines[1])
+        self.assertEqual('logs-b  -              -              failed       -', lines[2])
+    def test_do_dry_run(self):
+        client = self.client()
+        group = RolloverGroup(client, ['logs-a'], testvars.rollover_conditions)
+        group.do_dry_run()
+        group.do_dry_run()
+        self.assertEqual(1, len(group.results))
+        self.assertFalse(group.results[0]['rolled_over'])
+        self.assertTrue(client.indices.rollover.call_args[1]['dry_run'])
+
+NOW = 1500000000
+STATS = {'docs': 900, 'size_in_bytes': 512 * 1024 ** 2, 'creation_date': NOW - 3600}
+
+class TestConditionValues(TestCase):
+    def test_flat_and_wrapped(self):
+        self.assertEqual({'max_age': '1d'}, condition_values({'max_age': '1d'}))
+        self.assertEqual(
+            {'max_age': '1d'}, condition_values({'conditions': {'max_age': '1d'}}))
+
+class TestEvaluateConditions(TestCase):
+    def test_met(self):
+        self.assertEqual('met', evaluate_conditions(
+            {'max_docs': 900}, STATS, now=NOW))
+        self.assertEqual('met', evaluate_conditions(
+            {'max_age': '1h', 'max_docs': 10000}, STATS, now=NOW))
+        self.assertEqual('met', evaluate_conditions(
+            {'max_size': '0.5gb'}, STATS, now=NOW))
+        self.assertEqual('met', evaluate_conditions(
+            {'conditions': {'max_size': '0.5gb'}}, STATS, now=NOW))
+    def test_near(self):
+        self.assertEqual('near', evaluate_conditions(
+            {'max_docs': 1000}, STATS, now=NOW))
+        self.assertEqual('near', evaluate_conditions(
+            {'max_age': '65m'}, STATS, now=NOW))
+    def test_far(self):
+        self.assertEqual('far', evaluate_conditions(
+            {'max_docs': 2000, 'max_size': '1gb', 'max_age': '1d'}, STATS,
+            now=NOW))
+        self.assertEqual('near', evaluate_conditions(
+            {'max_docs': 2000}, STATS, margin=0.6, now=NOW))
+    def test_unknown_is_near(self):
+        self.assertEqual('near', evaluate_conditions(
+            {'max_docs': 2000, 'max_primary_shard_size': '1gb'}, STATS, now=NOW))
+        self.assertEqual('near', evaluate_conditions({'max_age': '1d'}, {}))
+
+class TestWriteIndexStats(TestCase):
+    def test_batched(self):
+        client = Mock()
+        client.indices.stats.return_value = {'indices': {'a': {'primaries': {
+            'docs': {'count': 5}, 'store': {'size_in_bytes': 100}}}}}
+        client.indices.get_settings.return_value = {'a': {'settings': {'index': {
+            'creation_date': '1500000000123'}}}}
+        self.assertEqual(
+            {'a': {'docs': 5, 'size_in_bytes': 100, 'creation_date': 1500000000},
+             'b': {}},
+            write_index_stats(client, ['a', 'b'])
+        )
+        self.assertEqual('a,b', client.indices.stats.call_args[1]['index'])
+    def test_failure(self):
+        client = Mock()
+        client.indices.stats.side_effect = testvars.fake_fail
+        self.assertRaises(FailedExecution, write_index_stats, client, ['a'])
+
+class TestRolloverGroupPrecheck(TestCase):
+    def test_only_near_aliases_called(self):
+        client = Mock()
+        client.cat.aliases.return_value = [
+            {'alias': 'logs-a', 'index': 'logs-a-000001'},
+            {'alias': 'logs-b', 'index': 'logs-b-000001'},
+        ]
+        client.indices.stats.return_value = {'indices': {
+            'logs-a-000001': {'primaries': {
+                'docs': {'count': 999}, 'store': {'size_in_bytes': 1}}},
+            'logs-b-000001': {'primaries': {
+                'docs': {'count': 10}, 'store': {'size_in_bytes': 1}}},
+        }}
+        client.indices.get_settings.return_value = {}
+        client.indices.rollover.side_effect = group_rollover
+        group = RolloverGroup(
+            client, ['logs-a', 'logs-b'], {'max_docs': 1000},
+            precheck_margin=0.1
+        )
+        group.do_action()
+        client.indices.rollover.assert_called_once()
+        self.assertEqual('logs-a', client.indices.rollover.call_args[1]['alias'])
+        client.indices.stats.assert_called_once()
+        skipped = group.results[1]
+        self.assertTrue(skipped['skipped'])
+        self.assertEqual('logs-b-000001', skipped['old_index'])
+        self.assertEqual(
+            'logs-b  logs-b-000001  -              skipped      -',
+            group.format_results()[2])
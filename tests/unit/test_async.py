@@ -0,0 +1,9 @@
+"""Test the asyncio helpers and actions"""
+# pylint: disable=W0401,W0614
+import sys
+
+# AsyncMock is new in Python 3.8, and the asyncio helpers are not valid
+# Python 2 at all.  On older versions no tests are collected, rather than
+# counting every one as skipped in travis-run.sh
+if sys.version_info >= (3, 8):
+    from .async_cases import *
@@ -2,9 +2,19 @@
 # pylint: disable=C0103,C0111
 from datetime import datetime, timedelta
 from unittest import TestCase
-from mock import Mock
+from mock import Mock, patch
 import elasticsearch
-from curator_api.helpers.client import get_version
+from curator_api.exceptions import FailedExecution
+from curator_api.helpers.alias import (
+    AliasMap, get_alias_map, invalidate_alias_map, rollable_alias
+)
+from curator_api.helpers.client import api_params, get_version, set_minimal_responses
+from curator_api.helpers.index import (
+    chunk_index_list, compact_index_list, existing_indices, forget_names,
+    index_size, probe_chunk_bytes, resolve_names, url_length
+)
+from curator_api.helpers.snapshot import create_snapshot_body
+from curator_api.helpers.waiting import health_check
 from . import testvars as testvars
 
 class TestGetVersion(TestCase):
@@ -20,6 +30,46 @@ class TestGetVersion(TestCase):
         version = get_version(client)
         self.assertNotEqual(version, (8, 8, 8))
 
+class TestApiParams(TestCase):
+    def tearDown(self):
+        set_minimal_responses(True)
+    def test_registered(self):
+        self.assertEqual(
+            {'metric': 'store', 'filter_path': 'indices.*.total.store.size_in_bytes'},
+            api_params('index_size')
+        )
+    def test_format_fields(self):
+        self.assertEqual(
+            {'filter_path': 'relocating_shards,status'},
+            api_params('health_check', keys='relocating_shards,status')
+        )
+    def test_disabled(self):
+        set_minimal_responses(False)
+        self.assertEqual({}, api_params('index_size'))
+    def test_unregistered(self):
+        self.assertRaises(KeyError, api_params, 'not_a_helper')
+    def test_index_size_applies_params(self):
+        client = Mock()
+        client.indices.stats.return_value = {
+            'indices': {'idx': {'total': {'store': {'size_in_bytes': 42}}}}}
+        self.assertEqual(42, index_size(client, 'idx'))
+        client.indices.stats.assert_called_with(
+            index='idx', metric='store',
+            filter_path='indices.*.total.store.size_in_bytes'
+        )
+    def test_health_check_filters_on_keys(self):
+        client = Mock()
+        client.cluster.health.return_value = testvars.cluster_health
+        self.assertTrue(health_check(client, status='green', relocating_shards=0))
+        client.cluster.health.assert_called_with(
+            filter_path='relocating_shards,status')
+    def test_health_check_full_response_when_disabled(self):
+        set_minimal_responses(False)
+        client = Mock()
+        client.cluster.health.return_value = testvars.cluster_health
+        self.assertTrue(health_check(client, status='green'))
+        client.cluster.health.assert_called_with()
+
 # class TestIsMasterNode(TestCase):
 #     def test_positive(self):
 #         client = Mock()
@@ -43,15 +93,138 @@ class TestGetVersion(TestCase):
 
 
 
-# class TestChunkIndexList(TestCase):
-#     def test_big_list(self):
-#         big = "superlongindexnamebyanystandardyouchoosethisissillyhowbigcanthisgetbeforeitbreaks"
-#         indices = []
-#         for i in range(100,150):
-#             indices.append(big + str(i))
-#         self.assertEqual(2, len(curator.chunk_index_list(indices)))
-#     def test_small_list(self):
-#         self.assertEqual(1, len(curator.chunk_index_list(['short','list','of','indices'])))
+class TestChunkIndexList(TestCase):
+    def test_big_list(self):
+        big = "superlongindexnamebyanystandardyouchoosethisissillyhowbigcanthisgetbeforeitbreaks"
+        indices = []
+        for i in range(100,150):
+            indices.append(big + str(i))
+        self.assertEqual(2, len(chunk_index_list(indices)))
+    def test_small_list(self):
+        self.assertEqual(1, len(chunk_index_list(['short','list','of','indices'])))
+    def test_empty_list(self):
+        self.assertEqual([], chunk_index_list([]))
+    def test_budget(self):
+        indices = ['a' * 9] * 10
+        chunks = chunk_index_list(indices, max_bytes=29)
+        # 3 names and 2 commas fit in 29 bytes, 4 names and 3 commas do not
+        self.assertEqual([3, 3, 3, 1], [len(c) for c in chunks])
+        self.assertEqual(indices, sum(chunks, []))
+        for chunk in chunks:
+            self.assertTrue(len(','.join(chunk)) <= 29)
+    def test_max_count(self):
+        chunks = chunk_index_list(['a', 'b', 'c', 'd', 'e'], max_count=2)
+        self.assertEqual([['a', 'b'], ['c', 'd'], ['e']], chunks)
+    def test_oversized_name(self):
+        chunks = chunk_index_list(['a', 'b' * 20, 'c'], max_bytes=10)
+        self.assertEqual([['a'], ['b' * 20], ['c']], chunks)
+    def test_many_names(self):
+        indices = ['logs-app-{0}'.format(i) for i in range(100000)]
+        chunks = chunk_index_list(indices)
+        self.assertEqual(indices, [i for chunk in chunks for i in chunk])
+        self.assertTrue(all(len(','.join(c)) <= 3072 for c in chunks))
+    def test_url_encoding(self):
+        datemath = '<logs-{now/d}>'
+        self.assertEqual(len('%3Clogs-%7Bnow%2Fd%7D%3E'), url_length(datemath))
+        self.assertEqual(len('logs-*'), url_length('logs-*'))
+        self.assertEqual(2, len(chunk_index_list([datemath] * 2, max_bytes=40)))
+
+DAILY = (
+    ['logs-2023.01.{0:02d}'.format(d) for d in range(1, 32)] +
+    ['logs-2023.02.{0:02d}'.format(d) for d in range(1, 29)] +
+    ['logs', 'metrics-1']
+)
+
+class TestCompactIndexList(TestCase):
+    def test_month(self):
+        selected = [i for i in DAILY if i.startswith('logs-2023.01')]
+        self.assertEqual(
+            ['logs-2023.01*'], compact_index_list(selected, DAILY))
+    def test_partial_range(self):
+        selected = ['logs-2023.01.0{0}'.format(d) for d in range(1, 10)]
+        selected.append('logs-2023.02.01')
+        self.assertEqual(
+            ['logs-2023.01.0*', 'logs-2023.02.01'],
+            compact_index_list(selected, DAILY)
+        )
+    def test_prefix_of_unselected(self):
+        # "logs" is a prefix of every daily index, so it can only be named
+        self.assertEqual(['logs'], compact_index_list(['logs'], DAILY))
+    def test_min_prefix(self):
+        self.assertEqual(['l*', 'metrics-1'], compact_index_list(DAILY, DAILY))
+        self.assertEqual(
+            ['logs', 'logs-*', 'metrics-1'],
+            compact_index_list(DAILY, DAILY, min_prefix=5)
+        )
+    def test_not_in_inventory(self):
+        self.assertEqual(
+            ['logs-2023.01.01', 'nope'],
+            compact_index_list(['nope', 'logs-2023.01.01'], DAILY)
+        )
+    def test_snapshot_body(self):
+        selected = [i for i in DAILY if i.startswith('logs-2023.02')]
+        self.assertEqual(
+            'logs-2023.02*',
+            create_snapshot_body(selected, inventory=DAILY)['indices']
+        )
+        self.assertEqual(
+            ','.join(selected), create_snapshot_body(selected)['indices'])
+    def test_prefix_matching_alias(self):
+        selected = [i for i in DAILY if i.startswith('logs-2023.01')]
+        self.assertEqual(
+            ['logs-2023.01.*'],
+            compact_index_list(selected, DAILY, aliases=['logs-2023.01-hot'])
+        )
+        # An alias sharing every prefix of the selection forces names
+        self.assertEqual(
+            ['logs-2023.01.01', 'logs-2023.01.02'],
+            compact_index_list(
+                ['logs-2023.01.01', 'logs-2023.01.02'], DAILY,
+                aliases=['logs-2023.01.0']
+            )
+        )
+    def test_closed_selected_index(self):
+        selected = [i for i in DAILY if i.startswith('logs-2023.02')]
+        closed = ['logs-2023.02.15']
+        expressions = compact_index_list(selected, DAILY, closed=closed)
+        self.assertIn('logs-2023.02.15', expressions)
+        self.assertFalse(any(
+            e.endswith('*') and 'logs-2023.02.15'.startswith(e[:-1])
+            for e in expressions
+        ))
+        self.assertEqual(
+            expressions,
+            create_snapshot_body(
+                selected, inventory=DAILY, closed=closed)['indices'].split(',')
+        )
+    def test_closed_from_inventory(self):
+        inventory = Mock()
+        inventory.__iter__ = Mock(return_value=iter(['a-1', 'a-2']))
+        inventory.index_info = {'a-1': {'state': 'open'}, 'a-2': {'state': 'close'}}
+        self.assertEqual(['a-1', 'a-2'], compact_index_list(['a-1', 'a-2'], inventory))
+        self.assertEqual(['a*'], compact_index_list(['a-1', 'a-2'], ['a-1', 'a-2']))
+
+class TestProbeChunkBytes(TestCase):
+    def test_smallest_limit(self):
+        client = Mock()
+        client.nodes.info.return_value = {'nodes': {
+            'a': {'name': 'a', 'settings': {'http': {'max_initial_line_length': '16kb'}}},
+            'b': {'name': 'b', 'settings': {'http': {'max_initial_line_length': '8kb'}}},
+        }}
+        self.assertEqual(8192 - 1024, probe_chunk_bytes(client))
+        self.assertEqual(8192 - 512, probe_chunk_bytes(client, reserve=512))
+        self.assertEqual(1, client.nodes.info.call_count)
+    def test_default_limit(self):
+        client = Mock()
+        client.nodes.info.return_value = {'nodes': {
+            'a': {'name': 'a', 'settings': {'http': {'max_initial_line_length': '16kb'}}},
+            'b': {'name': 'b'},
+        }}
+        self.assertEqual(3072, probe_chunk_bytes(client))
+    def test_failure(self):
+        client = Mock()
+        client.nodes.info.side_effect = testvars.fake_fail
+        self.assertEqual(3072, probe_chunk_bytes(client))
 
 # class TestGetIndices(TestCase):
 #     def test_client_exception(self):
@@ -725,3 +898,140 @@ class TestGetVersion(TestCase):
 #         client = Mock()
 #         client.nodes.stats.return_value = {u'nodes':{'my_node_id':{u'name':'my_node_name'}}}
 #         self.assertIsNone(curator.node_id_to_name(client, 'not_my_node_id'))
+
+class TestExistingIndices(TestCase):
+    def test_only_existing(self):
+        client = Mock()
+        client.indices.get_settings.return_value = {'b': {}}
+        self.assertEqual(['b'], existing_indices(client, ['a', 'b']))
+        client.indices.get_settings.assert_called_once_with(
+            index='a,b',
+            params={'expand_wildcards': 'open,closed', 'ignore_unavailable': 'true'},
+            name='index.uuid'
+        )
+    def test_failure(self):
+        client = Mock()
+        client.indices.get_settings.side_effect = testvars.fake_fail
+        self.assertRaises(FailedExecution, existing_indices, client, ['a'])
+
+class TestResolveNames(TestCase):
+    def test_cat_fallback(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '6.8.0'}}
+        client.indices.get_settings.return_value = {'index-1': {}, 'index-2': {}}
+        client.cat.aliases.return_value = [{'alias': 'alias-1'}, {'alias': 'alias-1'}]
+        self.assertEqual(
+            {'index-1': 'index', 'alias-1': 'alias', 'nope': 'missing'},
+            resolve_names(client, ['index-1', 'alias-1', 'nope'])
+        )
+        self.assertEqual(
+            'alias-1,index-1,nope',
+            client.indices.get_settings.call_args[1]['index'])
+        client.cat.aliases.assert_called_once_with(
+            name='alias-1,nope', format='json', h='alias')
+    def test_resolve_api(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '7.10.0'}}
+        client.transport.perform_request.return_value = {
+            'indices': [{'name': 'index-1'}],
+            'aliases': [{'name': 'alias-1'}],
+            'data_streams': [{'name': 'logs-app'}],
+        }
+        self.assertEqual(
+            {'index-1': 'index', 'alias-1': 'alias', 'logs-app': 'data_stream',
+             'nope': 'missing'},
+            resolve_names(client, ['index-1', 'alias-1', 'logs-app', 'nope'])
+        )
+        self.assertEqual(
+            '/_resolve/index/alias-1,index-1,logs-app,nope',
+            client.transport.perform_request.call_args[0][1])
+        client.indices.get_settings.assert_not_called()
+    def test_memoized(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '6.8.0'}}
+        client.indices.get_settings.return_value = {'index-1': {}}
+        client.cat.aliases.return_value = []
+        resolve_names(client, ['index-1', 'nope'])
+        self.assertEqual(
+            {'nope': 'missing', 'index-1': 'index'},
+            resolve_names(client, ['nope', 'index-1']))
+        self.assertEqual(1, client.indices.get_settings.call_count)
+        client.indices.get_settings.return_value = {'nope': {}}
+        forget_names(client, ['nope'])
+        self.assertEqual({'nope': 'index'}, resolve_names(client, ['nope']))
+        self.assertEqual('nope', client.indices.get_settings.call_args[1]['index'])
+    def test_expires(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '6.8.0'}}
+        client.indices.get_settings.return_value = {}
+        client.cat.aliases.return_value = []
+        with patch('curator_api.helpers.index.time.time') as mock_time:
+            mock_time.return_value = 1000
+            self.assertEqual({'a': 'missing'}, resolve_names(client, ['a']))
+            client.indices.get_settings.return_value = {'a': {}}
+            mock_time.return_value = 1029
+            self.assertEqual({'a': 'missing'}, resolve_names(client, ['a']))
+            mock_time.return_value = 1030
+            self.assertEqual({'a': 'index'}, resolve_names(client, ['a']))
+            self.assertEqual({'a': 'index'}, resolve_names(client, ['a'], max_age=0))
+        self.assertEqual(3, client.indices.get_settings.call_count)
+    def test_failure(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '6.8.0'}}
+        client.indices.get_settings.return_value = {}
+        client.cat.aliases.side_effect = testvars.fake_fail
+        self.assertRaises(FailedExecution, resolve_names, client, ['a'])
+
+CAT_ALIASES = [
+    {'alias': 'logs', 'index': 'logs-000002', 'filter': '-',
+     'routing.index': '-', 'routing.search': '-'},
+    {'alias': 'logs', 'index': 'logs-000001', 'filter': '-',
+     'routing.index': '-', 'routing.search': '-'},
+    {'alias': 'write', 'index': 'logs-000002', 'filter': '*',
+     'routing.index': '1', 'routing.search': '1'},
+]
+
+class TestAliasMap(TestCase):
+    def test_forward_and_reverse(self):
+        client = Mock()
+        client.cat.aliases.return_value = CAT_ALIASES
+        alias_map = AliasMap(client)
+        self.assertEqual(['logs-000001', 'logs-000002'], alias_map.indices_of('logs'))
+        self.assertEqual(['logs', 'write'], alias_map.aliases_of('logs-000002'))
+        self.assertEqual([], alias_map.indices_of('nope'))
+        self.assertTrue('write' in alias_map)
+        self.assertEqual('*', alias_map.rows[('write', 'logs-000002')]['filter'])
+        client.cat.aliases.assert_called_once_with(
+            format='json', h='alias,index,filter,routing.index,routing.search')
+    def test_shared_until_invalidated(self):
+        client = Mock()
+        client.cat.aliases.return_value = CAT_ALIASES
+        self.assertIs(get_alias_map(client), get_alias_map(client))
+        self.assertEqual(1, client.cat.aliases.call_count)
+        invalidate_alias_map(client)
+        get_alias_map(client)
+        self.assertEqual(2, client.cat.aliases.call_count)
+    def test_expires(self):
+        client = Mock()
+        client.cat.aliases.return_value = CAT_ALIASES
+        with patch('curator_api.helpers.alias.time.time') as mock_time:
+            mock_time.return_value = 1000
+            alias_map = get_alias_map(client)
+            mock_time.return_value = 1029
+            self.assertIs(alias_map, get_alias_map(client))
+            self.assertIsNot(alias_map, get_alias_map(client, max_age=0))
+            mock_time.return_value = 1060
+            get_alias_map(client)
+        self.assertEqual(3, client.cat.aliases.call_count)
+    def test_failure(self):
+        client = Mock()
+        client.cat.aliases.side_effect = testvars.fake_fail
+        self.assertRaises(FailedExecution, AliasMap, client)
+    def test_rollable_alias(self):
+        client = Mock()
+        client.cat.aliases.return_value = CAT_ALIASES
+        alias_map = AliasMap(client)
+        self.assertTrue(rollable_alias(client, 'write', alias_map=alias_map))
+        self.assertFalse(rollable_alias(client, 'logs', alias_map=alias_map))
+        self.assertFalse(rollable_alias(client, 'nope', alias_map=alias_map))
+        client.indices.get_alias.assert_not_called()
@@ -0,0 +1,107 @@
+"""Test request coalescing"""
+# pylint: disable=C0103,C0111
+import threading
+import time
+from unittest import TestCase
+from mock import Mock
+from elasticsearch import Elasticsearch
+from curator_api.helpers.coalesce import CoalescingTransport, coalesce_requests
+from curator_api.helpers.node import name_to_node_id, node_id_to_name
+from . import testvars as testvars
+
+class TestCoalescingTransport(TestCase):
+    def test_identical_gets_share_response(self):
+        inner = Mock()
+        inner.perform_request.return_value = {'a': 1}
+        transport = CoalescingTransport(inner)
+        for _ in range(3):
+            self.assertEqual({'a': 1}, transport.perform_request('GET', '/_nodes/stats'))
+        self.assertEqual(1, inner.perform_request.call_count)
+        self.assertEqual({'calls': 3, 'requests': 1, 'saved': 2}, transport.stats)
+    def test_different_params_not_shared(self):
+        inner = Mock()
+        transport = CoalescingTransport(inner)
+        transport.perform_request('GET', '/_stats', params={'level': 'shards'})
+        transport.perform_request('GET', '/_stats', params={'level': 'indices'})
+        self.assertEqual(2, inner.perform_request.call_count)
+    def test_writes_pass_through(self):
+        inner = Mock()
+        transport = CoalescingTransport(inner)
+        transport.perform_request('DELETE', '/index')
+        transport.perform_request('DELETE', '/index')
+        self.assertEqual(2, inner.perform_request.call_count)
+        self.assertEqual(0, transport.stats['calls'])
+    def test_write_drops_shared_reads(self):
+        inner = Mock()
+        inner.perform_request.side_effect = [{'before': 1}, None, {'after': 1}]
+        transport = CoalescingTransport(inner)
+        transport.perform_request('GET', '/index/_settings')
+        transport.perform_request('DELETE', '/index')
+        self.assertEqual(
+            {'after': 1}, transport.perform_request('GET', '/index/_settings'))
+        self.assertEqual(3, inner.perform_request.call_count)
+    def test_different_headers_not_shared(self):
+        inner = Mock()
+        transport = CoalescingTransport(inner)
+        transport.perform_request('GET', '/', headers={'Authorization': 'a'})
+        transport.perform_request('GET', '/', headers={'Authorization': 'b'})
+        transport.perform_request('GET', '/', headers={'Authorization': 'b'})
+        self.assertEqual(2, inner.perform_request.call_count)
+    def test_window_expires(self):
+        inner = Mock()
+        transport = CoalescingTransport(inner, window=0)
+        transport.perform_request('GET', '/_nodes')
+        time.sleep(0.01)
+        transport.perform_request('GET', '/_nodes')
+        self.assertEqual(2, inner.perform_request.call_count)
+    def test_clear(self):
+        inner = Mock()
+        transport = CoalescingTransport(inner)
+        transport.perform_request('GET', '/_nodes')
+        transport.clear()
+        transport.perform_request('GET', '/_nodes')
+        self.assertEqual(2, inner.perform_request.call_count)
+    def test_errors_shared_not_cached(self):
+        inner = Mock()
+        inner.perform_request.side_effect = testvars.four_oh_one
+        transport = CoalescingTransport(inner)
+        for _ in range(2):
+            self.assertRaises(
+                type(testvars.four_oh_one), transport.perform_request, 'GET', '/')
+        self.assertEqual(2, inner.perform_request.call_count)
+    def test_concurrent_calls_share_request(self):
+        def slow(*args, **kwargs):
+            time.sleep(0.2)
+            return {'slow': True}
+        inner = Mock()
+        inner.perform_request.side_effect = slow
+        transport = CoalescingTransport(inner, window=0)
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(transport.perform_request('GET', '/_nodes/stats')))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([{'slow': True}] * 5, results)
+        self.assertEqual(1, inner.perform_request.call_count)
+        self.assertEqual(4, transport.stats['saved'])
+
+class TestCoalesceRequests(TestCase):
+    def test_node_helpers_share_nodes_stats(self):
+        client = Elasticsearch()
+        client.transport = Mock()
+        client.transport.perform_request.return_value = {
+            'nodes': {'my_node_id': {'name': 'my_node'}}}
+        transport = coalesce_requests(client)
+        self.assertEqual('my_node_id', name_to_node_id(client, 'my_node'))
+        self.assertEqual('my_node', node_id_to_name(client, 'my_node_id'))
+        self.assertEqual(1, transport.transport.perform_request.call_count)
+        self.assertEqual(1, transport.stats['saved'])
+    def test_installs_once(self):
+        client = Elasticsearch()
+        transport = coalesce_requests(client)
+        self.assertIs(transport, coalesce_requests(client))
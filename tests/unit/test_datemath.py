@@ -7,9 +7,9 @@ from mock import Mock
 from elasticsearch.exceptions import NotFoundError
 from curator_api.exceptions import ConfigurationError, MissingArgument
 from curator_api.helpers.datemath import (
-    absolute_date_range, date_range, datetime_to_epoch, fix_epoch, get_date_regex, get_datemath,
-    get_datetime, get_point_of_reference, get_unit_count_from_name, isdatemath, parse_date_pattern,
-    parse_datemath, TimestringSearch
+    absolute_date_range, date_pattern_range, date_range, datetime_to_epoch, fix_epoch,
+    get_date_regex, get_datemath, get_datetime, get_point_of_reference, get_unit_count_from_name,
+    isdatemath, parse_date_pattern, parse_datemath, TimestringSearch
 )
 
 EPOCH = datetime_to_epoch(datetime(2017, 4, 3, 22, 50, 17))
@@ -312,6 +312,24 @@ class TestParseDatePattern(TestCase):
         name = '%Y'
         self.assertEquals(year, parse_date_pattern(name))
 
+class TestDatePatternRange(TestCase):
+    def test_hours(self):
+        self.assertEqual(
+            ['logs-2017.01.01.23', 'logs-2017.01.02.00'],
+            date_pattern_range(
+                'logs-%Y.%m.%d.%H', 2, unit='hours',
+                start=datetime(2017, 1, 1, 23, 30))
+        )
+    def test_coarser_pattern(self):
+        self.assertEqual(
+            ['logs-2017.01', 'logs-2017.02'],
+            date_pattern_range('logs-%Y.%m', 5, start=datetime(2017, 1, 30)))
+    def test_invalid(self):
+        self.assertRaises(
+            ConfigurationError, date_pattern_range, 'a-%Y', 2, unit='months')
+        self.assertRaises(
+            ConfigurationError, date_pattern_range, '<a-{now/d}>', 2)
+
 class TestTimestringSearch(TestCase):
     def test_epoch_value(self):
         tstring = TimestringSearch('%Y.%m.%d')
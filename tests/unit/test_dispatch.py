@@ -0,0 +1,197 @@
+"""Test concurrent chunk dispatch"""
+# pylint: disable=C0103,C0111
+import threading
+import time
+from unittest import TestCase
+from elasticsearch.exceptions import (
+    AuthorizationException, ConnectionError, NotFoundError, TransportError
+)
+from curator_api.helpers.dispatch import (
+    BulkDispatcher, cluster_error, failed_chunks, index_error,
+    isolate_failures, remaining_work
+)
+
+CHUNKS = [['a'], ['b'], ['c'], ['d']]
+CLOSED = TransportError(400, 'index_closed_exception', {})
+MISSING = NotFoundError(404, 'index_not_found_exception', {})
+
+class TestBulkDispatcher(TestCase):
+    def test_results_in_chunk_order(self):
+        def func(chunk):
+            # Later chunks finish first
+            time.sleep(0.01 * (4 - CHUNKS.index(chunk)))
+            return chunk[0].upper()
+        results = BulkDispatcher(max_workers=4).run(func, CHUNKS)
+        self.assertEqual(['A', 'B', 'C', 'D'], [r.result for r in results])
+        self.assertTrue(all(r.ok for r in results))
+    def test_errors_collected(self):
+        def func(chunk):
+            if chunk == ['b']:
+                raise ValueError('bad chunk')
+            return True
+        results = BulkDispatcher().run(func, CHUNKS)
+        failures = failed_chunks(results)
+        self.assertEqual([['b']], [f.chunk for f in failures])
+        self.assertTrue(isinstance(failures[0].error, ValueError))
+        self.assertEqual(3, len([r for r in results if r.ok]))
+    def test_concurrency_limit(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+        def func(chunk):
+            with lock:
+                active.append(chunk)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.remove(chunk)
+        BulkDispatcher(max_workers=2).run(func, CHUNKS * 2)
+        self.assertEqual(2, max(peak))
+    def test_ordered_stop_on_error(self):
+        seen = []
+        def func(chunk):
+            seen.append(chunk)
+            if chunk == ['b']:
+                raise ValueError('bad chunk')
+        results = BulkDispatcher(
+            max_workers=4, ordered=True, stop_on_error=True).run(func, CHUNKS)
+        self.assertEqual([['a'], ['b']], seen)
+        self.assertEqual([True, True, False, False], [r.done for r in results])
+        self.assertEqual(3, len(failed_chunks(results)))
+    def test_bisect(self):
+        applied = []
+        def func(chunk):
+            if 'c' in chunk or 'f' in chunk:
+                raise CLOSED
+            applied.extend(chunk)
+        chunks = [['a', 'b', 'c', 'd', 'e'], ['f', 'g'], ['h']]
+        results = BulkDispatcher(bisect=True).run(func, chunks)
+        self.assertEqual(['a', 'b', 'd', 'e', 'g', 'h'], sorted(applied))
+        self.assertEqual(['c'], sorted(results[0].failures))
+        self.assertEqual(['c', 'f'], remaining_work(results))
+        self.assertEqual(2, len(failed_chunks(results)))
+    def test_bisect_single(self):
+        def func(chunk):
+            raise MISSING
+        results = BulkDispatcher(bisect=True).run(func, [['a']])
+        self.assertEqual(['a'], list(results[0].failures))
+    def test_bisect_without_culprits(self):
+        calls = []
+        def func(chunk):
+            calls.append(chunk)
+            if len(calls) == 1:
+                raise MISSING
+        results = BulkDispatcher(bisect=True).run(func, [['a', 'b']])
+        self.assertEqual([['a', 'b'], ['a'], ['b']], calls)
+        self.assertTrue(results[0].ok)
+        self.assertEqual([], results[0].remaining)
+        self.assertEqual([], failed_chunks(results))
+    def test_stop_on_cluster_errors(self):
+        for error in (
+                TransportError(401, 'security_exception', {}),
+                ConnectionError('N/A', 'refused', None),
+                TransportError(429, 'es_rejected_execution_exception', {}),
+                TransportError(500, 'internal', {}),
+            ):
+            calls = []
+            def func(chunk):
+                calls.append(chunk)
+                raise error
+            results = BulkDispatcher(ordered=True, bisect=True).run(
+                func, [['a', 'b'], ['c']])
+            self.assertEqual([['a', 'b']], calls)
+            self.assertIs(error, results[0].error)
+            self.assertEqual({}, results[0].failures)
+            self.assertFalse(results[1].done)
+            self.assertEqual(['a', 'b', 'c'], remaining_work(results))
+    def test_blocked_index_bisected(self):
+        for error in (
+                AuthorizationException(403, 'cluster_block_exception', {}),
+                TransportError(400, 'illegal_argument_exception', {}),
+                TransportError(400, 'snapshot_in_progress_exception', {}),
+            ):
+            def func(chunk):
+                if 'b' in chunk:
+                    raise error
+            results = BulkDispatcher(ordered=True, bisect=True).run(
+                func, [['a', 'b'], ['c']])
+            self.assertEqual(['b'], list(results[0].failures))
+            self.assertTrue(results[1].ok)
+            self.assertEqual(['b'], remaining_work(results))
+    def test_other_errors_fail_only_their_chunk(self):
+        for error in (
+                AuthorizationException(403, 'security_exception', {}),
+                ValueError('bad chunk'),
+            ):
+            calls = []
+            def func(chunk):
+                calls.append(chunk)
+                if chunk == ['a', 'b']:
+                    raise error
+            results = BulkDispatcher(ordered=True, bisect=True).run(
+                func, [['a', 'b'], ['c']])
+            self.assertEqual([['a', 'b'], ['c']], calls)
+            self.assertIs(error, results[0].error)
+            self.assertTrue(results[1].ok)
+            self.assertEqual(['a', 'b'], remaining_work(results))
+    def test_bisect_stops_on_other_errors(self):
+        calls = []
+        def func(chunk):
+            calls.append(chunk)
+            if len(calls) == 1:
+                raise MISSING
+            raise TransportError(503, 'unavailable', {})
+        results = BulkDispatcher(ordered=True, bisect=True).run(
+            func, [['a', 'b'], ['c']])
+        self.assertEqual([['a', 'b'], ['a']], calls)
+        self.assertEqual(503, results[0].error.status_code)
+        self.assertEqual(['a', 'b', 'c'], remaining_work(results))
+    def test_remaining_without_bisect(self):
+        def func(chunk):
+            if chunk == ['b']:
+                raise ValueError('bad chunk')
+        results = BulkDispatcher(
+            ordered=True, stop_on_error=True).run(func, CHUNKS)
+        self.assertEqual(['b', 'c', 'd'], remaining_work(results))
+    def test_bad_max_workers(self):
+        self.assertRaises(ValueError, BulkDispatcher, max_workers=0)
+
+class TestIsolateFailures(TestCase):
+    def test_results_and_failures(self):
+        calls = []
+        def func(chunk):
+            calls.append(chunk)
+            if 3 in chunk:
+                raise CLOSED
+            return len(chunk)
+        results, failures = isolate_failures(func, list(range(8)), CLOSED)
+        self.assertEqual([3], list(failures))
+        self.assertEqual(7, sum(results))
+        # Two calls per halving
+        self.assertEqual(6, len(calls))
+
+class TestIndexError(TestCase):
+    def test_index_errors(self):
+        self.assertTrue(index_error(MISSING))
+        self.assertTrue(index_error(CLOSED))
+        self.assertTrue(index_error(
+            TransportError(403, 'cluster_block_exception', {})))
+    def test_other_errors(self):
+        self.assertFalse(index_error(TransportError(401, 'security_exception', {})))
+        self.assertFalse(index_error(TransportError(403, 'security_exception', {})))
+        self.assertFalse(index_error(
+            TransportError(500, 'illegal_argument_exception', {})))
+        self.assertFalse(index_error(ConnectionError('N/A', 'refused', None)))
+        self.assertFalse(index_error(TransportError(502, 'bad gateway', {})))
+        self.assertFalse(index_error(ValueError('bad')))
+
+class TestClusterError(TestCase):
+    def test_cluster_errors(self):
+        self.assertTrue(cluster_error(ConnectionError('N/A', 'refused', None)))
+        self.assertTrue(cluster_error(TransportError(401, 'security_exception', {})))
+        self.assertTrue(cluster_error(TransportError(429, 'rejected', {})))
+        self.assertTrue(cluster_error(TransportError(503, 'unavailable', {})))
+    def test_other_errors(self):
+        self.assertFalse(cluster_error(MISSING))
+        self.assertFalse(cluster_error(TransportError(403, 'cluster_block_exception', {})))
+        self.assertFalse(cluster_error(ValueError('bad')))
@@ -0,0 +1,276 @@
+"""Test the filter planner"""
+# pylint: disable=C0103,C0111
+import threading
+import time
+from unittest import TestCase
+from mock import Mock, patch
+from curator_api.exceptions import ConfigurationError, FailedExecution
+from curator_api.filterplan import (
+    FilterPlan, MetadataLoader, filter_needs, wildcard_expression
+)
+from . import testvars as testvars
+
+INDICES = [
+    '.kibana', 'logs-2017.01.01', 'logs-2017.01.02', 'metrics-2017.01.01',
+]
+PATTERN = {'filtertype': 'pattern', 'kind': 'prefix', 'value': 'logs-'}
+KIBANA = {'filtertype': 'kibana'}
+OPENED = {'filtertype': 'opened'}
+FORCEMERGED = {'filtertype': 'forcemerged', 'max_num_segments': 1}
+AGE = {'filtertype': 'age', 'source': 'creation_date', 'direction': 'older'}
+COUNT = {'filtertype': 'count', 'count': 1}
+
+def state_response(index, **kwargs):
+    states = {'logs-2017.01.01': 'open', 'logs-2017.01.02': 'close'}
+    return {'metadata': {'indices': dict(
+        (i, {'state': states[i]}) for i in index.split(','))}}
+
+class TestFilterNeeds(TestCase):
+    def test_name_only(self):
+        for config in (PATTERN, KIBANA, {'filtertype': 'none'}):
+            self.assertEqual([], filter_needs(config))
+    def test_age_source(self):
+        self.assertEqual(['settings'], filter_needs(AGE))
+        self.assertEqual(
+            [], filter_needs({'filtertype': 'period', 'source': 'name'}))
+        self.assertEqual([], filter_needs(COUNT))
+        self.assertEqual(
+            ['settings'], filter_needs(dict(COUNT, use_age=True)))
+    def test_unknown(self):
+        self.assertRaises(
+            ConfigurationError, filter_needs, {'filtertype': 'bogus'})
+        self.assertRaises(
+            ConfigurationError, filter_needs, dict(AGE, source='bogus'))
+
+class TestFilterPlan(TestCase):
+    def test_cheap_filters_first(self):
+        plan = FilterPlan([FORCEMERGED, OPENED, PATTERN, AGE, KIBANA])
+        self.assertEqual([PATTERN, KIBANA, OPENED, AGE, FORCEMERGED], plan.steps)
+        self.assertEqual(['segments', 'settings', 'state'], plan.needs)
+    def test_order_dependent_barrier(self):
+        plan = FilterPlan([OPENED, COUNT, PATTERN])
+        self.assertEqual([OPENED, COUNT, PATTERN], plan.steps)
+    def test_run_fetches_survivors_only(self):
+        client = Mock()
+        client.cluster.state.side_effect = state_response
+        def opened(indices, config, loader):
+            return [i for i in indices if loader.table.get(i, 'state') == 'open']
+        survivors = FilterPlan([OPENED, PATTERN]).run(
+            client, INDICES, {'opened': opened})
+        self.assertEqual(['logs-2017.01.01'], survivors)
+        self.assertEqual(
+            'logs-2017.01.01,logs-2017.01.02',
+            client.cluster.state.call_args[1]['index']
+        )
+        client.indices.get_settings.assert_not_called()
+        client.indices.stats.assert_not_called()
+    def test_run_nothing_left(self):
+        client = Mock()
+        survivors = FilterPlan([OPENED, dict(PATTERN, value='nope-')]).run(
+            client, INDICES, {'opened': Mock()})
+        self.assertEqual([], survivors)
+        client.cluster.state.assert_not_called()
+    def test_run_missing_function(self):
+        self.assertRaises(
+            ConfigurationError, FilterPlan([OPENED]).run, Mock(), INDICES)
+    def test_name_filters(self):
+        plan = FilterPlan([
+            KIBANA, {'filtertype': 'pattern', 'kind': 'timestring',
+                     'value': '%Y.%m.%d', 'exclude': False},
+            {'filtertype': 'pattern', 'kind': 'regex', 'value': '^metrics',
+             'exclude': True},
+        ])
+        self.assertEqual(
+            ['logs-2017.01.01', 'logs-2017.01.02'], plan.run(Mock(), INDICES))
+
+def state_for_all(index, **kwargs):
+    return {'metadata': {'indices': dict(
+        (i, {'state': 'close' if i.endswith('2') else 'open'})
+        for i in index.split(','))}}
+
+def opened(indices, config, loader):
+    return [i for i in indices if loader.table.get(i, 'state') == 'open']
+
+def count(indices, config, loader):
+    return sorted(indices)[:config['count']]
+
+PAGED = ['logs-{0}'.format(i) for i in range(10)] + ['metrics-1']
+
+class TestRunPaged(TestCase):
+    def test_pages(self):
+        client = Mock()
+        client.cluster.state.side_effect = state_for_all
+        pages = list(FilterPlan([PATTERN, OPENED]).run_paged(
+            client, page_size=4, indices=iter(PAGED),
+            filter_functions={'opened': opened}
+        ))
+        self.assertEqual(
+            [['logs-0', 'logs-1', 'logs-3'], ['logs-4', 'logs-5', 'logs-6', 'logs-7'],
+             ['logs-8', 'logs-9']],
+            pages
+        )
+        # Metadata is fetched one page at a time
+        self.assertEqual(3, client.cluster.state.call_count)
+        self.assertEqual(
+            'logs-8,logs-9', client.cluster.state.call_args[1]['index'])
+    def test_same_as_run(self):
+        client = Mock()
+        client.cluster.state.side_effect = state_for_all
+        plan = FilterPlan([OPENED, PATTERN])
+        functions = {'opened': opened}
+        paged = sum(plan.run_paged(
+            client, page_size=3, indices=PAGED, filter_functions=functions), [])
+        self.assertEqual(plan.run(client, PAGED, functions), paged)
+    def test_two_pass_global_filter(self):
+        client = Mock()
+        client.cluster.state.side_effect = state_for_all
+        plan = FilterPlan([PATTERN, OPENED, COUNT, KIBANA])
+        pages = list(plan.run_paged(
+            client, page_size=3, indices=PAGED,
+            filter_functions={'opened': opened, 'count': count}
+        ))
+        self.assertEqual([['logs-0']], pages)
+    def test_streams_expression(self):
+        client = Mock()
+        with patch('curator_api.filterplan.stream_indices') as mock_stream:
+            mock_stream.return_value = iter(['logs-1', 'logs-2'])
+            pages = list(FilterPlan([PATTERN]).run_paged(client))
+        mock_stream.assert_called_once_with(client, index='logs-*')
+        self.assertEqual([['logs-1', 'logs-2']], pages)
+
+class TestWildcardExpression(TestCase):
+    def test_no_patterns(self):
+        self.assertEqual('_all', wildcard_expression([KIBANA, OPENED]))
+    def test_prefix_and_suffix(self):
+        self.assertEqual('logs-*', wildcard_expression([OPENED, PATTERN]))
+        self.assertEqual('*-prod', wildcard_expression([
+            {'filtertype': 'pattern', 'kind': 'suffix', 'value': '-prod'}]))
+    def test_longest_include(self):
+        self.assertEqual('logs-app1-*', wildcard_expression([
+            PATTERN, dict(PATTERN, value='logs-app1-')]))
+    def test_literal_part_only(self):
+        self.assertEqual('logs-2017*', wildcard_expression([
+            dict(PATTERN, value='logs-2017.01')]))
+        self.assertEqual('*01', wildcard_expression([
+            {'filtertype': 'pattern', 'kind': 'suffix', 'value': '.01'}]))
+        self.assertEqual('_all', wildcard_expression([
+            dict(PATTERN, value='.*-logs')]))
+    def test_quantified_character_dropped(self):
+        self.assertEqual('logs-*', wildcard_expression([
+            dict(PATTERN, value='logs-a?')]))
+        self.assertEqual('log*', wildcard_expression([
+            dict(PATTERN, value='logx*')]))
+        self.assertEqual('logs*', wildcard_expression([
+            dict(PATTERN, value='logs-{2}')]))
+        self.assertEqual('_all', wildcard_expression([
+            dict(PATTERN, value='l+ogs')]))
+    def test_alternation_not_pushed_down(self):
+        self.assertEqual('_all', wildcard_expression([
+            dict(PATTERN, value='logs|metrics')]))
+        self.assertEqual('_all', wildcard_expression([
+            dict(PATTERN, value='logs(-app)?')]))
+        self.assertEqual('_all', wildcard_expression([
+            {'filtertype': 'pattern', 'kind': 'suffix', 'value': 'prod|dev'}]))
+    def test_exclude(self):
+        self.assertEqual('*,-logs-*', wildcard_expression([
+            dict(PATTERN, exclude=True)]))
+        self.assertEqual('metrics-*,-metrics-2017.01*', wildcard_expression([
+            dict(PATTERN, value='metrics-'),
+            dict(PATTERN, value='metrics-2017.01', exclude=True),
+        ]))
+        # Not a literal, so it can not be excluded server side
+        self.assertEqual('_all', wildcard_expression([
+            dict(PATTERN, value='logs-(a|b)', exclude=True)]))
+    def test_stops_at_order_dependent(self):
+        self.assertEqual('_all', wildcard_expression([COUNT, PATTERN]))
+    def test_run_lists_expression(self):
+        client = Mock()
+        client.info.return_value = {'version': {'number': '6.8.0'}}
+        client.indices.get_settings.return_value = {
+            'logs-2017.01.01': {}, 'logs-2017.01.02': {}}
+        plan = FilterPlan([PATTERN, dict(PATTERN, value='logs-2017.01.02')])
+        survivors = plan.run(client)
+        self.assertEqual(['logs-2017.01.02'], survivors)
+        self.assertEqual(
+            'logs-2017*', client.indices.get_settings.call_args[1]['index'])
+
+class TestMetadataLoader(TestCase):
+    def test_loads_once(self):
+        client = Mock()
+        client.indices.stats.return_value = {'indices': {'logs-2017.01.01': {
+            'total': {'store': {'size_in_bytes': 100}},
+            'primaries': {'docs': {'count': 5}},
+        }}}
+        loader = MetadataLoader(client)
+        loader.load(['stats'], ['logs-2017.01.01', 'logs-2017.01.02'])
+        loader.load(['stats'], ['logs-2017.01.01', 'logs-2017.01.02'])
+        self.assertEqual(1, client.indices.stats.call_count)
+        self.assertEqual({'stats': 1}, loader.calls)
+        self.assertEqual(100, loader.table.get('logs-2017.01.01', 'size_in_bytes'))
+        self.assertIsNone(loader.data['stats']['logs-2017.01.02'])
+    def test_settings_and_segments(self):
+        client = Mock()
+        client.indices.get_settings.return_value = {'a': {'settings': {'index': {
+            'number_of_shards': '2', 'number_of_replicas': '1',
+            'creation_date': '1456963200172',
+        }}}}
+        client.indices.segments.return_value = {'indices': {'a': {'shards': {
+            '0': [{'num_search_segments': 3}, {'num_search_segments': 3}],
+            '1': [{'num_search_segments': 2}],
+        }}}}
+        loader = MetadataLoader(client)
+        loader.load(['settings', 'segments', 'field_stats'], ['a'])
+        self.assertEqual(2, loader.table.get('a', 'number_of_shards'))
+        self.assertEqual(1456963200, loader.table.get('a', 'creation_date'))
+        self.assertEqual(8, loader.table.get('a', 'segments'))
+    def test_failure(self):
+        client = Mock()
+        client.indices.get_alias.side_effect = testvars.fake_fail
+        self.assertRaises(
+            FailedExecution, MetadataLoader(client).load, ['aliases'], ['a'])
+
+class TestConcurrentLoad(TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+    def slow(self, response):
+        def call(index, **kwargs):
+            with self.lock:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+            time.sleep(0.02)
+            with self.lock:
+                self.in_flight -= 1
+            return response(index)
+        return call
+    def test_chunks_in_flight(self):
+        client = Mock()
+        client.cluster.state.side_effect = self.slow(
+            lambda index: state_for_all(index))
+        indices = ['index-{0:04d}'.format(i) for i in range(2000)]
+        loader = MetadataLoader(client, max_in_flight=3)
+        loader.load(['state'], indices)
+        self.assertTrue(loader.calls['state'] > 3)
+        self.assertEqual(3, self.peak)
+        self.assertEqual(2000, len(loader.data['state']))
+        self.assertEqual('close', loader.table.get('index-0002', 'state'))
+    def test_kinds_in_flight(self):
+        client = Mock()
+        client.cluster.state.side_effect = self.slow(
+            lambda index: state_for_all(index))
+        client.indices.get_alias.side_effect = self.slow(
+            lambda index: {index: {'aliases': {'alias': {}}}})
+        loader = MetadataLoader(client)
+        loader.load(['aliases', 'state'], ['a'])
+        self.assertEqual(2, self.peak)
+        self.assertEqual({'aliases': 1, 'state': 1}, loader.calls)
+        self.assertEqual(['alias'], loader.data['aliases']['a'])
+    def test_one_at_a_time(self):
+        client = Mock()
+        client.cluster.state.side_effect = self.slow(
+            lambda index: state_for_all(index))
+        client.indices.get_alias.side_effect = self.slow(
+            lambda index: {index: {'aliases': {}}})
+        MetadataLoader(client, max_in_flight=1).load(['aliases', 'state'], ['a'])
+        self.assertEqual(1, self.peak)
@@ -0,0 +1,86 @@
+"""Test the columnar index metadata table"""
+# pylint: disable=C0103,C0111
+from unittest import TestCase, skipUnless
+from mock import Mock, patch
+from curator_api import indextable
+from curator_api.indextable import IndexTable
+
+INFO = {
+    'index-a': {
+        'age': {'creation_date': 1456963200}, 'size_in_bytes': 2048,
+        'docs': 10, 'number_of_shards': 5, 'number_of_replicas': 1,
+        'segments': 12, 'state': 'open',
+    },
+    'index-b': {
+        'age': {'creation_date': 1457049600}, 'size_in_bytes': None,
+        'docs': None, 'number_of_shards': 3, 'number_of_replicas': 0,
+        'segments': None, 'state': 'close',
+    },
+    'index-c': {
+        'age': {'creation_date': 1457136000}, 'size_in_bytes': 4096,
+        'docs': 40, 'number_of_shards': 1, 'number_of_replicas': 1,
+        'segments': 1, 'state': 'open',
+    },
+}
+
+class TableTests(object):
+    def test_lookup(self):
+        table = IndexTable.from_index_info(INFO)
+        self.assertEqual(3, len(table))
+        self.assertTrue('index-b' in table)
+        self.assertEqual(2048, table.get('index-a', 'size_in_bytes'))
+        self.assertEqual('close', table.get('index-b', 'state'))
+        self.assertIsNone(table.get('index-b', 'docs'))
+    def test_index_info_view(self):
+        table = IndexTable.from_index_info(INFO)
+        self.assertEqual(INFO, dict(table.index_info))
+    def test_filter(self):
+        table = IndexTable.from_index_info(INFO)
+        self.assertEqual(
+            ['index-a', 'index-b'], table.filter('creation_date', '<', 1457136000))
+        self.assertEqual(['index-b'], table.filter('state', '==', 'close'))
+        # Missing values never match
+        self.assertEqual(['index-a', 'index-c'], table.filter('docs', '>=', 0))
+        self.assertEqual([0, 2], table.select('number_of_replicas', '==', 1))
+    def test_set(self):
+        table = IndexTable.from_index_info(INFO)
+        table.set('segments', {'index-b': 7})
+        table.set('state', {'index-b': 'open'})
+        self.assertEqual(7, table.get('index-b', 'segments'))
+        self.assertEqual(
+            ['index-a', 'index-b', 'index-c'], table.filter('state', '==', 'open'))
+    def test_from_inventory(self):
+        inventory = Mock()
+        inventory.indices = ['index-a']
+        inventory.__getitem__ = Mock(return_value={
+            'uuid': 'x', 'state': 'open', 'health': 'green',
+            'number_of_shards': 5, 'number_of_replicas': 1, 'docs': 10,
+            'size_in_bytes': 2048, 'primary_size_in_bytes': 1024,
+            'creation_date': 1456963200172,
+        })
+        table = IndexTable.from_inventory(inventory)
+        self.assertEqual(1456963200, table.get('index-a', 'creation_date'))
+        self.assertIsNone(table.get('index-a', 'segments'))
+
+class TestIndexTable(TableTests, TestCase):
+    pass
+
+@patch.object(indextable, 'np', None)
+class TestIndexTableWithoutNumpy(TableTests, TestCase):
+    def test_array_columns(self):
+        table = IndexTable.from_index_info(INFO)
+        self.assertEqual('b', table.columns['state'].typecode)
+
+@skipUnless(indextable.np, 'numpy is not installed')
+class TestIndexTableWithNumpy(TableTests, TestCase):
+    def test_numpy_columns(self):
+        table = IndexTable.from_index_info(INFO)
+        self.assertTrue(isinstance(table.columns['docs'], indextable.np.ndarray))
+        self.assertEqual('int64', table.columns['docs'].dtype.name)
+        self.assertEqual('int8', table.columns['state'].dtype.name)
+        self.assertTrue(type(table.get('index-a', 'docs')) is int)
+    def test_select_returns_ints(self):
+        table = IndexTable.from_index_info(INFO)
+        selected = table.select('size_in_bytes', '>', 0)
+        self.assertEqual([0, 2], selected)
+        self.assertTrue(all(type(position) is int for position in selected))
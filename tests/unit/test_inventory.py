@@ -0,0 +1,91 @@
+"""Test the index inventory"""
+# pylint: disable=C0103,C0111
+from unittest import TestCase
+from mock import Mock
+from curator_api.exceptions import FailedExecution
+from curator_api.inventory import IndexInventory
+from . import testvars as testvars
+
+CAT = [
+    {
+        'index': 'index-2016.03.03', 'uuid': 'random_uuid_string_here',
+        'status': 'open', 'health': 'green', 'pri': '5', 'rep': '1',
+        'docs.count': '10', 'store.size': '2048', 'pri.store.size': '1024',
+        'creation.date': '1456963200172',
+    },
+    {
+        'index': 'index-2016.03.04', 'uuid': 'another_random_uuid_string',
+        'status': 'close', 'health': 'red', 'pri': None, 'rep': None,
+        'docs.count': None, 'store.size': None, 'pri.store.size': None,
+        'creation.date': None,
+    },
+]
+CLOSED_SETTINGS = {
+    'index-2016.03.04': {'settings': {'index': {
+        'number_of_shards': '3', 'number_of_replicas': '0',
+        'creation_date': '1457049600000',
+    }}},
+}
+
+class TestIndexInventory(TestCase):
+    def test_single_call_when_complete(self):
+        client = Mock()
+        client.cat.indices.return_value = CAT[:1]
+        inventory = IndexInventory(client)
+        self.assertEqual(['index-2016.03.03'], inventory.indices)
+        self.assertEqual(
+            {
+                'uuid': 'random_uuid_string_here', 'state': 'open',
+                'health': 'green', 'number_of_shards': 5,
+                'number_of_replicas': 1, 'docs': 10, 'size_in_bytes': 2048,
+                'primary_size_in_bytes': 1024, 'creation_date': 1456963200172,
+            },
+            inventory['index-2016.03.03']
+        )
+        client.cat.indices.assert_called_once_with(
+            index='_all', format='json', bytes='b',
+            h='index,uuid,status,health,pri,rep,docs.count,store.size,'
+              'pri.store.size,creation.date'
+        )
+        client.indices.get_settings.assert_not_called()
+        client.cluster.state.assert_not_called()
+        client.indices.stats.assert_not_called()
+    def test_closed_index_falls_back_to_settings(self):
+        client = Mock()
+        client.cat.indices.return_value = CAT
+        client.indices.get_settings.return_value = CLOSED_SETTINGS
+        inventory = IndexInventory(client)
+        self.assertEqual(2, len(inventory))
+        closed = inventory['index-2016.03.04']
+        self.assertEqual(3, closed['number_of_shards'])
+        self.assertEqual(0, closed['number_of_replicas'])
+        self.assertEqual(1457049600000, closed['creation_date'])
+        self.assertIsNone(closed['docs'])
+        self.assertEqual(
+            'index-2016.03.04',
+            client.indices.get_settings.call_args[1]['index']
+        )
+    def test_filter(self):
+        client = Mock()
+        client.cat.indices.return_value = CAT
+        client.indices.get_settings.return_value = CLOSED_SETTINGS
+        inventory = IndexInventory(client)
+        self.assertEqual(['index-2016.03.04'], inventory.filter(state='close'))
+        self.assertTrue('index-2016.03.03' in inventory)
+        self.assertEqual(
+            ['index-2016.03.03', 'index-2016.03.04'], list(inventory))
+    def test_index_expression(self):
+        client = Mock()
+        client.cat.indices.return_value = CAT[:1]
+        IndexInventory(client, index='index-*,-index-2016.03.04*')
+        self.assertEqual(
+            'index-*,-index-2016.03.04*', client.cat.indices.call_args[1]['index'])
+    def test_cat_failure(self):
+        client = Mock()
+        client.cat.indices.side_effect = testvars.fake_fail
+        self.assertRaises(FailedExecution, IndexInventory, client)
+    def test_settings_failure(self):
+        client = Mock()
+        client.cat.indices.return_value = CAT
+        client.indices.get_settings.side_effect = testvars.fake_fail
+        self.assertRaises(FailedExecution, IndexInventory, client)
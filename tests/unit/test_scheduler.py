@@ -0,0 +1,117 @@
+"""Test the rollover scheduler"""
+# pylint: disable=C0103,C0111
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from mock import Mock
+from curator_api.exceptions import FailedExecution
+from curator_api.scheduler import RolloverScheduler, seconds_until
+
+NOW = 1500000000
+CONDITIONS = {'max_docs': 1000, 'max_size': '1gb'}
+
+class TestSecondsUntil(TestCase):
+    def test_rate(self):
+        samples = [[NOW - 100, 100, 0], [NOW, 200, 0]]
+        # 800 more docs at one per second
+        self.assertEqual(800, seconds_until({'max_docs': 1000}, samples, now=NOW))
+        self.assertEqual(
+            700, seconds_until({'max_docs': 1000}, samples, now=NOW + 100))
+    def test_earliest(self):
+        samples = [[NOW - 100, 100, 1024 ** 3 - 2000], [NOW, 200, 1024 ** 3 - 1000]]
+        self.assertEqual(100, seconds_until(CONDITIONS, samples, now=NOW))
+        self.assertEqual(50, seconds_until(
+            dict(CONDITIONS, max_age='1h'), samples, NOW - 3550, now=NOW))
+    def test_unknown(self):
+        self.assertIsNone(seconds_until(CONDITIONS, [[NOW, 1, 1]], now=NOW))
+        self.assertIsNone(seconds_until(
+            CONDITIONS, [[NOW - 10, 1, 1], [NOW, 1, 1]], now=NOW))
+
+def stats_response(docs):
+    def stats(index, **kwargs):
+        return {'indices': dict(
+            (i, {'primaries': {
+                'docs': {'count': docs[i]}, 'store': {'size_in_bytes': 1}}})
+            for i in index.split(','))}
+    return stats
+
+class TestRolloverScheduler(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.directory, 'state.json')
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def client(self, docs):
+        client = Mock()
+        # max_size needs 6.1 or later
+        client.info.return_value = {'version': {'number': '6.8.0'}}
+        client.cat.aliases.return_value = [
+            {'alias': 'logs-a', 'index': 'logs-a-000001'},
+            {'alias': 'logs-b', 'index': 'logs-b-000001'},
+        ]
+        client.indices.stats.side_effect = stats_response(docs)
+        client.indices.get_settings.return_value = {}
+        client.indices.rollover.return_value = {
+            'old_index': 'logs-a-000001', 'new_index': 'logs-a-000002',
+            'rolled_over': True, 'dry_run': False,
+            'conditions': {'[max_docs: 1000]': True},
+        }
+        return client
+    def test_schedules_from_rate(self):
+        client = self.client({'logs-a-000001': 100, 'logs-b-000001': 100})
+        scheduler = RolloverScheduler(
+            client, CONDITIONS, self.state_file, min_interval=60)
+        # One sample: check again after min_interval
+        self.assertEqual(
+            {'logs-a': NOW + 60, 'logs-b': NOW + 60},
+            scheduler.run(['logs-a', 'logs-b'], now=NOW))
+        self.assertEqual([], scheduler.due(['logs-a', 'logs-b'], now=NOW + 59))
+        client.indices.stats.side_effect = stats_response(
+            {'logs-a-000001': 160, 'logs-b-000001': 700})
+        scheduled = scheduler.run(['logs-a', 'logs-b'], now=NOW + 60)
+        client.indices.rollover.assert_not_called()
+        # logs-a: 840 docs to go at 1/s, 10% early.  logs-b: 300 docs at 10/s.
+        self.assertAlmostEqual(NOW + 60 + 756, scheduled['logs-a'])
+        self.assertAlmostEqual(NOW + 60 + 60, scheduled['logs-b'])
+        with open(self.state_file) as handle:
+            state = json.load(handle)
+        self.assertEqual(2, len(state['logs-a']['samples']))
+        # The state survives a restart
+        reloaded = RolloverScheduler(client, CONDITIONS, self.state_file)
+        self.assertEqual(['logs-b'], reloaded.due(['logs-a', 'logs-b'], NOW + 120))
+    def test_rolls_over_near_aliases(self):
+        client = self.client({'logs-a-000001': 950, 'logs-b-000001': 100})
+        scheduler = RolloverScheduler(
+            client, CONDITIONS, self.state_file, min_interval=60)
+        scheduled = scheduler.run(['logs-a', 'logs-b'], now=NOW)
+        client.indices.rollover.assert_called_once()
+        self.assertEqual('logs-a', client.indices.rollover.call_args[1]['alias'])
+        self.assertEqual(
+            {'index': 'logs-a-000002', 'samples': [], 'next_check': NOW + 60},
+            scheduler.state['logs-a'])
+        self.assertEqual(NOW + 60, scheduled['logs-a'])
+    def test_nothing_due(self):
+        client = self.client({})
+        scheduler = RolloverScheduler(client, CONDITIONS, self.state_file)
+        scheduler.state = {'logs-a': {'next_check': NOW + 1}}
+        self.assertEqual({}, scheduler.run(['logs-a'], now=NOW))
+        client.cat.aliases.assert_not_called()
+    def test_no_write_index(self):
+        client = self.client({})
+        scheduler = RolloverScheduler(client, CONDITIONS, self.state_file)
+        # The alias still goes to the rollover API, which reports it
+        self.assertRaises(
+            FailedExecution, scheduler.run, ['logs-missing'], now=NOW)
+        client.indices.stats.assert_not_called()
+        client.indices.get_settings.assert_not_called()
+    def test_bad_state_file(self):
+        with open(self.state_file, 'w') as handle:
+            handle.write('{not json')
+        self.assertEqual(
+            {}, RolloverScheduler(Mock(), CONDITIONS, self.state_file).state)
+    def test_unwritable_state_file(self):
+        scheduler = RolloverScheduler(
+            Mock(), CONDITIONS, os.path.join(self.directory, 'no', 'state.json'))
+        self.assertRaises(FailedExecution, scheduler.save)
@@ -0,0 +1,50 @@
+"""Test serializer functions"""
+# pylint: disable=C0103,C0111
+from datetime import datetime
+from unittest import SkipTest, TestCase
+from mock import patch
+from elasticsearch.exceptions import SerializationError
+from elasticsearch.serializer import JSONSerializer
+from curator_api.helpers import serializer
+from curator_api.helpers.client import get_client
+from curator_api.helpers.serializer import OrjsonSerializer, get_serializer
+
+class TestOrjsonSerializer(TestCase):
+    def setUp(self):
+        if serializer.orjson is None:
+            raise SkipTest('orjson is not installed')
+    def test_round_trip(self):
+        data = {'index': {'number_of_shards': 5, 'aliases': ['a', 'b'], 'closed': False}}
+        ser = OrjsonSerializer()
+        self.assertEqual(data, ser.loads(ser.dumps(data)))
+    def test_dumps_string_unchanged(self):
+        self.assertEqual('{"a":1}', OrjsonSerializer().dumps('{"a":1}'))
+    def test_dumps_matches_json_serializer(self):
+        data = {'date': datetime(2018, 1, 1), 1: 'non-string key'}
+        self.assertEqual(JSONSerializer().dumps(data), OrjsonSerializer().dumps(data))
+    def test_loads_raises(self):
+        self.assertRaises(SerializationError, OrjsonSerializer().loads, '{not json')
+    def test_dumps_raises(self):
+        self.assertRaises(SerializationError, OrjsonSerializer().dumps, {'a': object()})
+
+class TestGetSerializer(TestCase):
+    def test_fallback(self):
+        with patch.object(serializer, 'orjson', None):
+            self.assertEqual(JSONSerializer, type(get_serializer()))
+    def test_orjson(self):
+        if serializer.orjson is None:
+            raise SkipTest('orjson is not installed')
+        self.assertIsInstance(get_serializer(), OrjsonSerializer)
+
+class TestGetClient(TestCase):
+    def test_installs_serializer(self):
+        client = get_client()
+        self.assertIs(type(get_serializer()), type(client.transport.serializer))
+        self.assertIs(
+            client.transport.serializer,
+            client.transport.deserializer.serializers['application/json']
+        )
+    def test_keeps_provided_serializer(self):
+        provided = JSONSerializer()
+        client = get_client(serializer=provided)
+        self.assertIs(provided, client.transport.serializer)
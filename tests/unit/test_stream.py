@@ -0,0 +1,141 @@
+"""Test streaming response helpers"""
+# pylint: disable=C0103,C0111
+import json
+from unittest import TestCase
+from elasticsearch import Urllib3HttpConnection
+from elasticsearch.exceptions import ConnectionError, NotFoundError
+from elasticsearch.serializer import JSONSerializer
+from mock import Mock, call, patch
+from curator_api.exceptions import FailedExecution, MissingArgument
+from curator_api.helpers.client import get_client
+from curator_api.helpers.index import stream_indices
+from curator_api.helpers.snapshot import stream_snapshot_data
+from curator_api.helpers.stream import iter_json_members, stream_response
+from . import testvars as testvars
+from .testservers import LocalServer
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+SNAPSHOTS = {'snapshots': [
+    {'snapshot': 'snap1', 'state': 'SUCCESS', 'start_time_in_millis': 1, 'indices': ['a', 'b']},
+    {'snapshot': 'snap2', 'state': 'IN_PROGRESS', 'start_time_in_millis': 22, 'indices': []},
+]}
+
+class TestIterJsonMembers(TestCase):
+    def test_top_level_keys_any_chunking(self):
+        text = json.dumps(testvars.settings_two, indent=1)
+        for size in (1, 2, 7, 64, len(text)):
+            self.assertEqual(
+                list(testvars.settings_two.items()),
+                list(iter_json_members(chunked(text, size)))
+            )
+    def test_nested_array(self):
+        text = json.dumps({'other': {'x': [1, 2]}, 'snapshots': SNAPSHOTS['snapshots']})
+        for size in (1, 5, len(text)):
+            self.assertEqual(
+                list(enumerate(SNAPSHOTS['snapshots'])),
+                list(iter_json_members(chunked(text, size), ('snapshots',)))
+            )
+    def test_numbers_split_across_chunks(self):
+        self.assertEqual(
+            [(0, 12345), (1, 6.5)], list(iter_json_members(['[123', '45,6', '.5]'])))
+    def test_floats_split_at_every_offset(self):
+        text = '{"a": [1.5, -2e-3, 3E+10, 0.25, 1e5], "b": 12.0, "c": {"d": -7.125e-2}}'
+        expected = [
+            ('a', [1.5, -2e-3, 3e10, 0.25, 1e5]), ('b', 12.0), ('c', {'d': -7.125e-2})]
+        for offset in range(1, len(text)):
+            self.assertEqual(
+                expected,
+                list(iter_json_members([text[:offset], text[offset:]])))
+        self.assertEqual(expected, list(iter_json_members(chunked(text, 1))))
+    def test_empty_and_missing(self):
+        self.assertEqual([], list(iter_json_members(['{}'])))
+        self.assertEqual([], list(iter_json_members([' [ ] '])))
+        self.assertEqual([], list(iter_json_members(['{"a": 1}'], ('snapshots',))))
+    def test_truncated(self):
+        self.assertRaises(ValueError, list, iter_json_members(['{"a": [1, 2']))
+    def test_escaped_strings(self):
+        text = json.dumps({'a"b': 'c}\\"', 'd': 'é'})
+        self.assertEqual(
+            [('a"b', 'c}\\"'), ('d', 'é')], list(iter_json_members(chunked(text, 3))))
+
+class TestStreamResponse(TestCase):
+    def test_fallback_without_pool(self):
+        client = Mock()
+        client.transport.get_connection.return_value = Mock(spec=['perform_request'])
+        client.transport.perform_request.return_value = {'a': 1}
+        client.transport.serializer = JSONSerializer()
+        self.assertEqual(['{"a":1}'], list(stream_response(client, 'GET', '/')))
+        client.transport.perform_request.assert_called_once_with(
+            'GET', '/', params=None)
+    def test_local_server(self):
+        with LocalServer({'/_all/_settings/index.uuid': testvars.settings_two}) as server:
+            client = get_client(hosts=[server.host])
+            self.assertEqual(
+                ['index-2016.03.03', 'index-2016.03.04'], sorted(stream_indices(client)))
+            self.assertEqual(
+                ['/_all/_settings/index.uuid?expand_wildcards=open%2Cclosed'],
+                server.requests
+            )
+    def test_error_status(self):
+        with LocalServer({}) as server:
+            client = get_client(hosts=[server.host])
+            self.assertRaises(FailedExecution, list, stream_indices(client))
+    def test_error_status_exception(self):
+        with LocalServer({}) as server:
+            client = get_client(hosts=[server.host])
+            self.assertRaises(
+                NotFoundError, list, stream_response(client, 'GET', '/missing'))
+    @patch('curator_api.helpers.stream.time.sleep')
+    def test_retry_marks_dead(self, _):
+        with LocalServer({'/': {'a': 1}}) as server:
+            live = get_client(hosts=[server.host]).transport.get_connection()
+            dead = Urllib3HttpConnection(host='127.0.0.1', port=1)
+            client = Mock()
+            client.transport.max_retries = 3
+            client.transport.get_connection.side_effect = [dead, dead, dead, live]
+            self.assertEqual(['{"a": 1}'], list(stream_response(client, 'GET', '/')))
+            self.assertEqual(
+                [call(dead), call(dead)], client.transport.mark_dead.call_args_list)
+            client.transport.connection_pool.mark_live.assert_called_once_with(live)
+    @patch('curator_api.helpers.stream.time.sleep')
+    def test_retries_exhausted(self, _):
+        dead = Urllib3HttpConnection(host='127.0.0.1', port=1)
+        client = Mock()
+        client.transport.max_retries = 1
+        client.transport.get_connection.return_value = dead
+        self.assertRaises(
+            ConnectionError, list, stream_response(client, 'GET', '/'))
+        self.assertEqual(2, client.transport.mark_dead.call_count)
+    def test_no_retry_on_client_error(self):
+        with LocalServer({}) as server:
+            live = get_client(hosts=[server.host]).transport.get_connection()
+            client = Mock()
+            client.transport.max_retries = 3
+            client.transport.retry_on_status = (502, 503, 504)
+            client.transport.get_connection.return_value = live
+            self.assertRaises(
+                NotFoundError, list, stream_response(client, 'GET', '/missing'))
+            self.assertEqual(1, len(server.requests))
+            client.transport.mark_dead.assert_not_called()
+
+class TestStreamSnapshotData(TestCase):
+    def test_no_repository(self):
+        self.assertRaises(MissingArgument, list, stream_snapshot_data(Mock()))
+    def test_fields(self):
+        with LocalServer({'/_snapshot/repo/_all': SNAPSHOTS}) as server:
+            client = get_client(hosts=[server.host])
+            self.assertEqual(
+                [
+                    {'snapshot': 'snap1', 'state': 'SUCCESS', 'start_time_in_millis': 1},
+                    {'snapshot': 'snap2', 'state': 'IN_PROGRESS', 'start_time_in_millis': 22},
+                ],
+                list(stream_snapshot_data(client, repository='repo'))
+            )
+            self.assertIn('filter_path=snapshots.snapshot', server.requests[0])
+    def test_missing_repository(self):
+        with LocalServer({}) as server:
+            client = get_client(hosts=[server.host])
+            self.assertRaises(
+                FailedExecution, list, stream_snapshot_data(client, repository='repo'))
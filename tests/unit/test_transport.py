@@ -0,0 +1,96 @@
+"""Test the latency-aware transport"""
+# pylint: disable=C0103,C0111
+import time
+from unittest import TestCase
+from mock import Mock, patch
+from curator_api.helpers.client import get_client
+from curator_api.helpers.transport import (
+    Latency, LatencyAwareTransport, LatencySelector, latency_tracking
+)
+from .testservers import LocalServer
+
+INFO = {'version': {'number': '6.8.0'}}
+
+def measured(ewma):
+    connection = Mock()
+    connection.latency.ewma = ewma
+    return connection
+
+class TestLatency(TestCase):
+    def test_ewma(self):
+        latency = Latency(alpha=0.5)
+        self.assertIsNone(latency.ewma)
+        latency.record(1.0)
+        self.assertEqual(1.0, latency.ewma)
+        latency.record(3.0)
+        self.assertEqual(2.0, latency.ewma)
+    def test_percentile_needs_samples(self):
+        latency = Latency()
+        latency.record(1.0)
+        self.assertIsNone(latency.percentile(95))
+    def test_percentile(self):
+        latency = Latency()
+        for i in range(100):
+            latency.record(i / 100.0)
+        self.assertEqual(0.95, latency.percentile(95))
+        self.assertEqual(0.99, latency.percentile(100))
+    def test_tracking_class_is_reused(self):
+        cls = latency_tracking(Mock)
+        self.assertIs(cls, latency_tracking(cls))
+
+@patch.object(LatencySelector, 'explore', 0)
+class TestLatencySelector(TestCase):
+    def test_unmeasured_first(self):
+        fast, new = measured(0.01), measured(None)
+        self.assertIs(new, LatencySelector({}).select([fast, new]))
+    def test_fastest(self):
+        slow, fast = measured(2.0), measured(0.01)
+        self.assertIs(fast, LatencySelector({}).select([slow, fast]))
+
+@patch.object(LatencySelector, 'explore', 0)
+class TestLatencyAwareTransport(TestCase):
+    def test_prefers_fast_host(self):
+        with LocalServer({'/': INFO}, latency=0.2) as slow:
+            with LocalServer({'/': INFO}) as fast:
+                client = get_client(
+                    hosts=[slow.host, fast.host], latency_aware=True,
+                    randomize_hosts=False
+                )
+                self.assertIsInstance(client.transport, LatencyAwareTransport)
+                for _ in range(5):
+                    client.info()
+                self.assertEqual(1, len(slow.requests))
+                self.assertEqual(4, len(fast.requests))
+    def test_hedged_read(self):
+        with LocalServer({'/': INFO}, latency=1.0) as slow:
+            with LocalServer({'/': INFO}) as fast:
+                client = get_client(
+                    hosts=[slow.host, fast.host], hedged_reads=True,
+                    hedge_delay=0.05, randomize_hosts=False
+                )
+                start = time.time()
+                self.assertEqual(INFO, client.info())
+                self.assertLess(time.time() - start, 0.8)
+                self.assertEqual(1, len(slow.requests))
+                self.assertEqual(1, len(fast.requests))
+                client.transport.close()
+    def test_no_hedge_when_fast(self):
+        with LocalServer({'/': INFO}) as first:
+            with LocalServer({'/': INFO}) as second:
+                client = get_client(
+                    hosts=[first.host, second.host], hedged_reads=True,
+                    hedge_delay=0.5, randomize_hosts=False
+                )
+                client.info()
+                self.assertEqual(1, len(first.requests))
+                self.assertEqual([], second.requests)
+                client.transport.close()
+    def test_writes_not_hedged(self):
+        transport = LatencyAwareTransport(
+            [{'host': 'localhost'}], hedged_reads=True)
+        with patch('elasticsearch.Transport.perform_request') as mock_perform:
+            mock_perform.return_value = {}
+            transport.perform_request('POST', '/_aliases', body={})
+            mock_perform.assert_called_once_with(
+                'POST', '/_aliases', headers=None, params=None, body={})
+        self.assertIsNone(transport._executor)
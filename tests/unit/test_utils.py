@@ -1,7 +1,10 @@
 """Test utility functions"""
 # pylint: disable=C0103,C0111
 from unittest import TestCase
-from curator_api.helpers.utils import byte_size, check_csv, ensure_list, prune_nones, to_csv
+from curator_api.helpers.utils import (
+    byte_size, check_csv, ensure_list, parse_byte_size, parse_time,
+    prune_nones, to_csv
+)
 
 class TestByteSize(TestCase):
     def test_byte_size(self):
@@ -16,6 +19,28 @@ class TestByteSize(TestCase):
     def test_raise_invalid(self):
         self.assertRaises(TypeError, byte_size, 'invalid')
 
+class TestParseByteSize(TestCase):
+    def test_units(self):
+        self.assertEqual(8192, parse_byte_size(8192))
+        self.assertEqual(4096, parse_byte_size('4kb'))
+        self.assertEqual(4096, parse_byte_size('4K'))
+        self.assertEqual(1536 * 1024 ** 2, parse_byte_size('1.5gb'))
+        self.assertEqual(1024 ** 5, parse_byte_size(' 1 pb '))
+    def test_invalid(self):
+        self.assertRaises(ValueError, parse_byte_size, '4 apples')
+        self.assertRaises(ValueError, parse_byte_size, '-1kb')
+
+class TestParseTime(TestCase):
+    def test_units(self):
+        self.assertEqual(7 * 86400, parse_time('7d'))
+        self.assertEqual(43200, parse_time('12h'))
+        self.assertEqual(90, parse_time('1.5m'))
+        self.assertEqual(0.25, parse_time('250ms'))
+        self.assertEqual(30, parse_time(' 30s '))
+    def test_invalid(self):
+        self.assertRaises(ValueError, parse_time, '7')
+        self.assertRaises(ValueError, parse_time, '1w')
+
 class TestEnsureList(TestCase):
     def test_ensure_list_returns_lists(self):
         for values in [
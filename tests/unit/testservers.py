@@ -0,0 +1,54 @@
+"""Local stand-in HTTP servers for tests which need a real connection"""
+import json
+import threading
+import time
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+class LocalServer(object):
+    """
+    Serve canned JSON responses on a local port, in a background thread.
+
+    :arg responses: A dictionary of path (without the query string) to the
+        object to respond with.  Other paths get a 404.
+    :arg latency: Seconds to sleep before each response
+    """
+    def __init__(self, responses, latency=0):
+        self.responses = responses
+        self.latency = latency
+        #: The paths requested, with query strings, in order
+        self.requests = []
+        server = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                time.sleep(server.latency)
+                path = self.path.split('?')[0]
+                if path in server.responses:
+                    status, body = 200, server.responses[path]
+                else:
+                    status, body = 404, {'error': 'not found', 'status': 404}
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            do_HEAD = do_GET
+            def log_message(self, *args):
+                pass
+        self.httpd = HTTPServer(('127.0.0.1', 0), Handler)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def host(self):
+        return {'host': '127.0.0.1', 'port': self.port}
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -3,6 +3,8 @@ import elasticsearch
 fake_fail      = Exception('Simulated Failure')
 four_oh_one    = elasticsearch.TransportError(401, "simulated error")
 four_oh_four   = elasticsearch.TransportError(404, "simulated error")
+index_closed   = elasticsearch.TransportError(400, "index_closed_exception")
+index_blocked  = elasticsearch.AuthorizationException(403, "cluster_block_exception")
 get_alias_fail = elasticsearch.NotFoundError(404, "simulated error")
 named_index    = 'index_name'
 named_indices  = [ "index-2015.01.01", "index-2015.02.01" ]
@@ -17,7 +19,7 @@ closed_indices = { 'metadata': { 'indices' : { 'index1' : { 'state' : 'close' },
 named_alias    = 'alias_name'
 alias_retval   = { "pre_aliased_index": { "aliases" : { named_alias : { }}}}
 rollable_alias = { "index-000001": { "aliases" : { named_alias : { }}}}
-rollover_conditions = { 'conditions': { 'max_age': '1s' } }
+rollover_conditions = { 'max_age': '1s' }
 dry_run_rollover = {
   "acknowledged": True,
   "shards_acknowledged": True,